@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-chunk overhead of embedding generation.
+
+"before" reproduces the old path: re-read config.json and .devco/.env, then
+fork a fresh Python interpreter per chunk (a stand-in for `llm embed`, which
+additionally pays for llm's plugin discovery, so real numbers are worse).
+"after" uses the in-process EmbeddingEngine with a stub model, so both sides
+exclude the provider's network time and only measure devco's own overhead.
+
+Usage: python benchmarks/bench_embedding_overhead.py [--chunks N]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.engine import EmbeddingEngine
+
+STUB_DIM = 2048
+STUB_SCRIPT = f"import json; print(json.dumps([0.0] * {STUB_DIM}))"
+
+
+class StubModel:
+    """Model object returning a fixed vector without any network access"""
+    needs_key = None
+
+    def embed(self, text):
+        return [0.0] * STUB_DIM
+
+
+def embed_before(storage: DevDocStorage, text: str):
+    """Old per-chunk path: reload settings and spawn a process"""
+    config = storage.load_config()
+    config.get('embedding_model')
+    env_vars = os.environ.copy()
+    with open(storage.devco_dir / ".env") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                env_vars[key.strip()] = value.strip()
+    result = subprocess.run([sys.executable, '-c', STUB_SCRIPT],
+                            capture_output=True, text=True, timeout=30, env=env_vars)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=50, help='Number of chunks to embed')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = DevDocStorage(tmpdir)
+        storage.init()
+        chunks = [f"chunk {i} " * 40 for i in range(args.chunks)]
+
+        start = time.perf_counter()
+        for chunk in chunks:
+            embed_before(storage, chunk)
+        before = (time.perf_counter() - start) / len(chunks)
+
+        engine = EmbeddingEngine(storage)
+        engine._load_model = lambda model_id: StubModel()
+        start = time.perf_counter()
+        for chunk in chunks:
+            engine.embed(chunk)
+        after = (time.perf_counter() - start) / len(chunks)
+
+    print(f"chunks:            {args.chunks}")
+    print(f"before (per chunk): {before * 1000:8.3f} ms")
+    print(f"after  (per chunk): {after * 1000:8.3f} ms")
+    print(f"speedup:            {before / after:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark the devco git auto-commit against the previous porcelain sequence.
+
+Creates a throwaway repository with many tracked files, so that commands which
+scan the working tree are expensive, and times saving a principle with the
+plumbing commit devco uses now versus the old sequence of git diff, reset,
+status per file, add, commit and re-add. Also reports git processes per save.
+
+Usage: python benchmarks/bench_git_commit.py [--files N] [--saves N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+
+
+def porcelain_commit(storage, action):
+    """The auto-commit as it was before it used plumbing"""
+    root = storage.project_root
+    subprocess.run(['git', 'rev-parse', '--git-dir'], capture_output=True, check=True, cwd=root)
+    result = subprocess.run(['git', 'diff', '--cached', '--name-only'], capture_output=True, text=True, cwd=root)
+    staged_files = result.stdout.split()
+    if staged_files:
+        subprocess.run(['git', 'reset'] + staged_files, capture_output=True, cwd=root)
+    files_to_stage = []
+    for file_path in ['.devco/config.json', '.devco/principles.json', '.devco/summary.json', '.devco/devco.db']:
+        result = subprocess.run(['git', 'status', '--porcelain', file_path], capture_output=True, text=True, cwd=root)
+        if result.stdout.strip():
+            files_to_stage.append(file_path)
+    if files_to_stage:
+        subprocess.run(['git', 'add'] + files_to_stage, capture_output=True, cwd=root)
+        subprocess.run(['git', 'commit', '-m', f"devco: {action}"], capture_output=True, cwd=root)
+    if staged_files:
+        subprocess.run(['git', 'add'] + staged_files, capture_output=True, cwd=root)
+
+
+def time_saves(storage, saves):
+    """Return seconds and git processes per save of a changed principle list"""
+    with patch('devco.storage.subprocess.run', wraps=subprocess.run) as run:
+        start = time.perf_counter()
+        for i in range(saves):
+            storage.save_principles([f"principle {i}"])
+        elapsed = time.perf_counter() - start
+    return elapsed / saves, run.call_count / saves
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=50000, help='Tracked files in the repository')
+    parser.add_argument('--saves', type=int, default=10, help='Saves to time with each method')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ.update(GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+                          GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+        subprocess.run(['git', 'init', '-q'], cwd=tmpdir, check=True)
+        for i in range(args.files):
+            directory = os.path.join(tmpdir, "src", str(i // 500))
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"file{i}.txt"), 'w') as f:
+                f.write(f"content {i}\n")
+        storage = DevDocStorage(tmpdir)
+        storage.init()
+        subprocess.run(['git', 'add', '.'], cwd=tmpdir, check=True)
+        subprocess.run(['git', 'commit', '-q', '-m', 'initial'], cwd=tmpdir, check=True)
+        # A user change waiting in the index, as during normal work
+        with open(os.path.join(tmpdir, "src", "0", "file0.txt"), 'a') as f:
+            f.write("edited\n")
+        subprocess.run(['git', 'add', 'src/0/file0.txt'], cwd=tmpdir, check=True)
+
+        plumbing, plumbing_calls = time_saves(storage, args.saves)
+        with patch.object(DevDocStorage, '_git_commit_devco_changes', porcelain_commit):
+            porcelain, porcelain_calls = time_saves(storage, args.saves)
+        with patch('devco.storage.subprocess.run', wraps=subprocess.run) as run:
+            start = time.perf_counter()
+            storage._git_commit_devco_changes("update principles")
+            unchanged, unchanged_calls = time.perf_counter() - start, run.call_count
+
+    print(f"tracked files:      {args.files}")
+    print(f"plumbing commit:    {plumbing * 1000:8.1f} ms per save   {plumbing_calls:4.1f} git processes")
+    print(f"porcelain commit:   {porcelain * 1000:8.1f} ms per save   {porcelain_calls:4.1f} git processes")
+    print(f"nothing changed:    {unchanged * 1000:8.1f} ms            {unchanged_calls:4.1f} git processes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexing and query throughput with the offline local-hash backend.
+
+Builds a throwaway project with synthetic sections, embeds it with the
+local-hash model (no network, no API key) and reports the raw vectorizer
+rate, the end-to-end embed_all_content rate and query latency.
+
+Usage: python benchmarks/bench_local_backend.py [--chunks N] [--model local-hash-512]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.embeddings import EmbeddingsManager
+from devco.local import HashingEmbeddingModel
+
+
+def synthetic_text(rng: random.Random, vocabulary, words: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=20000, help='Number of chunks to index')
+    parser.add_argument('--model', default='local-hash-512', help='Local model id')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    texts = [synthetic_text(rng, vocabulary, 70) for _ in range(args.chunks)]
+
+    model = HashingEmbeddingModel(args.model)
+    start = time.perf_counter()
+    for i in range(0, len(texts), 100):
+        model.embed_matrix(texts[i:i + 100])
+    raw = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = DevDocStorage(tmpdir)
+        storage.init()
+        config = storage.load_config()
+        config.update({"embedding_model": args.model, "embedding_rate_limit": 0})
+        storage.save_config(config)
+        storage.save_principles(texts)
+
+        manager = EmbeddingsManager(storage)
+        start = time.perf_counter()
+        manager.embed_all_content(silent=True)
+        indexing = time.perf_counter() - start
+
+        start = time.perf_counter()
+        queries = 5
+        for _ in range(queries):
+            manager.search_similar_content(synthetic_text(rng, vocabulary, 8))
+        query = (time.perf_counter() - start) / queries
+
+    print(f"chunks:             {args.chunks}")
+    print(f"vectorizer:         {args.chunks / raw:10.0f} chunks/s")
+    print(f"embed_all_content:  {args.chunks / indexing:10.0f} chunks/s")
+    print(f"query latency:      {query * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark quantized and prefix first-pass search against exact search of the sidecar matrix.
+
+Fills a throwaway devco.db with clustered random vectors, the way chunks of
+one project crowd around a few topics, with most of the signal in the leading
+dimensions as in Matryoshka embeddings. Reports for each quantization, on the
+full vectors and on a prefix of them, the bytes scanned per query, the
+per-query time and recall@k against exact search.
+
+Usage: python benchmarks/bench_quantization.py [--vectors N] [--dimensions D] [--candidates C] [--prefix-dims P]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.embeddings import EmbeddingsManager
+from devco.vectors import QUANTIZATIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=50000, help='Number of published vectors')
+    parser.add_argument('--dimensions', type=int, default=2048, help='Vector dimensions')
+    parser.add_argument('--candidates', type=int, default=200, help='Candidates rescored at full precision')
+    parser.add_argument('--k', type=int, default=10, help='Results compared for recall')
+    parser.add_argument('--prefix-dims', type=int, default=256, help='Leading dimensions of the prefix first stage')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((64, args.dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), args.vectors)]
+    vectors += rng.standard_normal(vectors.shape).astype(np.float32)
+    queries = vectors[:20] + 0.5 * rng.standard_normal((20, args.dimensions)).astype(np.float32)
+    # Variance fades along the dimensions
+    decay = (1.0 / np.sqrt(1.0 + np.arange(args.dimensions) / 16.0)).astype(np.float32)
+    vectors *= decay
+    queries *= decay
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = DevDocStorage(tmpdir)
+        storage.init()
+        manager = EmbeddingsManager(storage)
+        model = manager.engine.settings()["model"]
+        conn = storage.get_db_connection()
+        conn.executemany("INSERT INTO vectors (id, model, text_hash, embedding, dimensions) VALUES (?, ?, ?, ?, ?)",
+                         ((i + 1, model, str(i), vectors[i].tobytes(), args.dimensions)
+                          for i in range(args.vectors)))
+        conn.executemany("""
+            INSERT INTO embeddings (content_type, content_id, chunk_text, vector_id, model, generation)
+            VALUES ('principle', ?, '', ?, ?, 0)
+        """, ((str(i), i + 1, model) for i in range(args.vectors)))
+        conn.commit()
+        where, params = manager._model_filter(model, "e.model")
+
+        results = {}
+        for dimensions in (args.dimensions, args.prefix_dims):
+            for quantization in QUANTIZATIONS:
+                name = quantization if dimensions == args.dimensions else f"p{dimensions}+{quantization}"
+                # Build the matrix and codes before timing
+                manager.sidecar.search(conn, model, 0, where, params, queries[0], args.k, quantization,
+                                       args.candidates, dimensions)
+                start = time.perf_counter()
+                rankings = [[vector_id for vector_id, _ in manager.sidecar.search(
+                    conn, model, 0, where, params, query, args.k, quantization, args.candidates, dimensions)]
+                    for query in queries]
+                scanned = {"none": dimensions * 4, "int8": dimensions, "binary": (dimensions + 7) // 8}[quantization]
+                results[name] = (scanned, (time.perf_counter() - start) / len(queries), rankings)
+        conn.close()
+
+    print(f"vectors:            {args.vectors} x {args.dimensions}, {args.candidates} candidates rescored")
+    for name, (scanned, seconds, rankings) in results.items():
+        found = sum(len(set(truth) & set(ranking)) for truth, ranking in zip(results["none"][2], rankings))
+        recall = found / (args.k * len(queries))
+        print(f"{name:12} {scanned:6d} bytes/vector   {seconds * 1000:8.1f} ms/query   recall@{args.k} {recall:.3f}")
+
+
+if __name__ == '__main__':
+    main()
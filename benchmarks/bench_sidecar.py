@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark vector search through the memory-mapped matrix against a table scan.
+
+Fills a throwaway devco.db with random published vectors, builds the .npy
+sidecar and reports its build time and the per-query time of scoring every
+vector from the mapped matrix versus reading them from the vectors table.
+
+Usage: python benchmarks/bench_sidecar.py [--vectors N] [--dimensions D]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.embeddings import EmbeddingsManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=100000, help='Number of published vectors')
+    parser.add_argument('--dimensions', type=int, default=768, help='Vector dimensions')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dimensions)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = DevDocStorage(tmpdir)
+        storage.init()
+        manager = EmbeddingsManager(storage)
+        model = manager.engine.settings()["model"]
+        conn = storage.get_db_connection()
+        conn.executemany("INSERT INTO vectors (id, model, text_hash, embedding, dimensions) VALUES (?, ?, ?, ?, ?)",
+                         ((i + 1, model, str(i), vectors[i].tobytes(), args.dimensions)
+                          for i in range(args.vectors)))
+        conn.executemany("""
+            INSERT INTO embeddings (content_type, content_id, chunk_text, vector_id, model, generation)
+            VALUES ('principle', ?, '', ?, ?, 0)
+        """, ((str(i), i + 1, model) for i in range(args.vectors)))
+        conn.commit()
+        where, params = manager._model_filter(model, "e.model")
+
+        start = time.perf_counter()
+        manager.sidecar.build(conn, model, 0, where, params)
+        build = time.perf_counter() - start
+
+        queries = 10
+        start = time.perf_counter()
+        for i in range(queries):
+            manager.sidecar.search(conn, model, 0, where, params, vectors[i], 5)
+        mapped = (time.perf_counter() - start) / queries
+
+        start = time.perf_counter()
+        manager._scan_vectors(conn, 0, where, params, vectors[0], 5)
+        scan = time.perf_counter() - start
+        conn.close()
+
+    print(f"vectors:            {args.vectors} x {args.dimensions}")
+    print(f"sidecar build:      {build:10.2f} s")
+    print(f"mapped search:      {mapped * 1000:10.1f} ms")
+    print(f"table scan search:  {scan * 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark the stored size and decode cost of JSON versus float32 vectors.
+
+Encodes random vectors both ways and reports bytes per vector, the time to
+decode every blob and the time to score them all against a query, which is
+the work a search does per stored vector.
+
+Usage: python benchmarks/bench_vector_encoding.py [--vectors N] [--dimensions D]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.vectors import cosine_similarities, decode_vector, encode_vector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vectors', type=int, default=5000, help='Number of stored vectors')
+    parser.add_argument('--dimensions', type=int, default=2048, help='Vector dimensions')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dimensions)).astype(np.float32).tolist()
+    query = vectors[0]
+    json_blobs = [json.dumps(vector).encode('utf-8') for vector in vectors]
+    float32_blobs = [encode_vector(vector) for vector in vectors]
+
+    start = time.perf_counter()
+    for blob in json_blobs:
+        json.loads(blob.decode('utf-8'))
+    json_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for blob in float32_blobs:
+        decode_vector(blob)
+    float32_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cosine_similarities(query, float32_blobs)
+    float32_search = time.perf_counter() - start
+
+    json_bytes = sum(map(len, json_blobs)) / args.vectors
+    float32_bytes = sum(map(len, float32_blobs)) / args.vectors
+    print(f"vectors:            {args.vectors} x {args.dimensions}")
+    print(f"bytes per vector:   json {json_bytes:10.0f}   float32 {float32_bytes:10.0f}   "
+          f"({json_bytes / float32_bytes:.1f}x smaller)")
+    print(f"decode all:         json {json_decode * 1000:8.1f} ms   float32 {float32_decode * 1000:8.1f} ms   "
+          f"({json_decode / float32_decode:.0f}x faster)")
+    print(f"score all (float32): {float32_search * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
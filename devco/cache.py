@@ -0,0 +1,152 @@
+"""
+Content-addressed embedding cache for devco
+"""
+import sqlite3
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from .storage import DB_BUSY_TIMEOUT, DevDocStorage
+from .hashing import normalized_hash
+from .vectors import decode_json_vector, decode_vector, encode_vector
+
+
+DEFAULT_CACHE_MAX_MB = 256
+
+
+class EmbeddingCache:
+    """Persistent vector cache keyed by (model id, normalized text hash)
+
+    Vectors live in .devco/cache.db, separate from the embeddings search
+    table, so they survive re-indexing, model switches and re-creating
+    devco.db. The cache is bounded by size and evicts least recently used
+    entries first. Vectors are float32 blobs like in devco.db; entries
+    written as JSON text by older versions are still read.
+    """
+
+    def __init__(self, storage: DevDocStorage):
+        self.storage = storage
+        self.cache_file = storage.devco_dir / "cache.db"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the cache database, creating it on first use"""
+        self.storage.ensure_gitignore()
+        conn = sqlite3.connect(self.cache_file, timeout=DB_BUSY_TIMEOUT)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass  # Another connection is switching it; the mode is persistent
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON vectors(last_used)")
+        return conn
+
+    def max_bytes(self) -> int:
+        """Return the configured cache size budget in bytes"""
+        try:
+            config = self.storage.load_config()
+        except FileNotFoundError:
+            config = {}
+        return int(config.get('embedding_cache_max_mb', DEFAULT_CACHE_MAX_MB) * 1024 * 1024)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached vector for text, or None"""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors (or None) for each text, marking hits as used"""
+        hashes = [normalized_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        conn = self._connect()
+        unique = list(set(hashes))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for text_hash, blob in conn.execute(
+                    f"SELECT text_hash, embedding FROM vectors WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model] + batch):
+                found[text_hash] = decode_json_vector(blob) or decode_vector(blob).tolist()
+
+        if found:
+            now = time.time()
+            conn.executemany("UPDATE vectors SET last_used = ? WHERE model = ? AND text_hash = ?",
+                             [(now, model, text_hash) for text_hash in found])
+            conn.commit()
+        conn.close()
+
+        return [found.get(text_hash) for text_hash in hashes]
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Cache the vector for text"""
+        self.put_many(model, [(text, embedding)])
+
+    def put_many(self, model: str, items: List[Tuple[str, List[float]]]):
+        """Cache several (text, vector) pairs and evict if over budget"""
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for text, embedding in items:
+            blob = encode_vector(embedding)
+            rows.append((model, normalized_hash(text), blob, len(blob), now))
+
+        conn = self._connect()
+        conn.executemany("""
+            INSERT OR REPLACE INTO vectors (model, text_hash, embedding, size, last_used)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+        conn.close()
+
+        self.prune()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry counts and sizes, overall and per model"""
+        stats = {
+            "entries": 0,
+            "bytes": 0,
+            "max_bytes": self.max_bytes(),
+            "models": {}
+        }
+        if not self.cache_file.exists():
+            return stats
+
+        conn = self._connect()
+        for model, entries, size in conn.execute(
+                "SELECT model, COUNT(*), COALESCE(SUM(size), 0) FROM vectors GROUP BY model ORDER BY model"):
+            stats["models"][model] = {"entries": entries, "bytes": size}
+            stats["entries"] += entries
+            stats["bytes"] += size
+        conn.close()
+        return stats
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used entries until the cache fits max_bytes
+
+        Returns the number of entries evicted.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes()
+
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM vectors").fetchone()[0]
+        evicted = []
+        if total > max_bytes:
+            for model, text_hash, size in conn.execute(
+                    "SELECT model, text_hash, size FROM vectors ORDER BY last_used"):
+                if total <= max_bytes:
+                    break
+                evicted.append((model, text_hash))
+                total -= size
+            conn.executemany("DELETE FROM vectors WHERE model = ? AND text_hash = ?", evicted)
+            conn.commit()
+        conn.close()
+        return len(evicted)
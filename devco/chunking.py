@@ -0,0 +1,280 @@
+"""
+Text chunking for devco - splits content into pieces for embedding
+"""
+import io
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Projects initialized before chunkers could be chosen have no "chunker"
+# setting and were chunked by fixed windows; init() writes "markdown"
+DEFAULT_CHUNKER = "fixed"
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_CHUNK_OVERLAP = 50
+DEFAULT_CHUNK_UNIT = "chars"
+
+HEADING_PATTERN = re.compile(r'^ {0,3}#{1,6}(\s|$)')
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+LIST_ITEM_PATTERN = re.compile(r'^\s*([-*+]|\d+[.)])\s+')
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# Separators used when joining blocks and pieces into a chunk
+BLOCK_SEPARATOR = "\n\n"
+LINE_SEPARATOR = "\n"
+SENTENCE_SEPARATOR = " "
+
+Text = Union[str, Iterable[str]]
+
+
+def approx_tokens(text: str) -> int:
+    """Approximate a text's token count as its words plus punctuation marks"""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _lines(text: Text) -> Iterator[str]:
+    """Iterate over the lines of a string or of an iterable of lines"""
+    if isinstance(text, str):
+        text = io.StringIO(text)
+    for line in text:
+        yield line.rstrip("\n")
+
+
+class FixedChunker:
+    """Fixed-size overlapping character windows, backtracking to a space"""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP,
+                 unit: str = DEFAULT_CHUNK_UNIT):
+        if unit != "chars":
+            raise ValueError(f"The fixed chunker measures chunks in chars, not {unit}")
+        self.chunk_size = max(1, chunk_size)
+        self.overlap = max(0, min(overlap, self.chunk_size // 2))
+
+    def chunks(self, text: Text) -> Iterator[str]:
+        if not isinstance(text, str):
+            text = "\n".join(_lines(text))
+        chunk_size, overlap = self.chunk_size, self.overlap
+        if len(text) <= chunk_size:
+            yield text
+            return
+
+        start = 0
+        while start < len(text):
+            end = start + chunk_size
+            chunk = text[start:end]
+
+            # Try to break at word boundary
+            if end < len(text):
+                last_space = chunk.rfind(' ')
+                if last_space > max(0, chunk_size - 50):  # Don't break too early
+                    chunk = chunk[:last_space]
+                    end = start + last_space
+
+            yield chunk.strip()
+
+            # Move start position with overlap, always moving forward
+            start = max(end - overlap, start + 1)
+            if start >= len(text):
+                break
+
+
+class MarkdownChunker:
+    """Structure-aware chunker for markdown documents
+
+    Reads the text line by line in a single pass and packs whole blocks
+    (headings, paragraphs, list items and fenced code blocks) into chunks of
+    at most chunk_size, measured in characters or approximate tokens. A
+    heading starts a new chunk once the current one is half full, so short
+    sections share a chunk. Code blocks are only split between lines,
+    and paragraphs that do not fit are split between sentences, then words.
+    When a chunk fills up in the middle of prose, the next chunk repeats up
+    to overlap of its tail; code is never repeated.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP,
+                 unit: str = DEFAULT_CHUNK_UNIT):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk unit: {unit}")
+        self.chunk_size = max(1, chunk_size)
+        self.overlap = max(0, min(overlap, self.chunk_size // 2))
+        self.measure = len if unit == "chars" else approx_tokens
+
+    def _blocks(self, text: Text) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Yield (kind, text, joiner) blocks, splitting long code blocks between lines
+
+        The joiner is the separator that rejoins a piece of a split code
+        block to the piece before it, and None for every other block.
+        """
+        lines: List[str] = []
+        fence = None
+        code_size = 0
+        joiner = None
+
+        for line in _lines(text):
+            if fence:
+                lines.append(line)
+                code_size += self.measure(line) + 1
+                if line.strip().startswith(fence):
+                    yield "code", "\n".join(lines), joiner
+                    fence, lines, joiner = None, [], None
+                elif code_size >= self.chunk_size and len(lines) > 1:
+                    # Emit the finished lines of an oversized code block early
+                    yield "code", "\n".join(lines[:-1]), joiner
+                    lines, code_size, joiner = lines[-1:], self.measure(line) + 1, LINE_SEPARATOR
+                continue
+
+            fence_match = FENCE_PATTERN.match(line)
+            heading = HEADING_PATTERN.match(line)
+            item = LIST_ITEM_PATTERN.match(line)
+            if fence_match or heading or item or not line.strip():
+                if lines:
+                    yield self._kind(lines), "\n".join(lines), None
+                    lines = []
+                if fence_match:
+                    fence = fence_match.group(1)[0] * 3
+                    lines, code_size = [line], self.measure(line) + 1
+                elif heading:
+                    yield "heading", line.strip(), None
+                elif item:
+                    # A list item collects its continuation lines like a paragraph
+                    lines = [line]
+                continue
+
+            lines.append(line)
+
+        if lines:
+            yield ("code" if fence else self._kind(lines)), "\n".join(lines), joiner
+
+    def _kind(self, lines: List[str]) -> str:
+        return "list" if LIST_ITEM_PATTERN.match(lines[0]) else "paragraph"
+
+    def _pieces(self, kind: str, text: str) -> Iterator[Tuple[Optional[str], str]]:
+        """Yield (separator, text) pieces of a block that each fit in a chunk
+
+        The separator joins a piece to the previous piece of the same block;
+        it is None for a block's first piece.
+        """
+        if self.measure(text) <= self.chunk_size:
+            yield None, text
+            return
+
+        if kind == "code":
+            # A single line longer than a chunk; cut it by size
+            step = max(1, len(text) * self.chunk_size // self.measure(text))
+            for start in range(0, len(text), step):
+                yield ("" if start else None), text[start:start + step]
+            return
+
+        separator = None
+        for sentence in SENTENCE_END_PATTERN.split(text):
+            if self.measure(sentence) <= self.chunk_size:
+                parts = [sentence]
+            else:
+                parts = self._split_words(sentence)
+            for part in parts:
+                yield separator, part
+                separator = SENTENCE_SEPARATOR
+
+    def _split_words(self, text: str) -> List[str]:
+        """Split text between words into parts that each fit in a chunk"""
+        parts, current = [], ""
+        for word in text.split():
+            candidate = f"{current} {word}" if current else word
+            if current and self.measure(candidate) > self.chunk_size:
+                parts.append(current)
+                candidate = word
+            current = candidate
+        if current:
+            parts.append(current)
+        return parts
+
+    def _fill(self, current: str, separator: str, piece: str) -> Tuple[str, str]:
+        """Move the leading words of piece that still fit onto current"""
+        words = piece.split(" ")
+        taken = 0
+        for word in words:
+            candidate = f"{current}{separator if taken == 0 else SENTENCE_SEPARATOR}{word}"
+            if self.measure(candidate) > self.chunk_size:
+                break
+            current = candidate
+            taken += 1
+        return current, " ".join(words[taken:])
+
+    def _tail(self, text: str) -> str:
+        """Return the last whole words of text that fit in the overlap"""
+        if not self.overlap:
+            return ""
+        words = text.split(" ")
+        tail = ""
+        for word in reversed(words):
+            candidate = f"{word} {tail}" if tail else word
+            if self.measure(candidate) > self.overlap:
+                break
+            tail = candidate
+        return tail.strip()
+
+    def chunks(self, text: Text) -> Iterator[str]:
+        current = ""
+        current_kind = None
+        last_piece = ""
+
+        for kind, block, joiner in self._blocks(text):
+            # A heading starts a new chunk unless the current one is still
+            # small, so short sections are packed together
+            if kind == "heading" and self.measure(current) > self.chunk_size // 2:
+                yield current
+                current, current_kind = "", None
+
+            for separator, piece in self._pieces(kind, block):
+                if not piece.strip():
+                    continue
+                if separator is None:
+                    if joiner is not None:
+                        separator = joiner
+                    elif kind == current_kind == "list":
+                        separator = LINE_SEPARATOR
+                    else:
+                        separator = BLOCK_SEPARATOR
+                candidate = f"{current}{separator}{piece}" if current else piece
+                if current and self.measure(candidate) > self.chunk_size:
+                    if current_kind == "heading" and kind != "code":
+                        # Keep a heading together with the start of its text
+                        current, piece = self._fill(current, separator, piece)
+                    yield current
+                    # Repeat the end of the previous piece only from prose into prose
+                    prose = current_kind in ("paragraph", "list") and kind != "code"
+                    tail = self._tail(last_piece) if prose else ""
+                    candidate = f"{tail}{separator}{piece}" if tail else piece
+                    if self.measure(candidate) > self.chunk_size:
+                        candidate = piece
+                current, current_kind, last_piece = candidate, kind, piece
+
+        if current:
+            yield current
+
+
+CHUNKERS = {
+    "markdown": MarkdownChunker,
+    "fixed": FixedChunker,
+}
+
+
+def get_chunker(config: Dict[str, Any], chunk_size: Optional[int] = None,
+                overlap: Optional[int] = None):
+    """Build the chunker configured in config.json, optionally overriding its sizes"""
+    name = config.get('chunker', DEFAULT_CHUNKER)
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name}")
+    return CHUNKERS[name](
+        chunk_size if chunk_size is not None else config.get('chunk_size', DEFAULT_CHUNK_SIZE),
+        overlap if overlap is not None else config.get('chunk_overlap', DEFAULT_CHUNK_OVERLAP),
+        config.get('chunk_unit', DEFAULT_CHUNK_UNIT))
+
+
+def chunk_params(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe the chunking configuration that produced a set of chunks"""
+    return {
+        "chunker": config.get('chunker', DEFAULT_CHUNKER),
+        "chunk_size": config.get('chunk_size', DEFAULT_CHUNK_SIZE),
+        "chunk_overlap": config.get('chunk_overlap', DEFAULT_CHUNK_OVERLAP),
+        "chunk_unit": config.get('chunk_unit', DEFAULT_CHUNK_UNIT),
+    }
@@ -6,6 +6,19 @@ import argparse
 import sys
 
 
+# Edits `devco batch` accepts, with the options each needs; the interactive
+# forms would read from the batch's own stdin
+BATCH_COMMANDS = {
+    ('principles', 'add'): ('text',),
+    ('principles', 'rm'): (),
+    ('summary', 'replace'): ('text',),
+    ('section', 'add'): ('summary', 'detail'),
+    ('section', 'replace'): ('summary', 'detail'),
+    ('section', 'rm'): (),
+    ('section', 'rename'): (),
+}
+
+
 def create_parser():
     """Create the argument parser for devco"""
     parser = argparse.ArgumentParser(
@@ -55,20 +68,74 @@ def create_parser():
     rm_section = section_subparsers.add_parser('rm', help='Remove a section')
     rm_section.add_argument('name', help='Section name')
     
+    rename_section = section_subparsers.add_parser('rename', help='Rename a section')
+    rename_section.add_argument('name', help='Section name')
+    rename_section.add_argument('new_name', help='New section name')
+    
     # Special handling for 'devco section name' shorthand - we'll handle this in the main function
     
     # embed command
     embed_parser = subparsers.add_parser('embed', help='Generate embeddings for all content')
     embed_parser.add_argument('--model', help='Embedding model to use (also updates .env)')
+    embed_parser.add_argument('--full', action='store_true', help='Re-embed all content instead of only new or changed chunks')
+    embed_parser.add_argument('--resume', action='store_true', help='Finish the last interrupted or failed embedding job first')
+    embed_parser.add_argument('--status', action='store_true', help='Show the progress of the last embedding job')
+    
+    # cache commands
+    cache_parser = subparsers.add_parser('cache', help='Inspect and prune the embedding cache')
+    cache_subparsers = cache_parser.add_subparsers(dest='cache_action')
+    cache_subparsers.add_parser('stats', help='Show embedding cache size and entries per model')
+    prune_cache = cache_subparsers.add_parser('prune', help='Evict least recently used cache entries')
+    prune_cache.add_argument('--max-mb', type=float, help='Size to prune down to (default: embedding_cache_max_mb)')
     
     # query command
     query_parser = subparsers.add_parser('query', help='Query the devco content')
     query_parser.add_argument('text', help='Query text')
     query_parser.add_argument('--json', action='store_true', help='Output results in JSON format')
     query_parser.add_argument('--update-embeddings', action='store_true', help='Update embeddings for any missing content before querying')
+    query_parser.add_argument('--model', help='Search the vectors of another indexed embedding model')
+    
+    # models commands
+    models_parser = subparsers.add_parser('models', help='List and garbage-collect per-model vector sets')
+    models_subparsers = models_parser.add_subparsers(dest='models_action')
+    models_subparsers.add_parser('list', help='List the embedding models with stored vectors')
+    gc_models = models_subparsers.add_parser('gc', help='Drop stored vectors of models other than the current one')
+    gc_models.add_argument('models', nargs='*', help='Models to drop (default: every model except the current one)')
+    
+    # migrate command
+    migrate_parser = subparsers.add_parser('migrate', help='Upgrade devco.db to the current schema')
+    migrate_parser.add_argument('--dry-run', action='store_true', help='List pending migrations without applying them')
+    
+    # backend command
+    backend_parser = subparsers.add_parser('backend', help='Show or change where principles, summary and sections are stored')
+    backend_parser.add_argument('backend', nargs='?', choices=['json', 'sqlite'], help='Backend to move documents to')
+    
+    # export command
+    subparsers.add_parser('export', help='Write principles.json and summary.json from the stored documents')
+    
+    # recall command
+    recall_parser = subparsers.add_parser('recall', help='Compare quantized and prefix search against exact search (recall@k)')
+    recall_parser.add_argument('--k', type=int, default=10, help='Results compared per query (default: 10)')
+    recall_parser.add_argument('--queries', type=int, default=50, help='Stored vectors used as queries (default: 50)')
+    recall_parser.add_argument('--candidates', type=int, help='Candidates rescored at full precision (default: from config)')
+    recall_parser.add_argument('--prefix-dims', type=int, help='Leading dimensions of a prefix first stage (default: from config)')
+    
+    # stats command
+    stats_parser = subparsers.add_parser('stats', help='Show the size and health of the embeddings index and devco.db')
+    stats_parser.add_argument('--json', action='store_true', help='Output the statistics in JSON format')
+    
+    # compact command
+    subparsers.add_parser('compact', help='Delete orphaned vectors, vacuum devco.db and rebuild the search matrices')
+    
+    # flush command
+    subparsers.add_parser('flush', help='Write queued devco git commits now')
+    
+    # batch command
+    subparsers.add_parser('batch', help='Apply edits read from stdin, one command per line, as a single change')
     
     # Hidden embed-all command for background processing
     embed_all_parser = subparsers.add_parser('_embed-all', help=argparse.SUPPRESS)
+    subparsers.add_parser('_commit', help=argparse.SUPPRESS)
     
     return parser
 
@@ -102,18 +169,94 @@ def cmd_init():
         sys.exit(1)
 
 
+def format_size(size: int) -> str:
+    """Show a byte count in B, KB or MB"""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def cmd_batch(lines, storage=None):
+    """Apply edits read one per line as one write, one git commit and one embed request"""
+    import shlex
+    from .storage import DevDocStorage
+    
+    storage = storage or DevDocStorage()
+    if not storage.is_initialized():
+        print("devco not initialized. Run 'devco init' first.")
+        sys.exit(1)
+    
+    # Check every line before applying any, so a bad line changes nothing
+    parser = create_parser()
+    commands = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            words = shlex.split(line)
+            if words[0] == 'devco':
+                words = words[1:]
+            args = parser.parse_args(words)
+        except (ValueError, IndexError, SystemExit):
+            print(f"Line {number}: not a devco command: {line}")
+            sys.exit(1)
+        
+        action = getattr(args, f"{args.command}_action", None)
+        required = BATCH_COMMANDS.get((args.command, action))
+        if required is None:
+            command = f"{args.command} {action}" if action else args.command
+            print(f"Line {number}: '{command}' cannot be used in a batch")
+            sys.exit(1)
+        missing = [name for name in required if not getattr(args, name)]
+        if missing:
+            print(f"Line {number}: missing {', '.join('--' + name for name in missing)}")
+            sys.exit(1)
+        commands.append(args)
+    
+    with storage.transaction():
+        for args in commands:
+            run_command(args, storage)
+    print(f"✓ Applied {len(commands)} edits.")
+
+
 def main():
     """Main entry point for the devco CLI"""
     parser = create_parser()
     args = parser.parse_args()
     
+    if args.command is None:
+        # No command provided
+        parser.print_help()
+        sys.exit(1)
+    
+    from .storage import DevDocStorage
+    from .coordinator import CommitCoordinator
+    
+    # From a terminal, commits are left to a background committer so edits
+    # return at once; scripted runs commit what they queued before exiting
+    storage = DevDocStorage()
+    interactive = sys.stdin.isatty()
+    commits = CommitCoordinator(storage, background=interactive)
+    storage.queue_commits(commits)
+    try:
+        run_command(args, storage)
+    finally:
+        if not interactive and storage.is_initialized():
+            commits.flush()
+
+
+def run_command(args, storage=None):
+    """Run a parsed command, on the given storage instead of the current directory's"""
     if args.command == 'init':
         cmd_init()
     elif args.command == 'principles':
         from .storage import DevDocStorage
         from .principles import PrinciplesManager
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         principles_manager = PrinciplesManager(storage)
         
         if args.principles_action is None:
@@ -132,7 +275,7 @@ def main():
         from .storage import DevDocStorage
         from .summary import SummaryManager
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         summary_manager = SummaryManager(storage)
         
         if args.summary_action is None:
@@ -147,7 +290,7 @@ def main():
         from .storage import DevDocStorage
         from .sections import SectionsManager
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         sections_manager = SectionsManager(storage)
         
         if args.section_action is None:
@@ -157,6 +300,7 @@ def main():
             print("  devco section show <name>")  
             print("  devco section replace <name> [--summary TEXT] [--detail TEXT]")
             print("  devco section rm <name>")
+            print("  devco section rename <name> <new-name>")
             sys.exit(1)
         elif args.section_action == 'show':
             sections_manager.show_section(args.name)
@@ -172,11 +316,14 @@ def main():
                 sections_manager.replace_section(args.name)
         elif args.section_action == 'rm':
             sections_manager.remove_section(args.name)
+        elif args.section_action == 'rename':
+            sections_manager.rename_section(args.name, args.new_name)
     elif args.command == 'embed':
         from .storage import DevDocStorage
         from .embeddings import EmbeddingsManager
+        from .coordinator import EmbedCoordinator
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         if not storage.is_initialized():
             print("devco not initialized. Run 'devco init' first.")
             sys.exit(1)
@@ -210,14 +357,228 @@ def main():
                 f.writelines(env_lines)
             
             print(f"Updated embedding model to: {args.model}")
+            print("Vectors of other models are kept. Run 'devco models gc' to drop them.")
+        
+        if args.status:
+            job = embeddings_manager.journal.latest()
+            if job is None:
+                print("No embedding jobs have run yet.")
+                return
+            counts = job["counts"]
+            print(f"Embedding job {job['id']}: {job['status']} (model {job['model']})")
+            print(f"  started {job['started_at']}, finished {job['finished_at'] or '-'}")
+            print(f"  {counts['done']} done, {counts['pending']} pending, {counts['failed']} failed")
+            for failure in embeddings_manager.label_failures(job["failed"]):
+                print(f"  ✗ [{failure['content_type']}] {failure['content_id']} "
+                      f"after {failure['attempts']} attempts: {failure['error']}")
+            return
+        
+        coordinator = EmbedCoordinator(storage)
+        if coordinator.is_running():
+            print("Waiting for the background embedding run to finish...")
+        
+        with coordinator.exclusive():
+            print("Generating embeddings for all content...")
+            embeddings_manager.embed_all_content(full=args.full, resume=args.resume)
+    elif args.command == 'cache':
+        from .storage import DevDocStorage
+        from .cache import EmbeddingCache
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        cache = EmbeddingCache(storage)
+        
+        if args.cache_action == 'prune':
+            max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+            evicted = cache.prune(max_bytes)
+            print(f"Evicted {evicted} cache entries.")
+        
+        stats = cache.stats()
+        print(f"Embedding cache: {stats['entries']} entries, "
+              f"{stats['bytes'] / (1024 * 1024):.1f} MB of {stats['max_bytes'] / (1024 * 1024):.1f} MB")
+        for model, model_stats in stats["models"].items():
+            print(f"  {model}: {model_stats['entries']} entries, {model_stats['bytes'] / (1024 * 1024):.1f} MB")
+    elif args.command == 'models':
+        from .storage import DevDocStorage
+        from .embeddings import EmbeddingsManager
+        from .coordinator import EmbedCoordinator
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        embeddings_manager = EmbeddingsManager(storage)
+        model_sets = embeddings_manager.model_sets()
+        
+        if args.models_action == 'gc':
+            current = embeddings_manager.engine.settings()["model"]
+            if current in args.models:
+                print(f"Refusing to drop the current model {current}. Switch with 'devco embed --model' first.")
+                sys.exit(1)
+            models = args.models or [s["model"] for s in model_sets if not s["current"]]
+            with EmbedCoordinator(storage).exclusive():
+                removed = embeddings_manager.drop_model_sets(models)
+            print(f"Dropped {removed} vectors from {len(models)} models.")
+            return
+        
+        if not model_sets:
+            print("No vectors stored yet. Run 'devco embed' first.")
+            return
+        for model_set in model_sets:
+            marker = "*" if model_set["current"] else " "
+            print(f"{marker} {model_set['model']}: {model_set['chunks']} chunks, "
+                  f"{model_set['items']} items, {model_set['dimensions'] or '?'} dimensions")
+    elif args.command == 'migrate':
+        from .storage import DevDocStorage
+        from .migrations import MigrationRunner, LATEST_VERSION
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        conn = storage.get_db_connection(migrate=False)
+        runner = MigrationRunner(conn, storage.load_config())
+        plan = runner.plan()
+        print(f"devco.db schema version {runner.current_version()} (latest {LATEST_VERSION})")
+        if not plan:
+            print("No migrations pending.")
+        elif args.dry_run:
+            for step in plan:
+                rows = f" ({step['rows']} rows)" if step['rows'] is not None else ""
+                print(f"  would apply {step['version']}: {step['description']}{rows}")
+        else:
+            with storage.locked():
+                runner.run(lambda migration: print(f"  applying {migration.version}: {migration.description}"))
+            print(f"✓ Migrated to schema version {runner.current_version()}")
+        conn.close()
+    elif args.command == 'backend':
+        from .storage import DevDocStorage
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        if args.backend is None:
+            print(f"Documents are stored in {storage.document_backend()}")
+        elif args.backend == storage.document_backend():
+            print(f"Documents are already stored in {args.backend}")
+        else:
+            storage.set_document_backend(args.backend)
+            print(f"✓ Moved documents to {args.backend}")
+    elif args.command == 'export':
+        from .storage import DevDocStorage
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        storage.export_documents()
+        print("✓ Exported principles.json and summary.json")
+    elif args.command == 'batch':
+        cmd_batch(sys.stdin, storage)
+    elif args.command == 'recall':
+        from .storage import DevDocStorage
+        from .embeddings import EmbeddingsManager
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        report = EmbeddingsManager(storage).check_recall(args.k, args.queries, args.candidates,
+                                                         prefix_dims=args.prefix_dims)
+        if not report["modes"]:
+            print("No published embeddings to check. Run 'devco embed' first.")
+            return
+        
+        print(f"Recall@{report['k']} against exact search "
+              f"({report['queries']} queries, {report['candidates']} candidates rescored):")
+        for mode, result in report["modes"].items():
+            print(f"  {mode:12} {result['recall']:6.3f}   {result['ms']:8.2f} ms/query")
+        config = storage.load_config()
+        print(f"Current setting: vector_quantization = {config.get('vector_quantization', 'none')}, "
+              f"vector_prefix_dims = {config.get('vector_prefix_dims', 0)}")
+    elif args.command == 'stats':
+        from .storage import DevDocStorage
+        from .embeddings import EmbeddingsManager
         
-        print("Generating embeddings for all content...")
-        embeddings_manager.embed_all_content()
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        stats = EmbeddingsManager(storage).index_stats()
+        if args.json:
+            import json
+            print(json.dumps(stats, indent=2))
+            return
+        
+        print(f"Index generation {stats['generation']}, published {stats['published_at'] or '-'}")
+        for content_type, counts in stats["content_types"].items():
+            dimensions = "/".join(str(d) for d in counts["dimensions"]) or "?"
+            print(f"  {content_type:10} {counts['rows']:6} rows  {counts['owners']:5} items  {dimensions:>5} dims  "
+                  f"text {format_size(counts['text_bytes'])}, vectors {format_size(counts['vector_bytes'])}")
+        vectors = stats["vectors"]
+        print(f"Vectors: {vectors['rows']} stored ({format_size(vectors['bytes'])}), {vectors['unused']} unused")
+        print(f"Stale rows: {stats['stale_rows']} ({stats['queued_items']} items queued for embedding)")
+        print(f"Orphaned rows: {stats['orphaned_rows']}")
+        print(f"Unpublished rows: {stats['unpublished_rows']}")
+        database = stats["database"]
+        print(f"devco.db: {format_size(database['file_bytes'])} (WAL {format_size(database['wal_bytes'])}), "
+              f"{database['page_count']} pages of {database['page_size']} bytes, {database['freelist_count']} free")
+        print(f"Search matrices: {stats['sidecar']['files']} files, {format_size(stats['sidecar']['bytes'])}")
+        run = stats["last_run"]
+        if run is None:
+            print("Last embedding run: none")
+        else:
+            took = f"{run['seconds']:.0f}s" if run["seconds"] is not None else "-"
+            print(f"Last embedding run: job {run['id']} {run['status']}, {run['total']} chunks in {took} "
+                  f"(model {run['model']}, started {run['started_at']})")
+        if stats["orphaned_rows"] or vectors["unused"] or database["freelist_count"]:
+            print("Run 'devco compact' to reclaim space.")
+    elif args.command == 'compact':
+        from .storage import DevDocStorage
+        from .embeddings import EmbeddingsManager
+        from .coordinator import EmbedCoordinator
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        coordinator = EmbedCoordinator(storage)
+        if coordinator.is_running():
+            print("Waiting for the background embedding run to finish...")
+        with coordinator.exclusive():
+            result = EmbeddingsManager(storage).compact()
+        print(f"✓ Deleted {result['rows']} orphaned rows and {result['vectors']} unused vectors; "
+              f"devco.db {format_size(result['bytes_before'])} → {format_size(result['bytes_after'])}")
+    elif args.command == 'flush':
+        from .storage import DevDocStorage
+        from .coordinator import CommitCoordinator
+        
+        storage = storage or DevDocStorage()
+        if not storage.is_initialized():
+            print("devco not initialized. Run 'devco init' first.")
+            sys.exit(1)
+        
+        count = CommitCoordinator(storage, background=False).flush()
+        if count:
+            print(f"✓ Committed {count} queued edits")
+        else:
+            print("No queued edits to commit.")
     elif args.command == 'query':
         from .storage import DevDocStorage
         from .embeddings import EmbeddingsManager
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         if not storage.is_initialized():
             print("devco not initialized. Run 'devco init' first.")
             sys.exit(1)
@@ -225,19 +586,23 @@ def main():
         embeddings_manager = EmbeddingsManager(storage)
         
         # Check embedding status
-        status = embeddings_manager.check_embeddings_status()
+        model = getattr(args, 'model', None)
+        status = embeddings_manager.check_embeddings_status(model)
         
-        # Handle --update-embeddings flag
-        if hasattr(args, 'update_embeddings') and args.update_embeddings:
-            if status["missing_content"]:
+        # Handle --update-embeddings flag (only the configured model is updated)
+        if hasattr(args, 'update_embeddings') and args.update_embeddings and not model:
+            if status["missing_content"] or status["stale_content"]:
+                from .coordinator import EmbedCoordinator
+                
                 print("Updating embeddings for new content...")
-                embeddings_manager.embed_all_content()
+                with EmbedCoordinator(storage).exclusive():
+                    embeddings_manager.embed_all_content()
         
         # Check if we have any embeddings at all
         elif not status["has_embeddings"]:
             if hasattr(args, 'json') and args.json:
                 import json
-                print(json.dumps({"query": args.text, "results": [], "warning": "No embeddings found. Use --update-embeddings or run 'devco embed' first."}))
+                print(json.dumps({"query": args.text, "generation": status["generation"], "results": [], "warning": "No embeddings found. Use --update-embeddings or run 'devco embed' first."}))
             else:
                 print("Warning: No embeddings found. Use --update-embeddings or run 'devco embed' first.")
                 print("No similar content found.")
@@ -249,12 +614,20 @@ def main():
             if not (hasattr(args, 'json') and args.json):
                 print(f"Note: {missing_count} content items don't have embeddings yet. Use --update-embeddings to include them.")
         
-        results = embeddings_manager.search_similar_content(args.text, limit=5)
+        if status.get("stale_content") and not args.update_embeddings and not (hasattr(args, 'json') and args.json):
+            print(f"Note: {len(status['stale_content'])} content items changed since they were embedded: "
+                  f"{', '.join(status['stale_content'])}")
+        
+        if status.get("failed_content") and not (hasattr(args, 'json') and args.json):
+            print(f"Note: the last embedding run failed for {len(status['failed_content'])} content items. "
+                  f"See 'devco embed --status'.")
+        
+        generation, results = embeddings_manager.search_generation(args.text, limit=5, model=model)
         
         if not results:
             if hasattr(args, 'json') and args.json:
                 import json
-                print(json.dumps({"query": args.text, "results": []}))
+                print(json.dumps({"query": args.text, "generation": generation, "results": []}))
             else:
                 print("No similar content found.")
             return
@@ -263,6 +636,7 @@ def main():
             import json
             output = {
                 "query": args.text,
+                "generation": generation,
                 "results": results
             }
             print(json.dumps(output, indent=2))
@@ -272,20 +646,28 @@ def main():
             
             for i, result in enumerate(results, 1):
                 print(f"\n{i}. [{result['content_type']}] {result['content_id']} (similarity: {result['similarity']:.3f})")
+                for owner in result['owners'][1:]:
+                    print(f"   also in [{owner['content_type']}] {owner['content_id']}")
                 print(f"   {result['chunk_text'][:200]}{'...' if len(result['chunk_text']) > 200 else ''}")
     elif args.command == '_embed-all':
         # Hidden command for background embedding
         from .storage import DevDocStorage
         from .embeddings import EmbeddingsManager
+        from .coordinator import EmbedCoordinator
         
-        storage = DevDocStorage()
+        storage = storage or DevDocStorage()
         if storage.is_initialized():
             embeddings_manager = EmbeddingsManager(storage)
-            embeddings_manager.embed_all_content(silent=True)
-    else:
-        # No command provided
-        parser.print_help()
-        sys.exit(1)
+            EmbedCoordinator(storage).run(lambda: embeddings_manager.embed_dirty_content(silent=True))
+    elif args.command == '_commit':
+        # Hidden command for background git commits
+        from .storage import DevDocStorage
+        from .coordinator import CommitCoordinator
+        
+        storage = storage or DevDocStorage()
+        if storage.is_initialized():
+            committer = CommitCoordinator(storage)
+            committer.run(committer.commit_pending)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,220 @@
+"""
+Background coordinators for devco - one embed run and one committer per project at a time
+"""
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from .storage import DevDocStorage
+from .locking import lock, try_lock, unlock
+
+
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+
+
+class BackgroundCoordinator:
+    """Ensures at most one background runner of a kind per project and coalesces requests
+
+    request() records the request in .devco/<name>.request and starts a
+    detached `devco <command>` runner only if none holds .devco/<name>.lock.
+    The runner waits until no new request has arrived for the debounce
+    window, works once, and repeats while further requests came in during
+    the run, so a burst of edits costs one run plus at most one follow-up.
+    """
+
+    name = ""
+    command = ""
+    debounce_key = ""
+
+    def __init__(self, storage: DevDocStorage, debounce: Optional[float] = None):
+        self.storage = storage
+        storage.ensure_gitignore()
+        self.lock_file = storage.devco_dir / f"{self.name}.lock"
+        self.request_file = storage.devco_dir / f"{self.name}.request"
+        if debounce is None:
+            try:
+                debounce = storage.load_config().get(self.debounce_key, DEFAULT_DEBOUNCE_SECONDS)
+            except FileNotFoundError:
+                debounce = DEFAULT_DEBOUNCE_SECONDS
+        self.debounce = debounce
+
+    def is_running(self) -> bool:
+        """Return True if a runner currently holds the project lock"""
+        with open(self.lock_file, 'a') as handle:
+            if try_lock(handle):
+                unlock(handle)
+                return False
+            return True
+
+    def request(self) -> bool:
+        """Record a request and start a runner if none is active
+
+        Returns True if a new background runner was started.
+        """
+        self.request_file.write_text(str(time.time()))
+        if self.is_running():
+            return False
+
+        self._spawn()
+        return True
+
+    def _spawn(self):
+        """Start a detached runner"""
+        subprocess.Popen(
+            [sys.executable, "-m", "devco.cli", self.command],
+            cwd=self.storage.project_root,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True  # Detach from parent process
+        )
+
+    def _wait_for_quiet(self) -> bool:
+        """Wait until no request arrived for the debounce window
+
+        Returns False if there is no pending request.
+        """
+        while True:
+            try:
+                last_request = self.request_file.stat().st_mtime
+            except FileNotFoundError:
+                return False
+            remaining = last_request + self.debounce - time.time()
+            if remaining <= 0:
+                return True
+            time.sleep(remaining)
+
+    def run(self, work: Callable[[], object]) -> int:
+        """Serve pending requests while holding the project lock
+
+        Returns the number of runs performed; 0 if another runner holds the
+        lock and will pick the requests up instead.
+        """
+        runs = 0
+        while True:
+            with open(self.lock_file, 'a') as handle:
+                if not try_lock(handle):
+                    return runs
+                try:
+                    while self._wait_for_quiet():
+                        # Content is written before a request is recorded, so
+                        # clearing the request before working loses nothing
+                        self.request_file.unlink()
+                        work()
+                        runs += 1
+                finally:
+                    unlock(handle)
+
+            # A request may have landed after our last check but before the
+            # lock was released; its requester saw us running and did not spawn
+            if not self.request_file.exists():
+                return runs
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the project lock for a foreground run, waiting for any background run"""
+        with open(self.lock_file, 'a') as handle:
+            lock(handle)
+            try:
+                # The foreground run reads the latest content, so it serves
+                # any request still waiting for a background runner
+                if self.request_file.exists():
+                    self.request_file.unlink()
+                yield
+            finally:
+                unlock(handle)
+
+
+class EmbedCoordinator(BackgroundCoordinator):
+    """Ensures at most one embedding run per project and coalesces requests
+
+    Content changes call request(), which records the request in
+    .devco/embed.request and starts a detached `_embed-all` runner only if
+    none holds .devco/embed.lock, so a burst of edits costs one embedding
+    run plus at most one follow-up.
+    """
+
+    name = "embed"
+    command = "_embed-all"
+    debounce_key = "embed_debounce_seconds"
+
+    def can_embed(self) -> bool:
+        """Return True if background embedding is possible (API key or local model)"""
+        env_file = self.storage.devco_dir / ".env"
+        if env_file.exists():
+            with open(env_file) as f:
+                for line in f:
+                    if line.strip() and not line.startswith('#') and 'GOOGLE_API_KEY=' in line:
+                        if line.split('=', 1)[1].strip():
+                            return True
+
+        # The built-in local model needs no API key
+        from .local import is_local_model
+        return is_local_model(self.storage.load_config().get('embedding_model'))
+
+    def request(self) -> bool:
+        """Record that content changed and start a runner if none is active
+
+        Inside a storage transaction the request is made once, when the
+        transaction is written. Returns True if a new background runner was
+        started.
+        """
+        if self.storage.defer("embed", self.request):
+            return False
+        
+        if not self.can_embed():
+            return False
+
+        return super().request()
+
+
+class CommitCoordinator(BackgroundCoordinator):
+    """Queues devco git commits and writes them coalesced
+
+    Saves append their actions to .devco/commit.queue instead of committing.
+    With background set, a detached `_commit` runner commits the queue once
+    saves have paused for the debounce window, as one commit listing every
+    action. Otherwise the queue waits for flush().
+    """
+
+    name = "commit"
+    command = "_commit"
+    debounce_key = "git_commit_debounce_seconds"
+
+    def __init__(self, storage: DevDocStorage, debounce: Optional[float] = None, background: bool = True):
+        super().__init__(storage, debounce)
+        self.queue_file = storage.devco_dir / "commit.queue"
+        self.background = background
+
+    def add(self, actions: List[str]):
+        """Queue the actions of a save whose files are already written"""
+        with self.storage.locked():
+            with open(self.queue_file, 'a') as f:
+                f.writelines(" ".join(action.split()) + "\n" for action in actions)
+        if self.background:
+            self.request()
+
+    def pending(self) -> List[str]:
+        """Return the queued actions, oldest first"""
+        try:
+            with open(self.queue_file) as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def commit_pending(self) -> int:
+        """Commit every queued action as one commit, returning how many there were"""
+        with self.storage.locked():
+            actions = self.pending()
+            if actions:
+                self.storage.commit_actions(actions)
+                self.queue_file.unlink()
+            return len(actions)
+
+    def flush(self) -> int:
+        """Commit the queue now, waiting for a background commit in progress"""
+        if not self.queue_file.exists():
+            return 0
+        with self.exclusive():
+            return self.commit_pending()
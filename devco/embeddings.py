@@ -3,11 +3,50 @@ Embeddings management for devco using llm package
 """
 import json
 import sqlite3
-import subprocess
 import math
-import os
-from typing import List, Dict, Any, Optional, Tuple
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Set, Tuple
 from .storage import DevDocStorage
+from .engine import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, get_engine
+from .cache import EmbeddingCache
+from .hashing import content_hash, normalized_hash
+from .sidecar import DEFAULT_CANDIDATES, VectorSidecar
+from .vectors import QUANTIZATIONS, cosine_similarities, encode_vector
+from .journal import EmbedJournal
+from .chunking import chunk_params as describe_chunking, get_chunker
+
+DEFAULT_ITEM_RETRIES = 2
+ITEM_RETRY_DELAY = 2.0
+
+
+INSERT_EMBEDDING_SQL = """
+    INSERT INTO embeddings (content_type, content_id, chunk_text, vector_id,
+                            content_hash, model, chunk_params, generation)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_VECTOR_SQL = """
+    INSERT OR IGNORE INTO vectors (model, text_hash, embedding, dimensions)
+    VALUES (?, ?, ?, ?)
+"""
+
+# A full re-embed overwrites the stored vector, keeping its id
+REPLACE_VECTOR_SQL = """
+    INSERT INTO vectors (model, text_hash, embedding, dimensions)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (model, text_hash) DO UPDATE
+    SET embedding = excluded.embedding, dimensions = excluded.dimensions
+"""
+
+# Vectors no embeddings row refers to any more
+DELETE_UNUSED_VECTORS_SQL = "DELETE FROM vectors WHERE id NOT IN (SELECT vector_id FROM embeddings)"
+
+PUBLISHED_GENERATION_SQL = "SELECT COALESCE(MAX(generation), 0) FROM embedding_generations"
+
+# The token names one publish, so a search matrix is never reused for
+# another index that got the same generation number
+INSERT_GENERATION_SQL = "INSERT INTO embedding_generations (generation, job_id, token) VALUES (?, ?, ?)"
 
 
 class EmbeddingsManager:
@@ -15,101 +54,320 @@ class EmbeddingsManager:
     
     def __init__(self, storage: DevDocStorage):
         self.storage = storage
+        self.engine = get_engine(storage)
+        self.cache = EmbeddingCache(storage)
+        self.journal = EmbedJournal(storage)
+        self.sidecar = VectorSidecar(storage)
     
-    def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks for embedding"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None,
+                   overlap: Optional[int] = None) -> List[str]:
+        """Split text into chunks for embedding with the configured chunker
         
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            
-            # Try to break at word boundary
-            if end < len(text):
-                last_space = chunk.rfind(' ')
-                if last_space > chunk_size - 50:  # Don't break too early
-                    chunk = chunk[:last_space]
-                    end = start + last_space
-            
-            chunks.append(chunk.strip())
-            
-            # Move start position with overlap
-            start = end - overlap
-            if start >= len(text):
-                break
-        
-        return chunks
+        Sizes default to chunk_size and chunk_overlap from config.json.
+        """
+        chunker = get_chunker(self.engine.settings()["config"], chunk_size, overlap)
+        return list(chunker.chunks(text))
     
-    def generate_embedding(self, text: str) -> Optional[List[float]]:
-        """Generate embedding for text using llm command"""
+    def chunk_params(self) -> str:
+        """Describe the chunking parameters used for stored chunks"""
+        return json.dumps(describe_chunking(self.engine.settings()["config"]), sort_keys=True)
+    
+    def generate_embedding(self, text: str, model: Optional[str] = None) -> Optional[List[float]]:
+        """Generate embedding for text, using the cache before the llm engine
+        
+        Uses the configured model unless another model id is given.
+        """
         try:
-            config = self.storage.load_config()
-            model = config.get('embedding_model', 'gemini-embedding-exp-03-07-2048')
-            
-            # Load environment variables from .env file
-            env_file = self.storage.devco_dir / ".env"
-            env_vars = os.environ.copy()
-            
-            if env_file.exists():
-                with open(env_file) as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            env_vars[key.strip()] = value.strip()
-            
-            # Set the Gemini API key for llm if available
-            if 'GOOGLE_API_KEY' in env_vars:
-                env_vars['LLM_GEMINI_KEY'] = env_vars['GOOGLE_API_KEY']
-            
-            # Use llm embed command
-            result = subprocess.run([
-                'llm', 'embed', '-c', text, '-m', model
-            ], capture_output=True, text=True, timeout=30, env=env_vars)
-            
-            if result.returncode != 0:
-                print(f"Error generating embedding: {result.stderr}")
-                return None
-            
-            # Parse the JSON array output
-            embedding_str = result.stdout.strip()
-            embedding = json.loads(embedding_str)
-            
+            model = model or self.engine.settings()["model"]
+            embedding = self.cache.get(model, text)
+            if embedding is None:
+                embedding = self.engine.embed(text, model)
+                self.cache.put(model, text, embedding)
             return embedding
         
-        except subprocess.TimeoutExpired:
-            print("Embedding generation timed out")
-            return None
-        except json.JSONDecodeError:
-            print(f"Failed to parse embedding output: {result.stdout}")
-            return None
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return None
     
     def store_embedding(self, content_type: str, content_id: str, chunk_text: str, embedding: List[float]):
-        """Store embedding in the database"""
+        """Store embedding in the database, visible to readers straight away"""
         try:
             conn = self.storage.get_db_connection()
             
-            # Convert embedding to blob
-            embedding_blob = json.dumps(embedding).encode('utf-8')
-            
-            conn.execute("""
-                INSERT INTO embeddings (content_type, content_id, chunk_text, embedding)
-                VALUES (?, ?, ?, ?)
-            """, (content_type, content_id, chunk_text, embedding_blob))
+            model = self.engine.settings()["model"]
+            text_hash = normalized_hash(chunk_text)
+            vector_id = self._store_vectors(conn, model, {text_hash: embedding})[text_hash]
+            conn.execute(INSERT_EMBEDDING_SQL, self._embedding_row(
+                content_type, content_id, chunk_text, vector_id,
+                model, self.chunk_params(), self._publish_change(conn)))
             
             conn.commit()
             conn.close()
+            self.refresh_sidecar(model)
         
         except Exception as e:
             print(f"Error storing embedding: {e}")
     
+    def embed_texts(self, texts: List[str], model: str, use_cache: bool = True
+                    ) -> Tuple[List[Optional[List[float]]], List[Dict[str, Any]], int]:
+        """Embed texts, serving what we can from the cache
+        
+        With use_cache=False every text goes to the provider and the fresh
+        vectors replace the cached ones.
+        
+        Returns the per-text vectors (or None), the provider failures indexed
+        into texts, and the number of cache hits.
+        """
+        vectors = self.cache.get_many(model, texts) if use_cache else [None] * len(texts)
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        
+        fresh, failures = self.engine.embed_many([texts[i] for i in misses], model)
+        for i, vector in zip(misses, fresh):
+            vectors[i] = vector
+        self.cache.put_many(model, [(texts[i], vector) for i, vector in zip(misses, fresh) if vector])
+        
+        failures = [{"index": misses[f["index"]], "error": f["error"]} for f in failures]
+        return vectors, failures, len(texts) - len(misses)
+    
+    def _embedding_row(self, content_type: str, content_id: str, chunk_text: str,
+                       vector_id: int, model: str, chunk_params: str,
+                       generation: int) -> Tuple:
+        """Build the values for INSERT_EMBEDDING_SQL"""
+        return (content_type, content_id, chunk_text, vector_id,
+                content_hash(chunk_text), model, chunk_params, generation)
+    
+    def _vector_ids(self, conn: sqlite3.Connection, model: str, text_hashes: Set[str]) -> Dict[str, int]:
+        """Return the ids of stored vectors for normalized text hashes"""
+        ids = {}
+        for text_hash in text_hashes:
+            row = conn.execute("SELECT id FROM vectors WHERE model = ? AND text_hash = ?",
+                               (model, text_hash)).fetchone()
+            if row:
+                ids[text_hash] = row[0]
+        return ids
+    
+    def _store_vectors(self, conn: sqlite3.Connection, model: str,
+                       vectors: Dict[str, List[float]], replace: bool = False) -> Dict[str, int]:
+        """Store vectors keyed by normalized text hash, returning their ids
+        
+        A vector already stored for the same model and text is reused, or
+        overwritten in place with replace=True.
+        """
+        conn.executemany(REPLACE_VECTOR_SQL if replace else INSERT_VECTOR_SQL, [(model, text_hash, encode_vector(vector), len(vector))
+                                             for text_hash, vector in vectors.items()])
+        return self._vector_ids(conn, model, set(vectors))
+    
+    def published_generation(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """Return the index generation readers currently see"""
+        if conn is not None:
+            return conn.execute(PUBLISHED_GENERATION_SQL).fetchone()[0]
+        conn = self.storage.get_db_connection()
+        generation = conn.execute(PUBLISHED_GENERATION_SQL).fetchone()[0]
+        conn.close()
+        return generation
+    
+    def _model_filter(self, model: Optional[str], column: str = "model") -> Tuple[str, Tuple]:
+        """Return a WHERE clause and parameters selecting one model's vector set
+        
+        Rows stored before vectors were tagged with a model belong to the
+        configured model.
+        """
+        configured = self.engine.settings()["model"]
+        model = model or configured
+        if model == configured:
+            return f"({column} = ? OR {column} IS NULL)", (model,)
+        return f"{column} = ?", (model,)
+    
+    def model_sets(self) -> List[Dict[str, Any]]:
+        """Summarize the published vector set of every model in the index"""
+        configured = self.engine.settings()["model"]
+        conn = self.storage.get_db_connection()
+        rows = conn.execute(f"""
+            SELECT COALESCE(e.model, ?), MAX(v.dimensions), COUNT(*), COUNT(DISTINCT e.vector_id),
+                   COUNT(DISTINCT e.content_type || '/' || e.content_id), MAX(e.created_at)
+            FROM embeddings e JOIN vectors v ON v.id = e.vector_id
+            WHERE e.generation <= ({PUBLISHED_GENERATION_SQL})
+            GROUP BY COALESCE(e.model, ?) ORDER BY 1
+        """, (configured, configured)).fetchall()
+        conn.close()
+        return [{"model": model, "dimensions": dimensions, "chunks": chunks, "vectors": vectors,
+                 "items": items, "updated_at": updated_at, "current": model == configured}
+                for model, dimensions, chunks, vectors, items, updated_at in rows]
+    
+    def drop_model_sets(self, models: List[str]) -> int:
+        """Delete the stored vectors of the given models, returning the rows removed"""
+        conn = self.storage.get_db_connection()
+        removed = 0
+        for model in models:
+            where, params = self._model_filter(model)
+            removed += conn.execute(f"DELETE FROM embeddings WHERE {where}", params).rowcount
+            self.sidecar.remove(model)
+        conn.execute(DELETE_UNUSED_VECTORS_SQL)
+        self._publish_change(conn)
+        conn.commit()
+        conn.close()
+        self.refresh_sidecar()
+        return removed
+    
+    def has_unpublished_rows(self) -> bool:
+        """Return True if a run left rows that were never published"""
+        conn = self.storage.get_db_connection()
+        row = conn.execute(f"SELECT 1 FROM embeddings WHERE generation > ({PUBLISHED_GENERATION_SQL}) LIMIT 1").fetchone()
+        conn.close()
+        return row is not None
+    
+    def publish(self, orphans: List[int], job_id: Optional[int] = None,
+                held: Optional[Set[Tuple[str, str]]] = None) -> int:
+        """Make the rows built for the next generation visible and drop orphans
+        
+        Both happen in one transaction, so a reader sees either the previous
+        generation or the new one, never a mix or a partly rebuilt index.
+        Items in held had chunks fail: the rows built for them are dropped
+        instead, so they keep their previous rows until a run succeeds (the
+        caller leaves their rows out of orphans). Vectors left without any
+        row are dropped too. Returns the published generation.
+        """
+        conn = self.storage.get_db_connection()
+        generation = self.published_generation(conn) + 1
+        conn.executemany("DELETE FROM embeddings WHERE generation >= ? AND content_type = ? AND content_id = ?",
+                         [(generation, content_type, content_id) for content_type, content_id in held or ()])
+        conn.executemany("DELETE FROM embeddings WHERE id = ?", [(row_id,) for row_id in orphans])
+        conn.execute(DELETE_UNUSED_VECTORS_SQL)
+        conn.execute(INSERT_GENERATION_SQL, (generation, job_id, uuid.uuid4().hex))
+        conn.commit()
+        conn.close()
+        self.refresh_sidecar()
+        return generation
+    
+    def _publish_change(self, conn: sqlite3.Connection) -> int:
+        """Publish a change made to the published rows as a new generation
+        
+        Runs in the caller's transaction, which makes the change. Rows of an
+        unfinished run move up with the new generation, so they stay
+        unpublished. Returns the new generation.
+        """
+        generation = self.published_generation(conn) + 1
+        conn.execute("UPDATE embeddings SET generation = generation + 1 WHERE generation >= ?", (generation,))
+        conn.execute(INSERT_GENERATION_SQL, (generation, None, uuid.uuid4().hex))
+        return generation
+    
+    def refresh_sidecar(self, model: Optional[str] = None):
+        """Write the search matrix of a model's published vectors ahead of the next query"""
+        model = model or self.engine.settings()["model"]
+        where, params = self._model_filter(model, "e.model")
+        conn = self.storage.get_db_connection()
+        try:
+            conn.execute("BEGIN")
+            self.sidecar.build(conn, model, self.published_generation(conn), where, params)
+        except (OSError, ValueError):
+            pass  # Searches rebuild it or fall back to reading the vectors table
+        finally:
+            conn.rollback()
+            conn.close()
+    
+    def _orphaned_rows(self, conn: sqlite3.Connection) -> List[int]:
+        """Ids of published rows, of any model, whose content item no longer exists"""
+        items = set(self.content_labels())
+        rows = conn.execute(f"""
+            SELECT id, content_type, content_id FROM embeddings
+            WHERE generation <= ({PUBLISHED_GENERATION_SQL})
+        """)
+        return [row_id for row_id, content_type, content_id in rows if (content_type, content_id) not in items]
+    
+    def index_stats(self) -> Dict[str, Any]:
+        """Report the size and health of the embeddings index and devco.db
+        
+        Per content type, counts published rows of every model, the items
+        owning them, their vector dimensions and the bytes of chunk text and
+        vectors (a vector shared by several rows counts for each). Stale
+        rows are published rows of the current model that the next run will
+        replace, because their item changed; orphaned rows belong to items
+        that no longer exist. Also reports database page usage, the search matrix
+        files and the timing of the last embedding run.
+        """
+        conn = self.storage.get_db_connection()
+        generation, published_at = conn.execute(
+            "SELECT generation, published_at FROM embedding_generations ORDER BY generation DESC LIMIT 1"
+        ).fetchone() or (0, None)
+        content_types = {}
+        for content_type, rows, owners, dimensions, text_bytes, vector_bytes in conn.execute("""
+            SELECT e.content_type, COUNT(*), COUNT(DISTINCT e.content_id), GROUP_CONCAT(DISTINCT v.dimensions),
+                   SUM(LENGTH(CAST(e.chunk_text AS BLOB))), SUM(LENGTH(v.embedding))
+            FROM embeddings e JOIN vectors v ON v.id = e.vector_id
+            WHERE e.generation <= ?
+            GROUP BY e.content_type ORDER BY e.content_type
+        """, (generation,)):
+            content_types[content_type] = {
+                "rows": rows,
+                "owners": owners,
+                "dimensions": sorted(int(d) for d in dimensions.split(",")) if dimensions else [],
+                "text_bytes": text_bytes or 0,
+                "vector_bytes": vector_bytes or 0
+            }
+        vectors, vector_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(embedding)), 0) FROM vectors").fetchone()
+        unused = conn.execute(
+            "SELECT COUNT(*) FROM vectors WHERE id NOT IN (SELECT vector_id FROM embeddings)").fetchone()[0]
+        unpublished = [row[0] for row in conn.execute("SELECT id FROM embeddings WHERE generation > ?", (generation,))]
+        orphaned = self._orphaned_rows(conn)
+        last_run = None
+        job = conn.execute("""
+            SELECT id, status, model, total, started_at, finished_at,
+                   (julianday(finished_at) - julianday(started_at)) * 86400
+            FROM embed_jobs ORDER BY id DESC LIMIT 1
+        """).fetchone()
+        if job:
+            last_run = dict(zip(("id", "status", "model", "total", "started_at", "finished_at", "seconds"), job))
+        conn.close()
+        
+        # Published rows a run would replace, other than those of deleted items
+        stale = set(self.plan_reindex()["orphans"]) - set(orphaned) - set(unpublished)
+        
+        return {
+            "generation": generation,
+            "published_at": published_at,
+            "content_types": content_types,
+            "vectors": {"rows": vectors, "bytes": vector_bytes, "unused": unused},
+            "stale_rows": len(stale),
+            "orphaned_rows": len(orphaned),
+            "unpublished_rows": len(unpublished),
+            "queued_items": len(self.storage.load_dirty_items()[1]),
+            "database": self.storage.database_stats(),
+            "sidecar": self.sidecar.usage(),
+            "last_run": last_run
+        }
+    
+    def compact(self) -> Dict[str, Any]:
+        """Delete orphaned rows and unused vectors, vacuum devco.db and rebuild the search matrices
+        
+        Rows of an unpublished run are kept for it to resume, and stale rows
+        keep serving queries until the next run replaces them. Callers should
+        hold the embed lock so no run publishes meanwhile. Returns the rows
+        and vectors deleted and the size of devco.db before and after.
+        """
+        before = self.storage.database_stats()
+        conn = self.storage.get_db_connection()
+        orphaned = self._orphaned_rows(conn)
+        conn.executemany("DELETE FROM embeddings WHERE id = ?", [(row_id,) for row_id in orphaned])
+        vectors = conn.execute(DELETE_UNUSED_VECTORS_SQL).rowcount
+        if orphaned:
+            self._publish_change(conn)
+        conn.commit()
+        conn.close()
+        
+        self.sidecar.clear()
+        self.storage.vacuum()
+        for model_set in self.model_sets():
+            self.refresh_sidecar(model_set["model"])
+        
+        after = self.storage.database_stats()
+        return {
+            "rows": len(orphaned),
+            "vectors": vectors,
+            "bytes_before": before["file_bytes"] + before["wal_bytes"],
+            "bytes_after": after["file_bytes"] + after["wal_bytes"]
+        }
+    
     def compute_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Compute cosine similarity between two vectors"""
         try:
@@ -129,145 +387,499 @@ class EmbeddingsManager:
             print(f"Error computing similarity: {e}")
             return 0.0
     
-    def embed_all_content(self, silent=False):
-        """Generate embeddings for all content in storage"""
-        try:
-            # Clear existing embeddings
-            conn = self.storage.get_db_connection()
-            conn.execute("DELETE FROM embeddings")
-            conn.commit()
-            conn.close()
-            
-            # Embed principles
-            principles = self.storage.load_principles()
-            for i, principle in enumerate(principles):
-                chunks = self.chunk_text(principle)
-                for j, chunk in enumerate(chunks):
-                    embedding = self.generate_embedding(chunk)
-                    if embedding:
-                        self.store_embedding("principle", f"{i+1}", chunk, embedding)
-            
-            # Embed summary and sections
-            summary_data = self.storage.load_summary()
-            
-            # Embed main summary
-            if summary_data.get('summary'):
-                chunks = self.chunk_text(summary_data['summary'])
-                for j, chunk in enumerate(chunks):
-                    embedding = self.generate_embedding(chunk)
-                    if embedding:
-                        self.store_embedding("summary", "main", chunk, embedding)
+    def collect_chunks(self, only: Optional[Set[Tuple[str, str]]] = None) -> List[Tuple[str, str, str]]:
+        """Collect (content_type, content_id, chunk_text) for content in storage
+        
+        Principles and sections are identified by their stable ids, so
+        renumbering or renaming them does not change their content ids.
+        Pass a set of (content_type, content_id) items to only chunk those.
+        """
+        chunks = []
+        
+        def add(content_type: str, content_id: str, text: str, chunked: bool = True):
+            if only is None or (content_type, content_id) in only:
+                for chunk in (self.chunk_text(text) if chunked else [text]):
+                    chunks.append((content_type, content_id, chunk))
+        
+        # Principles
+        for record in self.storage.load_principle_records():
+            add("principle", record["id"], record["text"])
+        
+        summary_data = self.storage.load_summary()
+        
+        # Main summary
+        if summary_data.get('summary'):
+            add("summary", "main", summary_data['summary'])
+        
+        # Sections
+        sections = summary_data.get('sections', {})
+        for section_data in sections.values():
+            if section_data.get('summary'):
+                add("section", section_data['id'], section_data['summary'], chunked=False)
+            
+            if section_data.get('detail'):
+                add("section", f"{section_data['id']}_detail", section_data['detail'])
+        
+        return chunks
+    
+    def label_failures(self, failures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Show journal failures by label, keeping the stable id as item_id"""
+        labels = self.content_labels()
+        return [dict(failure, item_id=failure["content_id"],
+                     content_id=labels.get((failure["content_type"], failure["content_id"]), failure["content_id"]))
+                for failure in failures]
+    
+    def content_labels(self) -> Dict[Tuple[str, str], str]:
+        """Map (content_type, content_id) items to the names users see
+        
+        Principles are shown by their current number and sections by their
+        current name, with a "_detail" suffix for section details.
+        """
+        labels = {}
+        for i, record in enumerate(self.storage.load_principle_records()):
+            labels[("principle", record["id"])] = f"{i+1}"
+        
+        summary_data = self.storage.load_summary()
+        if summary_data.get('summary'):
+            labels[("summary", "main")] = "main"
+        for section_name, section_data in summary_data.get('sections', {}).items():
+            labels[("section", section_data['id'])] = section_name
+            labels[("section", f"{section_data['id']}_detail")] = f"{section_name}_detail"
+        return labels
+    
+    def plan_reindex(self, full: bool = False,
+                     only: Optional[Set[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """Work out which chunks need embedding and which stored rows are orphaned
+        
+        Rows are reused when their content item, text hash, model and chunking
+        parameters all match a current chunk. Only the configured model's
+        vector set is considered; other models' sets are left alone. Pass
+        full=True to reuse nothing, or a set of (content_type, content_id)
+        items to only plan those. Owners maps each orphan to its item.
+        """
+        model = self.engine.settings()["model"]
+        chunk_params = self.chunk_params()
+        chunks = self.collect_chunks(only)
+        
+        # Index existing rows that are still valid for this model and chunking
+        conn = self.storage.get_db_connection()
+        where, params = self._model_filter(model)
+        query = f"SELECT id, content_type, content_id, content_hash, model, chunk_params FROM embeddings WHERE {where}"
+        if only is None:
+            stored = conn.execute(query + " ORDER BY id", params).fetchall()
+        else:
+            stored = []
+            for item in only:
+                stored.extend(conn.execute(query + " AND content_type = ? AND content_id = ?", params + item))
+            stored.sort()
+        existing: Dict[Tuple[str, str, str], List[int]] = {}
+        orphans = []
+        owners = {}
+        for row_id, content_type, content_id, row_hash, row_model, row_params in stored:
+            owners[row_id] = (content_type, content_id)
+            if full or row_model != model or row_params != chunk_params or row_hash is None:
+                orphans.append(row_id)
+            else:
+                existing.setdefault((content_type, content_id, row_hash), []).append(row_id)
+        conn.close()
+        
+        pending = []
+        unchanged = 0
+        for content_type, content_id, chunk_text in chunks:
+            chunk_hash = content_hash(chunk_text)
+            row_ids = existing.get((content_type, content_id, chunk_hash))
+            if row_ids:
+                # Keep the newest row when an unpublished run left a duplicate
+                row_ids.pop()
+                unchanged += 1
+            else:
+                pending.append((content_type, content_id, chunk_text, chunk_hash))
+        for row_ids in existing.values():
+            orphans.extend(row_ids)
+        
+        return {
+            "model": model,
+            "chunk_params": chunk_params,
+            "pending": pending,
+            "orphans": orphans,
+            "owners": {row_id: owners[row_id] for row_id in orphans},
+            "unchanged": unchanged
+        }
+    
+    def _run_job(self, job_id: int, model: str, chunk_params: str, result: Dict[str, Any],
+                 full: bool = False):
+        """Embed a job's remaining items, retrying failed ones with backoff
+        
+        Items are processed in slices; each slice's embeddings rows and
+        journal updates are committed together, so an interrupted run keeps
+        everything it finished. Rows are written to the generation after the
+        published one, so readers do not see them until publish().
+        
+        Chunks whose normalized text already has a vector for this model, or
+        repeats another chunk in the slice, share that vector and cost no
+        embedding call. With full=True stored and cached vectors are ignored:
+        each distinct text is sent to the provider once per run and its
+        stored vector overwritten.
+        """
+        config = self.engine.settings()["config"]
+        slice_size = (config.get('embedding_batch_size', DEFAULT_BATCH_SIZE) *
+                      max(1, config.get('embedding_concurrency', DEFAULT_CONCURRENCY)))
+        retries = config.get('embedding_item_retries', DEFAULT_ITEM_RETRIES)
+        generation = self.published_generation() + 1
+        refreshed = set()
+        
+        for attempt in range(retries + 1):
+            items = self.journal.remaining_items(job_id)
+            if not items:
+                break
+            if attempt:
+                time.sleep(ITEM_RETRY_DELAY * (2 ** (attempt - 1)))
             
-            # Embed sections
-            sections = summary_data.get('sections', {})
-            for section_name, section_data in sections.items():
-                # Embed section summary
-                if section_data.get('summary'):
-                    embedding = self.generate_embedding(section_data['summary'])
-                    if embedding:
-                        self.store_embedding("section", section_name, section_data['summary'], embedding)
+            for start in range(0, len(items), slice_size):
+                batch = items[start:start + slice_size]
+                hashes = [normalized_hash(item[3]) for item in batch]
                 
-                # Embed section detail
-                if section_data.get('detail'):
-                    chunks = self.chunk_text(section_data['detail'])
-                    for j, chunk in enumerate(chunks):
-                        embedding = self.generate_embedding(chunk)
-                        if embedding:
-                            self.store_embedding("section", f"{section_name}_detail", chunk, embedding)
-            
+                # Embed each distinct text that has no stored vector yet once
+                conn = self.storage.get_db_connection()
+                vector_ids = self._vector_ids(conn, model, set(hashes))
+                conn.close()
+                if full:
+                    vector_ids = {text_hash: vector_id for text_hash, vector_id in vector_ids.items()
+                                  if text_hash in refreshed}
+                texts = {}
+                for text_hash, item in zip(hashes, batch):
+                    if text_hash not in vector_ids:
+                        texts.setdefault(text_hash, item[3])
+                vectors, failures, cached = self.embed_texts(list(texts.values()), model, use_cache=not full)
+                errors = {list(texts)[failure["index"]]: failure["error"] for failure in failures}
+                
+                conn = self.storage.get_db_connection()
+                stored = self._store_vectors(
+                    conn, model, {text_hash: vector for text_hash, vector in zip(texts, vectors) if vector},
+                    replace=full)
+                vector_ids.update(stored)
+                refreshed.update(stored)
+                
+                rows = []
+                done = []
+                failed = []
+                for text_hash, (position, content_type, content_id, chunk_text, _) in zip(hashes, batch):
+                    if text_hash in vector_ids:
+                        rows.append(self._embedding_row(content_type, content_id, chunk_text,
+                                                        vector_ids[text_hash], model, chunk_params, generation))
+                        done.append(position)
+                    else:
+                        failed.append((position, errors.get(text_hash, "no embedding returned")))
+                
+                conn.executemany(INSERT_EMBEDDING_SQL, rows)
+                self.journal.mark_done(conn, job_id, done)
+                self.journal.mark_failed(conn, job_id, failed)
+                conn.commit()
+                conn.close()
+                
+                result["embedded"] += len(rows)
+                result["cached"] += cached
+                result["shared"] += len(rows) - sum(1 for vector in vectors if vector)
+    
+    def embed_dirty_content(self, silent=False) -> Dict[str, Any]:
+        """Embed only the content items queued as changed by write paths"""
+        return self.embed_all_content(silent=silent, only_dirty=True)
+    
+    def embed_all_content(self, silent=False, full=False, resume=False,
+                          only_dirty=False) -> Dict[str, Any]:
+        """Bring the embeddings index up to date with all content in storage
+        
+        Only chunks whose text hash, model or chunking parameters are not
+        already in the index are sent to the provider. New rows are built
+        into the next index generation and published together with the
+        deletion of rows that no longer match any chunk, in one transaction,
+        so queries keep seeing the previous complete index until the swap.
+        Pass full=True to re-embed everything, bypassing stored and cached
+        vectors.
+        
+        Each run is recorded in the job journal. Progress is committed as it
+        goes, so a restarted run only embeds what is still missing, and
+        resume=True first finishes the remaining items of the last
+        unfinished job. Failed chunks are retried with backoff and reported.
+        
+        With only_dirty=True just the items in the dirty queue are planned,
+        so the cost scales with the edit rather than the corpus. Either way
+        the queue entries this run covered are cleared, except for items
+        that failed.
+        
+        Returns a dict with the number of chunks embedded (of which "cached"
+        came from the embedding cache without an API call), kept unchanged and
+        deleted, a list of failures naming the content item and error, and
+        the index generation readers see afterwards.
+        """
+        result = {"embedded": 0, "unchanged": 0, "cached": 0, "shared": 0, "deleted": 0, "failed": [],
+                  "generation": None}
+        try:
+            model = self.engine.settings()["model"]
+            chunk_params = self.chunk_params()
+            
+            if resume:
+                job = self.journal.latest_unfinished()
+                if job and job["model"] == model and job["chunk_params"] == chunk_params:
+                    if not silent:
+                        print(f"Resuming embedding job {job['id']} "
+                              f"({job['counts']['done']} done, "
+                              f"{job['counts']['pending'] + job['counts']['failed']} remaining)")
+                    self.journal.resume(job["id"])
+                    self._run_job(job["id"], model, chunk_params, result)
+                    self.journal.finish(job["id"])
+                elif not silent:
+                    print("No unfinished embedding job to resume.")
+            
+            queue_end, dirty = self.storage.load_dirty_items()
+            
+            # Rows left by an interrupted run may belong to any item, so only
+            # a plan over all content can tell which of them to publish
+            unpublished = self.has_unpublished_rows()
+            if only_dirty and not dirty and not unpublished:
+                result["generation"] = self.published_generation()
+                return result
+            
+            plan = self.plan_reindex(full, only=dirty if only_dirty and not unpublished else None)
+            result["unchanged"] = plan["unchanged"]
+            
+            job_id = self.journal.start(model, chunk_params, plan["pending"])
+            self._run_job(job_id, model, chunk_params, result, full=full)
+            
+            # An item whose new chunks did not all embed keeps its old rows
+            held = {(failure["content_type"], failure["content_id"])
+                    for failure in self.journal.summary(job_id)["failed"]}
+            orphans = [row_id for row_id in plan["orphans"] if plan["owners"][row_id] not in held]
+            if result["embedded"] or orphans or unpublished:
+                result["generation"] = self.publish(orphans, job_id, held)
+            else:
+                result["generation"] = self.published_generation()
+            result["deleted"] = len(orphans)
+            
+            self.journal.finish(job_id)
+            result["failed"] = self.label_failures(self.journal.summary(job_id)["failed"])
+            self.storage.clear_dirty_items(queue_end, keep={(failure["content_type"], failure["item_id"])
+                                                           for failure in result["failed"]})
             if not silent:
-                print("✓ All content embedded successfully")
+                for failure in result["failed"]:
+                    print(f"Failed to embed [{failure['content_type']}] {failure['content_id']}: {failure['error']}")
+                if result["failed"]:
+                    print(f"Embedded {result['embedded']} chunks, {len(result['failed'])} failed. "
+                          f"Run 'devco embed --resume' to retry.")
+                else:
+                    print(f"✓ All content embedded successfully "
+                          f"({result['embedded']} new, {result['cached']} of them from cache, "
+                          f"{result['shared']} sharing a stored vector, "
+                          f"{result['unchanged']} unchanged, {result['deleted']} removed)")
         
         except Exception as e:
             print(f"Error embedding content: {e}")
+        
+        return result
+    
+    def search_similar_content(self, query: str, limit: int = 5,
+                               model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Search for content similar to query using vector similarity
+        
+        Searches the configured model's vectors unless another indexed model
+        id is given.
+        """
+        return self.search_generation(query, limit, model)[1]
     
-    def search_similar_content(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search for content similar to query using vector similarity"""
+    def search_generation(self, query: str, limit: int = 5, model: Optional[str] = None
+                          ) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """Search the published index, returning the generation searched and the results
+        
+        Each vector is scored once and counted once against the limit; a
+        result lists every content item whose chunk shares that vector under
+        'owners', and its top-level fields name the first of them.
+        """
         try:
+            model = model or self.engine.settings()["model"]
+            where, params = self._model_filter(model, "e.model")
+            
             # Generate embedding for query
-            query_embedding = self.generate_embedding(query)
+            query_embedding = self.generate_embedding(query, model)
             if not query_embedding:
                 print("Failed to generate query embedding")
-                return []
+                return None, []
             
-            # Get all stored embeddings
+            # Read the generation and its rows in one transaction, so a
+            # concurrent publish cannot swap the index mid-read
             conn = self.storage.get_db_connection()
-            cursor = conn.execute("""
-                SELECT content_type, content_id, chunk_text, embedding
-                FROM embeddings
-            """)
-            
-            results = []
-            for row in cursor.fetchall():
-                content_type, content_id, chunk_text, embedding_blob = row
-                
-                # Parse stored embedding
-                stored_embedding = json.loads(embedding_blob.decode('utf-8'))
-                
-                # Compute similarity
-                similarity = self.compute_similarity(query_embedding, stored_embedding)
-                
-                results.append({
-                    'content_type': content_type,
-                    'content_id': content_id,
-                    'chunk_text': chunk_text,
-                    'similarity': similarity
-                })
-            
+            conn.execute("BEGIN")
+            generation = self.published_generation(conn)
+            
+            config = self.engine.settings()["config"]
+            try:
+                scored = self.sidecar.search(conn, model, generation, where, params, query_embedding, limit,
+                                             config.get('vector_quantization', 'none'),
+                                             config.get('quantization_candidates', DEFAULT_CANDIDATES),
+                                             config.get('vector_prefix_dims', 0))
+            except (OSError, ValueError):
+                scored = self._scan_vectors(conn, generation, where, params, query_embedding, limit)
+            
+            results = self._results(conn, generation, where, params, scored)
+            conn.rollback()
             conn.close()
-            
-            # Sort by similarity (highest first) and limit results
-            results.sort(key=lambda x: x['similarity'], reverse=True)
-            return results[:limit]
+            return generation, results
         
         except Exception as e:
             print(f"Error searching content: {e}")
+            return None, []
+    
+    def check_recall(self, k: int = 10, queries: int = 50, candidates: Optional[int] = None,
+                     model: Optional[str] = None, prefix_dims: Optional[int] = None) -> Dict[str, Any]:
+        """Measure recall@k and query time of each first-stage search against exact search
+        
+        Every vector quantization is checked on the full vectors and, if
+        prefix_dims is set and shorter than the vectors, on their prefix.
+        Published vectors serve as queries; each query's own vector is left
+        out of both rankings. Returns {"queries", "k", "candidates",
+        "prefix_dims", "modes": {mode: {"recall", "ms"}}}, with modes named
+        like "int8" or "p256+int8", and no modes if the index is empty.
+        """
+        import numpy as np
+        
+        model = model or self.engine.settings()["model"]
+        config = self.engine.settings()["config"]
+        if candidates is None:
+            candidates = config.get('quantization_candidates', DEFAULT_CANDIDATES)
+        if prefix_dims is None:
+            prefix_dims = config.get('vector_prefix_dims', 0)
+        where, params = self._model_filter(model, "e.model")
+        conn = self.storage.get_db_connection()
+        conn.execute("BEGIN")
+        try:
+            generation = self.published_generation(conn)
+            stem = self.sidecar.build(conn, model, generation, where, params)
+            report = {"queries": 0, "k": k, "candidates": candidates, "prefix_dims": prefix_dims, "modes": {}}
+            if stem is None:
+                return report
+            
+            ids, matrix = self.sidecar.vectors(stem)
+            modes = {quantization: (quantization, 0) for quantization in QUANTIZATIONS}
+            if 0 < prefix_dims < matrix.shape[1]:
+                for quantization in QUANTIZATIONS:
+                    name = f"p{prefix_dims}" + (f"+{quantization}" if quantization != "none" else "")
+                    modes[name] = (quantization, prefix_dims)
+            rows = np.sort(np.random.default_rng(0).permutation(len(ids))[:queries])
+            query_vectors = matrix[rows]
+            rankings = {}
+            for name, (quantization, dims) in modes.items():
+                # Write the coarse copies before timing queries
+                self.sidecar.search(conn, model, generation, where, params, query_vectors[0], k, quantization,
+                                    candidates, dims)
+                start = time.perf_counter()
+                rankings[name] = [
+                    [vector_id for vector_id, _ in self.sidecar.search(
+                        conn, model, generation, where, params, vector, k + 1, quantization, candidates, dims)]
+                    for vector in query_vectors]
+                report["modes"][name] = {"ms": (time.perf_counter() - start) * 1000 / len(rows)}
+            
+            own_ids = [int(ids[row]) for row in rows]
+            for name in modes:
+                rankings[name] = [[vector_id for vector_id in ranking if vector_id != own][:k]
+                                  for ranking, own in zip(rankings[name], own_ids)]
+            expected = sum(len(truth) for truth in rankings["none"])
+            for name in modes:
+                found = sum(len(set(truth) & set(ranking))
+                            for truth, ranking in zip(rankings["none"], rankings[name]))
+                report["modes"][name]["recall"] = found / expected if expected else 1.0
+            report["queries"] = len(rows)
+            return report
+        finally:
+            conn.rollback()
+            conn.close()
+    
+    def _scan_vectors(self, conn: sqlite3.Connection, generation: int, where: str, params: Tuple,
+                      query_embedding: List[float], limit: int) -> List[Tuple[int, float]]:
+        """Score every vector of a published set read from the vectors table, best first"""
+        rows = conn.execute(f"""
+            SELECT v.id, v.embedding FROM vectors v WHERE v.id IN (
+                SELECT e.vector_id FROM embeddings e WHERE e.generation <= ? AND {where})
+            ORDER BY v.id
+        """, (generation,) + params).fetchall()
+        scores = cosine_similarities(query_embedding, [blob for _, blob in rows])
+        scored = [(vector_id, float(score)) for (vector_id, _), score in zip(rows, scores)]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:limit]
+    
+    def _results(self, conn: sqlite3.Connection, generation: int, where: str, params: Tuple,
+                 scored: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+        """Build search results for scored vectors, listing the chunks that use each"""
+        if not scored:
             return []
+        placeholders = ",".join("?" * len(scored))
+        rows = conn.execute(f"""
+            SELECT e.vector_id, e.content_type, e.content_id, e.chunk_text FROM embeddings e
+            WHERE e.generation <= ? AND {where} AND e.vector_id IN ({placeholders})
+            ORDER BY e.id
+        """, (generation,) + params + tuple(vector_id for vector_id, _ in scored)).fetchall()
+        
+        labels = self.content_labels()
+        by_vector = {}
+        for vector_id, content_type, content_id, chunk_text in rows:
+            owner = {
+                'content_type': content_type,
+                'content_id': labels.get((content_type, content_id), content_id),
+                'item_id': content_id
+            }
+            if vector_id not in by_vector:
+                by_vector[vector_id] = dict(owner, chunk_text=chunk_text, owners=[])
+            if owner not in by_vector[vector_id]['owners']:
+                by_vector[vector_id]['owners'].append(owner)
+        
+        return [dict(by_vector[vector_id], similarity=similarity)
+                for vector_id, similarity in scored if vector_id in by_vector]
     
-    def check_embeddings_status(self) -> dict:
-        """Check if embeddings exist for all content and return status"""
+    def check_embeddings_status(self, model: Optional[str] = None) -> dict:
+        """Check if embeddings exist for all content and return status
+        
+        Reports on the configured model's vector set unless another model id
+        is given.
+        """
         try:
             status = {
                 "has_embeddings": False,
                 "missing_content": [],
                 "total_content_items": 0,
-                "embedded_items": 0
+                "embedded_items": 0,
+                "stale_content": [],
+                "failed_content": [],
+                "generation": 0
             }
             
             # Count content items
-            principles = self.storage.load_principles()
-            summary_data = self.storage.load_summary()
-            sections = summary_data.get('sections', {})
+            labels = self.content_labels()
             
-            content_items = []
-            content_items.extend([f"principle_{i+1}" for i in range(len(principles))])
-            if summary_data.get('summary'):
-                content_items.append("summary_main")
-            for section_name in sections:
-                content_items.append(f"section_{section_name}")
-                content_items.append(f"section_{section_name}_detail")
+            def describe(item: Tuple[str, str]) -> str:
+                return f"{item[0]}_{labels.get(item, item[1])}"
             
-            status["total_content_items"] = len(content_items)
+            status["total_content_items"] = len(labels)
             
             # Check what's in embeddings DB
             conn = self.storage.get_db_connection()
-            cursor = conn.execute("SELECT DISTINCT content_type, content_id FROM embeddings")
-            embedded_items = set()
-            for row in cursor.fetchall():
-                content_type, content_id = row
-                embedded_items.add(f"{content_type}_{content_id}")
+            status["generation"] = self.published_generation(conn)
+            where, params = self._model_filter(model)
+            cursor = conn.execute(f"SELECT DISTINCT content_type, content_id FROM embeddings "
+                                  f"WHERE generation <= ? AND {where}", (status["generation"],) + params)
+            embedded_items = set(cursor.fetchall())
             conn.close()
             
             status["embedded_items"] = len(embedded_items)
             status["has_embeddings"] = len(embedded_items) > 0
             
             # Find missing items
-            missing = []
-            for item in content_items:
-                if item not in embedded_items:
-                    missing.append(item)
+            status["missing_content"] = [describe(item) for item in labels if item not in embedded_items]
+            
+            # Items changed since they were last embedded
+            status["stale_content"] = sorted(describe(item) for item in self.storage.load_dirty_items()[1])
             
-            status["missing_content"] = missing
+            # Chunks the last embedding run could not embed
+            job = self.journal.latest()
+            status["failed_content"] = sorted({describe((failure['content_type'], failure['content_id']))
+                                               for failure in (job["failed"] if job else [])})
             return status
             
         except Exception as e:
@@ -276,5 +888,8 @@ class EmbeddingsManager:
                 "missing_content": [],
                 "total_content_items": 0,
                 "embedded_items": 0,
+                "stale_content": [],
+                "failed_content": [],
+                "generation": 0,
                 "error": str(e)
             }
\ No newline at end of file
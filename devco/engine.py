@@ -0,0 +1,214 @@
+"""
+In-process embedding engine for devco - loads llm models once per process
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from .storage import DevDocStorage
+from .local import HashingEmbeddingModel, is_local_model
+from .workers import TokenBucket, call_with_backoff, run_ordered
+
+
+DEFAULT_EMBEDDING_MODEL = "gemini-embedding-exp-03-07-2048"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_CHARS = 50000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_LIMIT = 10
+DEFAULT_MAX_RETRIES = 5
+
+
+def pack_batches(texts: List[str], max_items: int = DEFAULT_BATCH_SIZE,
+                 max_chars: int = DEFAULT_BATCH_CHARS) -> List[List[int]]:
+    """Group text indices into batches within an item and character budget
+
+    A single text longer than max_chars still gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_chars = 0
+
+    for i, text in enumerate(texts):
+        if current and (len(current) >= max_items or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(i)
+        current_chars += len(text)
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class EmbeddingEngine:
+    """Generates embeddings in-process using the llm Python API
+
+    Model objects are loaded once and reused for every chunk. Settings from
+    config.json and .devco/.env are cached and only re-read when either file's
+    mtime changes.
+    """
+
+    def __init__(self, storage: DevDocStorage):
+        self.storage = storage
+        self._settings: Optional[Dict[str, Any]] = None
+        self._settings_key: Optional[Tuple] = None
+        self._models: Dict[str, Any] = {}
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def _file_mtime(self, path: Path) -> Optional[int]:
+        """Return the mtime of a file in nanoseconds, or None if it is missing"""
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_env_file(self) -> Dict[str, str]:
+        """Parse KEY=VALUE lines from .devco/.env"""
+        env_vars = {}
+        env_file = self.storage.devco_dir / ".env"
+        if env_file.exists():
+            with open(env_file) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        key, value = line.split('=', 1)
+                        env_vars[key.strip()] = value.strip()
+        return env_vars
+
+    def settings(self) -> Dict[str, Any]:
+        """Return cached settings, reloading if config.json or .env changed"""
+        key = (self._file_mtime(self.storage.devco_dir / "config.json"),
+               self._file_mtime(self.storage.devco_dir / ".env"))
+
+        if self._settings is None or key != self._settings_key:
+            config = self.storage.load_config()
+            env_vars = os.environ.copy()
+            env_vars.update(self._read_env_file())
+
+            # Set the Gemini API key for llm if available
+            if env_vars.get('GOOGLE_API_KEY'):
+                env_vars['LLM_GEMINI_KEY'] = env_vars['GOOGLE_API_KEY']
+
+            self._settings = {
+                "config": config,
+                "model": config.get('embedding_model', DEFAULT_EMBEDDING_MODEL),
+                "env": env_vars,
+            }
+            self._settings_key = key
+            # Keys may have changed, so models must pick them up again
+            self._models.clear()
+
+        return self._settings
+
+    def _load_model(self, model_id: str):
+        """Load an embedding model, either built-in or through the llm plugin registry"""
+        if is_local_model(model_id):
+            return HashingEmbeddingModel(model_id)
+        import llm
+        return llm.get_embedding_model(model_id)
+
+    def get_model(self, model_id: Optional[str] = None):
+        """Return the (cached) model object for model_id or the configured model"""
+        settings = self.settings()
+        model_id = model_id or settings["model"]
+
+        if model_id not in self._models:
+            model = self._load_model(model_id)
+
+            key_env_var = getattr(model, 'key_env_var', None)
+            if getattr(model, 'needs_key', None) and key_env_var and settings["env"].get(key_env_var):
+                model.key = settings["env"][key_env_var]
+
+            self._models[model_id] = model
+
+        return self._models[model_id]
+
+    def embed(self, text: str, model_id: Optional[str] = None) -> List[float]:
+        """Embed a single piece of text, raising on failure"""
+        model = self.get_model(model_id)
+        with self._count_lock:
+            self.request_count += 1
+        return [float(x) for x in model.embed(text)]
+
+    def embed_batch(self, texts: List[str], model_id: Optional[str] = None) -> List[List[float]]:
+        """Embed several texts with a single multi-input request, raising on failure"""
+        model = self.get_model(model_id)
+        with self._count_lock:
+            self.request_count += 1
+        return [[float(x) for x in vector]
+                for vector in model.embed_multi(texts, batch_size=len(texts))]
+
+    def embed_many(self, texts: List[str], model_id: Optional[str] = None
+                   ) -> Tuple[List[Optional[List[float]]], List[Dict[str, Any]]]:
+        """Embed texts in packed batches sent concurrently
+
+        Up to embedding_concurrency batch requests are in flight at once,
+        limited to embedding_rate_limit requests per second (0 for no limit).
+        Rate-limit and server errors are retried with exponential backoff up
+        to embedding_max_retries times.
+
+        Returns one vector (or None) per input text, in order, plus a list of
+        failures as {"index", "error"} dicts. When a batch request fails its
+        items are retried one by one so that only the offending texts are
+        reported as failed.
+        """
+        config = self.settings()["config"]
+        batches = pack_batches(texts,
+                               max_items=config.get('embedding_batch_size', DEFAULT_BATCH_SIZE),
+                               max_chars=config.get('embedding_batch_chars', DEFAULT_BATCH_CHARS))
+        if not batches:
+            return [], []
+
+        # Load the model up front so worker threads share one instance
+        self.get_model(model_id)
+        bucket = TokenBucket(config.get('embedding_rate_limit', DEFAULT_RATE_LIMIT))
+        max_retries = config.get('embedding_max_retries', DEFAULT_MAX_RETRIES)
+
+        def request(fn):
+            return call_with_backoff(fn, bucket, max_retries=max_retries)
+
+        def embed_batch(batch: List[int]) -> Tuple[List[Optional[List[float]]], Dict[int, str]]:
+            errors: Dict[int, str] = {}
+            try:
+                results = request(lambda: self.embed_batch([texts[i] for i in batch], model_id))
+            except Exception as e:
+                if len(batch) == 1:
+                    return [None], {batch[0]: str(e)}
+                results = []
+                for i in batch:
+                    try:
+                        results.append(request(lambda: self.embed(texts[i], model_id)))
+                    except Exception as item_error:
+                        results.append(None)
+                        errors[i] = str(item_error)
+            return results, errors
+
+        outcomes = run_ordered(embed_batch, batches,
+                               concurrency=config.get('embedding_concurrency', DEFAULT_CONCURRENCY))
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        errors: Dict[int, str] = {}
+        for batch, (results, batch_errors) in zip(batches, outcomes):
+            errors.update(batch_errors)
+            for position, i in enumerate(batch):
+                vector = results[position] if position < len(results) else None
+                if vector:
+                    vectors[i] = vector
+                elif i not in errors:
+                    errors[i] = "no embedding returned"
+
+        failures = [{"index": i, "error": errors[i]} for i in sorted(errors)]
+        return vectors, failures
+
+
+_engines: Dict[Path, EmbeddingEngine] = {}
+
+
+def get_engine(storage: DevDocStorage) -> EmbeddingEngine:
+    """Return the process-wide engine for the storage's .devco directory"""
+    key = storage.devco_dir.resolve()
+    if key not in _engines:
+        _engines[key] = EmbeddingEngine(storage)
+    return _engines[key]
@@ -0,0 +1,21 @@
+"""
+Content hashing helpers for devco
+"""
+import hashlib
+import re
+import unicodedata
+
+
+def content_hash(text: str) -> str:
+    """Return a stable hex digest identifying a chunk's text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share one cache key"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def normalized_hash(text: str) -> str:
+    """Return the content hash of the normalized text"""
+    return content_hash(normalize_text(text))
@@ -0,0 +1,143 @@
+"""
+Embedding job journal for devco - records progress so runs can resume
+"""
+import os
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple
+from .storage import DevDocStorage
+
+
+# Number of past jobs kept for reporting
+KEEP_JOBS = 20
+
+
+class EmbedJournal:
+    """Tracks embedding jobs and the state of each chunk in devco.db
+
+    A job lists every chunk a run intends to embed. Items move from pending
+    to done (committed together with their embeddings row) or failed (with
+    the attempt count and last error), so an interrupted or failed run can
+    be picked up again without losing or silently dropping work.
+    """
+
+    def __init__(self, storage: DevDocStorage):
+        self.storage = storage
+
+    def start(self, model: str, chunk_params: str, items: List[Tuple[str, str, str, str]]) -> int:
+        """Create a running job for (content_type, content_id, chunk_text, content_hash) items
+
+        Any earlier job still marked running is marked interrupted and the
+        items of earlier jobs are dropped, since their remaining work is part
+        of this job's plan.
+        """
+        conn = self.storage.get_db_connection()
+        conn.execute("UPDATE embed_jobs SET status = 'interrupted' WHERE status = 'running'")
+        conn.execute("DELETE FROM embed_job_items")
+        conn.execute("DELETE FROM embed_jobs WHERE id <= (SELECT MAX(id) FROM embed_jobs) - ?", (KEEP_JOBS,))
+        cursor = conn.execute("""
+            INSERT INTO embed_jobs (status, model, chunk_params, pid, total)
+            VALUES ('running', ?, ?, ?, ?)
+        """, (model, chunk_params, os.getpid(), len(items)))
+        job_id = cursor.lastrowid
+        conn.executemany("""
+            INSERT INTO embed_job_items (job_id, position, content_type, content_id, chunk_text, content_hash, status)
+            VALUES (?, ?, ?, ?, ?, ?, 'pending')
+        """, [(job_id, position) + tuple(item) for position, item in enumerate(items)])
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def resume(self, job_id: int):
+        """Mark an unfinished job as running again in this process"""
+        conn = self.storage.get_db_connection()
+        conn.execute("UPDATE embed_jobs SET status = 'running', pid = ?, finished_at = NULL WHERE id = ?",
+                     (os.getpid(), job_id))
+        conn.commit()
+        conn.close()
+
+    def latest_unfinished(self) -> Optional[Dict[str, Any]]:
+        """Return the most recent job that did not complete, if any"""
+        job = self.latest()
+        if job and job["status"] != "completed":
+            return job
+        return None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Return the most recent job with its item counts, if any"""
+        conn = self.storage.get_db_connection()
+        row = conn.execute("""
+            SELECT id, status, model, chunk_params, started_at, finished_at
+            FROM embed_jobs ORDER BY id DESC LIMIT 1
+        """).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return self.summary(row[0])
+
+    def summary(self, job_id: int) -> Dict[str, Any]:
+        """Return a job's metadata, item counts by status and failed items"""
+        conn = self.storage.get_db_connection()
+        job_id, status, model, chunk_params, started_at, finished_at = conn.execute("""
+            SELECT id, status, model, chunk_params, started_at, finished_at
+            FROM embed_jobs WHERE id = ?
+        """, (job_id,)).fetchone()
+        counts = {"pending": 0, "done": 0, "failed": 0}
+        for item_status, count in conn.execute(
+                "SELECT status, COUNT(*) FROM embed_job_items WHERE job_id = ? GROUP BY status", (job_id,)):
+            counts[item_status] = count
+        failed = [{"content_type": row[0], "content_id": row[1], "chunk_text": row[2],
+                   "attempts": row[3], "error": row[4]}
+                  for row in conn.execute("""
+                      SELECT content_type, content_id, chunk_text, attempts, last_error
+                      FROM embed_job_items WHERE job_id = ? AND status = 'failed' ORDER BY position
+                  """, (job_id,))]
+        conn.close()
+        return {
+            "id": job_id,
+            "status": status,
+            "model": model,
+            "chunk_params": chunk_params,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "counts": counts,
+            "failed": failed
+        }
+
+    def remaining_items(self, job_id: int) -> List[Tuple[int, str, str, str, int]]:
+        """Return (position, content_type, content_id, chunk_text, attempts) for unfinished items"""
+        conn = self.storage.get_db_connection()
+        rows = conn.execute("""
+            SELECT position, content_type, content_id, chunk_text, attempts
+            FROM embed_job_items
+            WHERE job_id = ? AND status IN ('pending', 'failed')
+            ORDER BY position
+        """, (job_id,)).fetchall()
+        conn.close()
+        return rows
+
+    def mark_done(self, conn: sqlite3.Connection, job_id: int, positions: List[int]):
+        """Mark items done on the caller's connection, alongside their embeddings rows"""
+        conn.executemany("""
+            UPDATE embed_job_items SET status = 'done', attempts = attempts + 1, last_error = NULL
+            WHERE job_id = ? AND position = ?
+        """, [(job_id, position) for position in positions])
+
+    def mark_failed(self, conn: sqlite3.Connection, job_id: int, failures: List[Tuple[int, str]]):
+        """Record failed (position, error) attempts on the caller's connection"""
+        conn.executemany("""
+            UPDATE embed_job_items SET status = 'failed', attempts = attempts + 1, last_error = ?
+            WHERE job_id = ? AND position = ?
+        """, [(error, job_id, position) for position, error in failures])
+
+    def finish(self, job_id: int) -> str:
+        """Close a job as completed, or failed if any item still failed"""
+        conn = self.storage.get_db_connection()
+        remaining = conn.execute("""
+            SELECT COUNT(*) FROM embed_job_items WHERE job_id = ? AND status != 'done'
+        """, (job_id,)).fetchone()[0]
+        status = "failed" if remaining else "completed"
+        conn.execute("UPDATE embed_jobs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                     (status, job_id))
+        conn.commit()
+        conn.close()
+        return status
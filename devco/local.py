@@ -0,0 +1,124 @@
+"""
+Local offline embedding backend for devco
+"""
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+LOCAL_MODEL_PREFIX = "local-hash"
+DEFAULT_LOCAL_DIMENSIONS = 512
+
+# Bytes treated as part of a word: ASCII letters, digits, underscore and any
+# byte of a multi-byte UTF-8 sequence
+WORD_BYTES = np.zeros(256, dtype=bool)
+for _byte in b"abcdefghijklmnopqrstuvwxyz0123456789_":
+    WORD_BYTES[_byte] = True
+WORD_BYTES[128:] = True
+
+HASH_BASE = np.uint64(0x100000001B3)
+HASH_BASE_INVERSE = np.uint64(pow(0x100000001B3, -1, 2 ** 64))
+BIGRAM_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def is_local_model(model_id: Optional[str]) -> bool:
+    """Return True if model_id names the built-in local backend"""
+    return bool(model_id) and (model_id == LOCAL_MODEL_PREFIX or
+                               model_id.startswith(LOCAL_MODEL_PREFIX + "-"))
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, spreading hash bits over the whole word"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class HashingEmbeddingModel:
+    """Deterministic hashing-trick text vectorizer
+
+    Lower-cased word unigrams and bigrams are hashed into a fixed number of
+    dimensions with a hash-derived sign, which is equivalent to a sparse
+    random projection of the bag-of-words vector. Counts are damped with
+    log1p and the result is L2-normalized. Hashing runs over whole batches
+    in NumPy, so no per-token Python work is done, no network access or
+    model download is needed, and the same text always maps to the same
+    vector.
+
+    Exposes embed/embed_multi like an llm embedding model, so the engine
+    treats it like any other provider.
+    """
+
+    needs_key = None
+    key_env_var = None
+
+    def __init__(self, model_id: str = LOCAL_MODEL_PREFIX):
+        self.model_id = model_id
+        suffix = model_id[len(LOCAL_MODEL_PREFIX) + 1:]
+        self.dimensions = int(suffix) if suffix else DEFAULT_LOCAL_DIMENSIONS
+        if self.dimensions <= 0:
+            raise ValueError(f"Invalid dimensions for local model: {model_id}")
+
+    def _word_hashes(self, texts: List[str]):
+        """Return (row, hash) arrays for every word in texts"""
+        encoded = [text.lower().encode('utf-8') for text in texts]
+        data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+        text_starts = np.zeros(len(texts), dtype=np.int64)
+        if len(texts) > 1:
+            text_starts[1:] = np.cumsum([len(chunk) + 1 for chunk in encoded[:-1]])
+
+        mask = np.concatenate(([False], WORD_BYTES[data], [False]))
+        edges = np.flatnonzero(mask[1:] != mask[:-1])
+        starts, ends = edges[0::2], edges[1::2]
+
+        # Polynomial hash of every word from prefix sums:
+        # hash(word) = (S[end] - S[start]) * BASE^-start
+        with np.errstate(over='ignore'):
+            powers = np.full(len(data) + 1, HASH_BASE, dtype=np.uint64)
+            powers[0] = 1
+            powers = np.cumprod(powers)
+            inverse_powers = np.full(len(data) + 1, HASH_BASE_INVERSE, dtype=np.uint64)
+            inverse_powers[0] = 1
+            inverse_powers = np.cumprod(inverse_powers)
+            prefix = np.zeros(len(data) + 1, dtype=np.uint64)
+            prefix[1:] = np.cumsum(data.astype(np.uint64) * powers[:-1])
+            hashes = (prefix[ends] - prefix[starts]) * inverse_powers[starts]
+
+        rows = np.searchsorted(text_starts, starts, side='right') - 1
+        return rows, hashes
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a (len(texts), dimensions) float32 matrix"""
+        rows, hashes = self._word_hashes(texts)
+
+        with np.errstate(over='ignore'):
+            same_text = rows[1:] == rows[:-1]
+            bigrams = hashes[:-1][same_text] * BIGRAM_MULTIPLIER + hashes[1:][same_text] + np.uint64(1)
+            features = _mix(np.concatenate((hashes, bigrams)))
+        feature_rows = np.concatenate((rows, rows[:-1][same_text]))
+
+        columns = (features % np.uint64(self.dimensions)).astype(np.int64)
+        signs = np.where(features >> np.uint64(63), 1.0, -1.0)
+
+        size = len(texts) * self.dimensions
+        matrix = np.bincount(feature_rows * self.dimensions + columns, weights=signs,
+                             minlength=size)[:size].reshape(len(texts), self.dimensions)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    def embed(self, text: str) -> List[float]:
+        """Embed a single text"""
+        return self.embed_matrix([text])[0].tolist()
+
+    def embed_multi(self, texts: Iterable[str], batch_size: int = 100) -> Iterator[List[float]]:
+        """Embed many texts, mirroring llm's embed_multi"""
+        texts = list(texts)
+        step = batch_size or len(texts) or 1
+        for start in range(0, len(texts), step):
+            for vector in self.embed_matrix(texts[start:start + step]):
+                yield vector.tolist()
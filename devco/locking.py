@@ -0,0 +1,38 @@
+"""
+Advisory file locks for devco - shared by the embed coordinator and storage writers
+"""
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_lock(handle) -> bool:
+    """Take an exclusive lock on an open file without blocking"""
+    try:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def lock(handle):
+    """Take an exclusive lock on an open file, waiting for it"""
+    if fcntl:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    else:
+        while not try_lock(handle):
+            time.sleep(0.1)
+
+
+def unlock(handle):
+    if fcntl:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
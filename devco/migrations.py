@@ -0,0 +1,363 @@
+"""
+Schema migrations for devco.db - versioned with PRAGMA user_version
+"""
+import json
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional
+from .hashing import content_hash, normalized_hash
+from .vectors import decode_json_vector, encode_vector
+
+
+# Rows handled per committed step of a large migration
+DEFAULT_PAGE_SIZE = 500
+
+# One vector per model and normalized chunk text, shared by every owner row
+VECTORS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS vectors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model TEXT NOT NULL,
+        text_hash TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        dimensions INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (model, text_hash)
+    )
+"""
+
+# Chunks of content items, each pointing at its vector
+EMBEDDINGS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        content_type TEXT NOT NULL,
+        content_id TEXT NOT NULL,
+        chunk_text TEXT NOT NULL,
+        vector_id INTEGER NOT NULL REFERENCES vectors(id),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        content_hash TEXT,
+        model TEXT,
+        chunk_params TEXT,
+        generation INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+# How rows were chunked before the chunking parameters were recorded
+LEGACY_CHUNK_PARAMS = json.dumps({"chunker": "fixed", "chunk_size": 500, "chunk_overlap": 50,
+                                  "chunk_unit": "chars"}, sort_keys=True)
+
+# Vectors still stored as JSON text
+JSON_VECTORS_WHERE = "(length(embedding) != 4 * dimensions OR substr(embedding, 1, 1) = X'5B')"
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _has_table(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (table,)).fetchone() is not None
+
+
+def _count(conn: sqlite3.Connection, sql: str) -> int:
+    return conn.execute(sql).fetchone()[0]
+
+
+def add_embedding_columns(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Add the content hash, model, chunking and generation columns to per-row vectors
+
+    Existing rows are backfilled from their chunk text, the configured model
+    and the chunking devco used before, so an upgrade does not make every
+    row stale.
+    """
+    columns = _columns(conn, "embeddings")
+    if 'embedding' not in columns:
+        return
+    for column in ('content_hash', 'model', 'chunk_params'):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE embeddings ADD COLUMN {column} TEXT")
+    if 'generation' not in columns:
+        conn.execute("ALTER TABLE embeddings ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+    conn.commit()
+
+    model = config.get('embedding_model') or None
+    while True:
+        rows = conn.execute("SELECT id, chunk_text FROM embeddings WHERE content_hash IS NULL LIMIT ?",
+                            (page_size,)).fetchall()
+        if not rows:
+            break
+        conn.executemany("""
+            UPDATE embeddings SET content_hash = ?, model = COALESCE(model, ?),
+                                  chunk_params = COALESCE(chunk_params, ?)
+            WHERE id = ?
+        """, [(content_hash(chunk_text), model, LEGACY_CHUNK_PARAMS, row_id) for row_id, chunk_text in rows])
+        conn.commit()
+
+
+def share_vectors(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Move per-row vectors into the vectors table, one per model and normalized text
+
+    The old table is renamed first and copied page by page, keeping row ids,
+    so an interrupted copy continues after the last row it committed.
+    """
+    if 'embedding' in _columns(conn, "embeddings"):
+        conn.execute("ALTER TABLE embeddings RENAME TO embeddings_unshared")
+        conn.commit()
+    conn.execute(VECTORS_TABLE_SQL)
+    conn.execute(EMBEDDINGS_TABLE_SQL)
+    conn.commit()
+    if not _has_table(conn, "embeddings_unshared"):
+        return
+
+    default_model = config.get('embedding_model', '')
+    while True:
+        rows = conn.execute("""
+            SELECT id, content_type, content_id, chunk_text, embedding, created_at,
+                   content_hash, model, chunk_params, generation
+            FROM embeddings_unshared WHERE id > (SELECT COALESCE(MAX(id), 0) FROM embeddings)
+            ORDER BY id LIMIT ?
+        """, (page_size,)).fetchall()
+        if not rows:
+            break
+        for (row_id, content_type, content_id, chunk_text, embedding, created_at,
+             row_hash, model, chunk_params, generation) in rows:
+            vector_model = model or default_model
+            text_hash = normalized_hash(chunk_text)
+            vector = decode_json_vector(embedding)
+            conn.execute("INSERT OR IGNORE INTO vectors (model, text_hash, embedding, dimensions) VALUES (?, ?, ?, ?)",
+                         (vector_model, text_hash, encode_vector(vector), len(vector)))
+            vector_id = conn.execute("SELECT id FROM vectors WHERE model = ? AND text_hash = ?",
+                                     (vector_model, text_hash)).fetchone()[0]
+            conn.execute("""
+                INSERT INTO embeddings (id, content_type, content_id, chunk_text, vector_id, created_at,
+                                        content_hash, model, chunk_params, generation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (row_id, content_type, content_id, chunk_text, vector_id, created_at,
+                  row_hash, model, chunk_params, generation))
+        conn.commit()
+    conn.execute("DROP TABLE embeddings_unshared")
+    conn.commit()
+    # Give the space of the old table and its JSON vectors back to the file system
+    conn.execute("VACUUM")
+
+
+def create_index_tables(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Create the lookup indexes, generations, job journal and dirty queue tables"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_content ON embeddings(content_type, content_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON embeddings(content_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_model ON embeddings(model)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vector ON embeddings(vector_id)")
+
+    # Published index generations; readers only see rows up to the latest
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_generations (
+            generation INTEGER PRIMARY KEY,
+            job_id INTEGER,
+            published_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Embedding job journal
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS embed_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL,
+            model TEXT NOT NULL,
+            chunk_params TEXT NOT NULL,
+            pid INTEGER,
+            total INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS embed_job_items (
+            job_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            content_type TEXT NOT NULL,
+            content_id TEXT NOT NULL,
+            chunk_text TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            PRIMARY KEY (job_id, position)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dirty_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_type TEXT NOT NULL,
+            content_id TEXT NOT NULL,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def encode_float32_vectors(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Re-encode vectors stored as JSON text as float32 blobs
+
+    Converted rows no longer match the filter, so each committed page is
+    progress an interrupted run keeps.
+    """
+    migrated = 0
+    last_id = 0
+    while True:
+        # A float32 blob is exactly 4 bytes per dimension; JSON text starts with '['
+        rows = conn.execute(f"""
+            SELECT id, embedding FROM vectors
+            WHERE id > ? AND {JSON_VECTORS_WHERE}
+            ORDER BY id LIMIT ?
+        """, (last_id, page_size)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, blob in rows:
+            vector = decode_json_vector(blob)
+            if vector is not None:
+                updates.append((encode_vector(vector), len(vector), row_id))
+        conn.executemany("UPDATE vectors SET embedding = ?, dimensions = ? WHERE id = ?", updates)
+        conn.commit()
+        migrated += len(updates)
+        last_id = rows[-1][0]
+
+    if migrated:
+        # Give the space of the larger JSON blobs back to the file system
+        conn.execute("VACUUM")
+
+
+def create_document_tables(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Create the tables of the SQLite document backend"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS principles (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS project_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            text TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sections (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            position INTEGER NOT NULL,
+            summary TEXT NOT NULL DEFAULT '',
+            detail TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sections_position ON sections(position)")
+    conn.commit()
+
+
+def add_generation_tokens(conn: sqlite3.Connection, config: Dict[str, Any], page_size: int):
+    """Give every published generation a token unique to that publish
+
+    The generation number alone does not identify an index: devco.db is
+    committed to git, so after a checkout the same number can stand for
+    other rows. Rows published before generations were recorded get a
+    generation 0 entry of their own.
+    """
+    if 'token' not in _columns(conn, "embedding_generations"):
+        conn.execute("ALTER TABLE embedding_generations ADD COLUMN token TEXT")
+    conn.execute("UPDATE embedding_generations SET token = lower(hex(randomblob(16))) WHERE token IS NULL")
+    conn.execute("""
+        INSERT INTO embedding_generations (generation, token)
+        SELECT 0, lower(hex(randomblob(16)))
+        WHERE EXISTS (SELECT 1 FROM embeddings WHERE generation = 0)
+          AND NOT EXISTS (SELECT 1 FROM embedding_generations)
+    """)
+    conn.commit()
+
+
+class Migration:
+    """One schema step, applied when the database's user_version is below its version"""
+
+    def __init__(self, version: int, description: str,
+                 apply: Callable[[sqlite3.Connection, Dict[str, Any], int], None],
+                 rows: Optional[Callable[[sqlite3.Connection], int]] = None):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.rows = rows
+
+
+def _legacy_rows(conn: sqlite3.Connection) -> int:
+    """Rows still holding their own vector, in the original or a half-copied table"""
+    if _has_table(conn, "embeddings_unshared"):
+        return _count(conn, """
+            SELECT COUNT(*) FROM embeddings_unshared
+            WHERE id > (SELECT COALESCE(MAX(id), 0) FROM embeddings)
+        """)
+    if 'embedding' in _columns(conn, "embeddings"):
+        return _count(conn, "SELECT COUNT(*) FROM embeddings")
+    return 0
+
+
+def _json_vector_rows(conn: sqlite3.Connection) -> int:
+    if not _has_table(conn, "vectors"):
+        return _legacy_rows(conn)
+    return _count(conn, f"SELECT COUNT(*) FROM vectors WHERE {JSON_VECTORS_WHERE}")
+
+
+# Every step tolerates databases that already have its changes, since
+# databases created before versioning have user_version 0 whatever their schema
+MIGRATIONS = [
+    Migration(1, "Add content hash, model, chunking and generation columns", add_embedding_columns),
+    Migration(2, "Share one vector between identical chunks", share_vectors, _legacy_rows),
+    Migration(3, "Create indexes, index generations, job journal and dirty queue", create_index_tables),
+    Migration(4, "Store vectors as float32 blobs", encode_float32_vectors, _json_vector_rows),
+    Migration(5, "Create principle, summary and section tables", create_document_tables),
+    Migration(6, "Give each published index generation a unique token", add_generation_tokens),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+class MigrationRunner:
+    """Brings a devco.db connection up to the latest schema version
+
+    The version is kept in PRAGMA user_version and bumped after each step
+    completes, so an interrupted upgrade resumes at the step it stopped in.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, config: Optional[Dict[str, Any]] = None,
+                 page_size: int = DEFAULT_PAGE_SIZE):
+        self.conn = conn
+        self.config = config or {}
+        self.page_size = page_size
+
+    def current_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        """Return the migrations not yet applied, in order"""
+        version = self.current_version()
+        return [migration for migration in MIGRATIONS if migration.version > version]
+
+    def plan(self) -> List[Dict[str, Any]]:
+        """Describe pending migrations and the rows each would rewrite, changing nothing"""
+        return [{"version": migration.version, "description": migration.description,
+                 "rows": migration.rows(self.conn) if migration.rows else None}
+                for migration in self.pending()]
+
+    def run(self, report: Optional[Callable[[Migration], None]] = None) -> List[int]:
+        """Apply pending migrations, returning the versions applied
+
+        The version is read again before each step, so a step another
+        connection completed meanwhile is not applied twice.
+        """
+        applied = []
+        for migration in MIGRATIONS:
+            if migration.version <= self.current_version():
+                continue
+            if report:
+                report(migration)
+            migration.apply(self.conn, self.config, self.page_size)
+            self.conn.execute(f"PRAGMA user_version = {migration.version}")
+            self.conn.commit()
+            applied.append(migration.version)
+        return applied
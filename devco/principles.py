@@ -3,6 +3,7 @@ Principles management for devco
 """
 from typing import List
 from .storage import DevDocStorage
+from .coordinator import EmbedCoordinator
 
 
 class PrinciplesManager:
@@ -12,34 +13,9 @@ class PrinciplesManager:
         self.storage = storage
     
     def _auto_embed(self):
-        """Automatically regenerate embeddings after content changes"""
+        """Ask for embeddings to be refreshed in the background after content changes"""
         try:
-            import subprocess
-            import sys
-            
-            # Check if we have an API key configured
-            env_file = self.storage.devco_dir / ".env"
-            has_api_key = False
-            
-            if env_file.exists():
-                with open(env_file) as f:
-                    for line in f:
-                        if line.strip() and not line.startswith('#') and 'GOOGLE_API_KEY=' in line:
-                            key_value = line.split('=', 1)[1].strip()
-                            if key_value and key_value != '':
-                                has_api_key = True
-                                break
-            
-            if has_api_key:
-                # Start detached subprocess for embedding
-                subprocess.Popen(
-                    [sys.executable, "-m", "devco.cli", "_embed-all"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    stdin=subprocess.DEVNULL,
-                    start_new_session=True  # Detach from parent process
-                )
-            
+            EmbedCoordinator(self.storage).request()
         except Exception:
             pass  # Silent failure
     
@@ -68,15 +44,8 @@ class PrinciplesManager:
                 print("Principle cannot be empty.")
                 return
             
-            principles = self.storage.load_principles()
-            principles.append(principle)
-            self.storage.save_principles(principles)
-            
-            print(f"Added principle #{len(principles)}: {principle}")
-            self._auto_embed()
+            self.add_principle_with_text(principle)
         
-        except FileNotFoundError:
-            print("devco not initialized. Run 'devco init' first.")
         except KeyboardInterrupt:
             print("\nCancelled.")
     
@@ -87,9 +56,11 @@ class PrinciplesManager:
                 print("Principle cannot be empty.")
                 return
             
-            principles = self.storage.load_principles()
-            principles.append(principle_text.strip())
-            self.storage.save_principles(principles)
+            with self.storage.locked():
+                principles = self.storage.load_principles()
+                principles.append(principle_text.strip())
+                records = self.storage.save_principles(principles)
+                self.storage.mark_dirty([("principle", records[-1]["id"])])
             
             print(f"Added principle #{len(principles)}: {principle_text.strip()}")
             self._auto_embed()
@@ -100,16 +71,19 @@ class PrinciplesManager:
     def remove_principle(self, number: int):
         """Remove a principle by number"""
         try:
-            principles = self.storage.load_principles()
-            
-            if number < 1 or number > len(principles):
-                print(f"No principle #{number} found. Use 'devco principles' to see available principles.")
-                return
-            
-            removed_principle = principles.pop(number - 1)
-            self.storage.save_principles(principles)
-            
-            print(f"Removed principle #{number}: {removed_principle}")
+            with self.storage.locked():
+                principles = self.storage.load_principle_records()
+                
+                if number < 1 or number > len(principles):
+                    print(f"No principle #{number} found. Use 'devco principles' to see available principles.")
+                    return
+                
+                # Later principles are renumbered but keep their ids and embeddings
+                removed_principle = principles.pop(number - 1)
+                self.storage.save_principles(principles)
+                self.storage.mark_dirty([("principle", removed_principle["id"])])
+            
+            print(f"Removed principle #{number}: {removed_principle['text']}")
             self._auto_embed()
         
         except FileNotFoundError:
@@ -118,7 +92,7 @@ class PrinciplesManager:
     def clear_principles(self):
         """Clear all principles after confirmation"""
         try:
-            principles = self.storage.load_principles()
+            principles = self.storage.load_principle_records()
             
             if not principles:
                 print("No principles to clear.")
@@ -127,7 +101,11 @@ class PrinciplesManager:
             confirm = input(f"Are you sure you want to clear all {len(principles)} principles? (y/N): ").strip().lower()
             
             if confirm in ('y', 'yes'):
-                self.storage.save_principles([])
+                with self.storage.locked():
+                    # Principles added while the prompt was open are cleared too
+                    principles = self.storage.load_principle_records()
+                    self.storage.save_principles([])
+                    self.storage.mark_dirty([("principle", record["id"]) for record in principles])
                 print("All principles cleared.")
                 self._auto_embed()
             else:
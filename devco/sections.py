@@ -3,6 +3,7 @@ Sections management for devco
 """
 from typing import Dict, Any
 from .storage import DevDocStorage
+from .coordinator import EmbedCoordinator
 
 
 class SectionsManager:
@@ -12,48 +13,25 @@ class SectionsManager:
         self.storage = storage
     
     def _auto_embed(self):
-        """Automatically regenerate embeddings after content changes"""
+        """Ask for embeddings to be refreshed in the background after content changes"""
         try:
-            import subprocess
-            import sys
-            
-            # Check if we have an API key configured
-            env_file = self.storage.devco_dir / ".env"
-            has_api_key = False
-            
-            if env_file.exists():
-                with open(env_file) as f:
-                    for line in f:
-                        if line.strip() and not line.startswith('#') and 'GOOGLE_API_KEY=' in line:
-                            key_value = line.split('=', 1)[1].strip()
-                            if key_value and key_value != '':
-                                has_api_key = True
-                                break
-            
-            if has_api_key:
-                # Start detached subprocess for embedding
-                subprocess.Popen(
-                    [sys.executable, "-m", "devco.cli", "_embed-all"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    stdin=subprocess.DEVNULL,
-                    start_new_session=True  # Detach from parent process
-                )
-            
+            EmbedCoordinator(self.storage).request()
         except Exception:
             pass  # Silent failure
     
+    def _section_items(self, section: Dict[str, Any]):
+        """Return the content items embedded for a section"""
+        return [("section", section['id']), ("section", f"{section['id']}_detail")]
+    
     def show_section(self, section_name: str):
         """Show a specific section"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
+            section = self.storage.load_section(section_name)
             
-            if section_name not in sections:
+            if section is None:
                 print(f"Section '{section_name}' not found. Use 'devco section add {section_name}' to create it.")
                 return
             
-            section = sections[section_name]
             print(f"Section: {section_name}")
             print("=" * (len(section_name) + 9))
             
@@ -69,10 +47,7 @@ class SectionsManager:
     def add_section(self, section_name: str):
         """Add a new section"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
-            
-            if section_name in sections:
+            if self.storage.load_section(section_name) is not None:
                 print(f"Section '{section_name}' already exists. Use 'devco section replace {section_name}' to update it.")
                 return
             
@@ -84,17 +59,8 @@ class SectionsManager:
             
             detail = input(f"Enter detail for section '{section_name}': ").strip()
             
-            # Add the section
-            sections[section_name] = {
-                'summary': summary,
-                'detail': detail
-            }
-            
-            data['sections'] = sections
-            self.storage.save_summary(data)
-            
-            print(f"Added section '{section_name}' successfully.")
-            self._auto_embed()
+            # Checked again under the write lock, as another writer may have got there first
+            self.add_section_with_content(section_name, summary, detail)
         
         except FileNotFoundError:
             print("devco not initialized. Run 'devco init' first.")
@@ -104,21 +70,14 @@ class SectionsManager:
     def add_section_with_content(self, section_name: str, summary: str, detail: str):
         """Add a new section with provided content (non-interactive)"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
-            
-            if section_name in sections:
-                print(f"Section '{section_name}' already exists. Use 'devco section replace {section_name}' to update it.")
-                return
-            
-            # Add the section
-            sections[section_name] = {
-                'summary': summary,
-                'detail': detail
-            }
-            
-            data['sections'] = sections
-            self.storage.save_summary(data)
+            with self.storage.locked():
+                if self.storage.load_section(section_name) is not None:
+                    print(f"Section '{section_name}' already exists. Use 'devco section replace {section_name}' to update it.")
+                    return
+                
+                # Add the section
+                section = self.storage.save_section(section_name, summary, detail)
+                self.storage.mark_dirty(self._section_items(section))
             
             print(f"Added section '{section_name}' successfully.")
             self._auto_embed()
@@ -129,10 +88,7 @@ class SectionsManager:
     def replace_section(self, section_name: str):
         """Replace an existing section"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
-            
-            if section_name not in sections:
+            if self.storage.load_section(section_name) is None:
                 print(f"Section '{section_name}' not found. Use 'devco section add {section_name}' to create it.")
                 return
             
@@ -144,17 +100,8 @@ class SectionsManager:
             
             detail = input(f"Enter new detail for section '{section_name}': ").strip()
             
-            # Update the section
-            sections[section_name] = {
-                'summary': summary,
-                'detail': detail
-            }
-            
-            data['sections'] = sections
-            self.storage.save_summary(data)
-            
-            print(f"Updated section '{section_name}' successfully.")
-            self._auto_embed()
+            # Checked again under the write lock, as another writer may have got there first
+            self.replace_section_with_content(section_name, summary, detail)
         
         except FileNotFoundError:
             print("devco not initialized. Run 'devco init' first.")
@@ -164,21 +111,14 @@ class SectionsManager:
     def replace_section_with_content(self, section_name: str, summary: str, detail: str):
         """Replace an existing section with provided content (non-interactive)"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
-            
-            if section_name not in sections:
-                print(f"Section '{section_name}' not found. Use 'devco section add {section_name}' to create it.")
-                return
-            
-            # Update the section
-            sections[section_name] = {
-                'summary': summary,
-                'detail': detail
-            }
-            
-            data['sections'] = sections
-            self.storage.save_summary(data)
+            with self.storage.locked():
+                if self.storage.load_section(section_name) is None:
+                    print(f"Section '{section_name}' not found. Use 'devco section add {section_name}' to create it.")
+                    return
+                
+                # Update the section
+                section = self.storage.save_section(section_name, summary, detail)
+                self.storage.mark_dirty(self._section_items(section))
             
             print(f"Updated section '{section_name}' successfully.")
             self._auto_embed()
@@ -189,19 +129,35 @@ class SectionsManager:
     def remove_section(self, section_name: str):
         """Remove a section"""
         try:
-            data = self.storage.load_summary()
-            sections = data.get('sections', {})
+            removed = self.storage.remove_section(section_name)
             
-            if section_name not in sections:
+            if removed is None:
                 print(f"Section '{section_name}' not found.")
                 return
             
-            del sections[section_name]
-            data['sections'] = sections
-            self.storage.save_summary(data)
+            self.storage.mark_dirty(self._section_items(removed))
             
             print(f"Removed section '{section_name}' successfully.")
             self._auto_embed()
         
+        except FileNotFoundError:
+            print("devco not initialized. Run 'devco init' first.")
+    
+    def rename_section(self, section_name: str, new_name: str):
+        """Rename a section, keeping its id so its embeddings stay valid"""
+        try:
+            with self.storage.locked():
+                if self.storage.load_section(section_name) is None:
+                    print(f"Section '{section_name}' not found.")
+                    return
+                
+                if self.storage.load_section(new_name) is not None:
+                    print(f"Section '{new_name}' already exists.")
+                    return
+                
+                self.storage.rename_section(section_name, new_name)
+            
+            print(f"Renamed section '{section_name}' to '{new_name}'.")
+        
         except FileNotFoundError:
             print("devco not initialized. Run 'devco init' first.")
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""
+Memory-mapped vector matrix sidecar for devco - searches without decoding rows
+"""
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from .storage import DevDocStorage
+from .vectors import (decode_vector, hamming_distances, int8_scales, quantize_binary, quantize_int8)
+
+
+# Vectors read from SQLite per step while writing a matrix
+BUILD_PAGE_SIZE = 1000
+
+# Code elements scored per step by a quantized first pass, so each block's
+# temporaries stay in CPU cache
+SCAN_BLOCK_ELEMENTS = 1 << 18
+
+# Candidates a quantized first pass keeps for exact rescoring
+DEFAULT_CANDIDATES = 200
+
+
+def _top(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the highest scores, best first"""
+    if limit < len(scores):
+        top = np.argpartition(-scores, limit)[:limit]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class VectorSidecar:
+    """Published vectors of a model as memory-mapped .npy files in .devco/index/
+
+    The matrix file holds one L2-normalized float32 row per vector used by
+    the model's published chunks, and a second file maps each row to its
+    vector id. File names carry the index generation they were built from
+    and the token of its publish, so a search finds the matrix of the
+    generation it reads without touching the embeddings table, and builds
+    it if it is missing, also after a checkout brings back a devco.db whose
+    generation numbers were reused. Changes to published rows publish a new
+    generation rather than alter one. Searching maps the files read-only, so the OS page
+    cache holds them between queries and nothing is copied.
+
+    A search may first scan a coarser copy of the matrix and then rescore
+    only the best candidates against the full-precision rows. The copy is
+    quantized codes, int8 or one sign bit per dimension, of the leading
+    dimensions of each row renormalized, or both; it is written next to the
+    matrix on first use.
+    """
+
+    def __init__(self, storage: DevDocStorage):
+        self.storage = storage
+        self.index_dir = storage.devco_dir / "index"
+        self._mapped: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def _slug(self, model: str) -> str:
+        return hashlib.sha1(model.encode('utf-8')).hexdigest()[:12]
+
+    def _files(self, stem: str) -> Tuple[Path, Path]:
+        return self.index_dir / f"{stem}.npy", self.index_dir / f"{stem}.ids.npy"
+
+    def _prefix_stem(self, stem: str, dimensions: int) -> str:
+        return f"{stem}.p{dimensions}"
+
+    def _code_files(self, stem: str, quantization: str) -> Dict[str, Path]:
+        if quantization == "int8":
+            return {"int8": self.index_dir / f"{stem}.int8.npy", "scales": self.index_dir / f"{stem}.scales.npy"}
+        if quantization == "binary":
+            return {"bits": self.index_dir / f"{stem}.bits.npy"}
+        raise ValueError(f"Unknown vector quantization: {quantization}")
+
+    def _build_codes(self, stem: str, quantization: str):
+        """Write the quantized codes of a matrix next to it, if missing"""
+        files = self._code_files(stem, quantization)
+        if all(path.exists() for path in files.values()):
+            return
+
+        matrix = np.load(self._files(stem)[0], mmap_mode='r')
+        rows, dimensions = matrix.shape
+        pages = range(0, rows, BUILD_PAGE_SIZE)
+        suffix = f".tmp-{os.getpid()}.npy"
+        tmp = {name: path.with_name(path.name[:-len(".npy")] + suffix) for name, path in files.items()}
+        if quantization == "int8":
+            scales = np.ones(dimensions, dtype=np.float32)
+            if rows:
+                scales = np.max([int8_scales(matrix[start:start + BUILD_PAGE_SIZE]) for start in pages], axis=0)
+            np.save(tmp["scales"], scales)
+            codes = np.lib.format.open_memmap(tmp["int8"], mode='w+', dtype=np.int8, shape=(rows, dimensions))
+            for start in pages:
+                codes[start:start + BUILD_PAGE_SIZE] = quantize_int8(matrix[start:start + BUILD_PAGE_SIZE], scales)
+        else:
+            codes = np.lib.format.open_memmap(tmp["bits"], mode='w+', dtype=np.uint8,
+                                              shape=(rows, (dimensions + 7) // 8))
+            for start in pages:
+                codes[start:start + BUILD_PAGE_SIZE] = quantize_binary(matrix[start:start + BUILD_PAGE_SIZE])
+        codes.flush()
+        del codes, matrix
+        for name, path in files.items():
+            os.replace(tmp[name], path)
+
+    def _build_prefix(self, stem: str, dimensions: int) -> str:
+        """Write the renormalized leading dimensions of a matrix next to it, returning their stem"""
+        prefix_stem = self._prefix_stem(stem, dimensions)
+        prefix_file = self._files(prefix_stem)[0]
+        if prefix_file.exists():
+            return prefix_stem
+
+        matrix = np.load(self._files(stem)[0], mmap_mode='r')
+        tmp = prefix_file.with_name(f"{prefix_stem}.tmp-{os.getpid()}.npy")
+        prefix = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32, shape=(len(matrix), dimensions))
+        for start in range(0, len(matrix), BUILD_PAGE_SIZE):
+            block = np.array(matrix[start:start + BUILD_PAGE_SIZE, :dimensions])
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            prefix[start:start + BUILD_PAGE_SIZE] = block / norms
+        prefix.flush()
+        del prefix, matrix
+        os.replace(tmp, prefix_file)
+        return prefix_stem
+
+    def _arrays(self, stem: str, quantization: str) -> Dict[str, np.ndarray]:
+        """Map a matrix, its ids and any codes a quantized search needs
+
+        Prefix matrices share the ids of the full matrix they were cut from
+        and are mapped without them.
+        """
+        if stem not in self._mapped:
+            base = stem.split(".")[0]
+            self._mapped = {key: arrays for key, arrays in self._mapped.items() if key.split(".")[0] == base}
+            matrix_file, ids_file = self._files(stem)
+            self._mapped[stem] = {"matrix": np.load(matrix_file, mmap_mode='r')}
+            if stem == base:
+                self._mapped[stem]["ids"] = np.load(ids_file, mmap_mode='r')
+        arrays = self._mapped[stem]
+        if quantization != "none" and not set(self._code_files(stem, quantization)) <= set(arrays):
+            self._build_codes(stem, quantization)
+            for name, path in self._code_files(stem, quantization).items():
+                arrays[name] = np.load(path, mmap_mode='r')
+        return arrays
+
+    def vectors(self, stem: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the mapped ids and normalized matrix written under a stem"""
+        arrays = self._arrays(stem, "none")
+        return arrays["ids"], arrays["matrix"]
+
+    def _first_pass(self, arrays: Dict[str, np.ndarray], quantization: str, query: np.ndarray) -> np.ndarray:
+        """Approximate scores of every row from a coarse matrix or its codes, higher is closer"""
+        if quantization == "none":
+            return arrays["matrix"] @ query
+        if quantization == "int8":
+            codes, weights = arrays["int8"], query * arrays["scales"]
+            step = max(1, SCAN_BLOCK_ELEMENTS // codes.shape[1])
+            scores = np.empty(len(codes), dtype=np.float32)
+            for start in range(0, len(codes), step):
+                block = codes[start:start + step]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights
+            return scores
+
+        codes, query_bits = arrays["bits"], quantize_binary(query)
+        step = max(1, SCAN_BLOCK_ELEMENTS // codes.shape[1])
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), step):
+            block = codes[start:start + step]
+            scores[start:start + len(block)] = -hamming_distances(block, query_bits)
+        return scores
+
+    def build(self, conn: sqlite3.Connection, model: str, generation: int, where: str, params: Tuple
+              ) -> Optional[str]:
+        """Write the matrix of a published vector set, returning its file stem
+
+        Returns None for an empty set. Raises ValueError if the set mixes
+        vector dimensions and cannot form a matrix.
+        """
+        row = conn.execute("SELECT token FROM embedding_generations WHERE generation = ?",
+                           (generation,)).fetchone()
+        stem = f"{self._slug(model)}-g{generation}"
+        if row and row[0]:
+            stem += f"-{row[0][:16]}"
+        matrix_file, ids_file = self._files(stem)
+        if matrix_file.exists():
+            return stem
+
+        selected = f"""
+            FROM vectors v WHERE v.id IN (
+                SELECT e.vector_id FROM embeddings e WHERE e.generation <= ? AND {where})
+        """
+        dimensions = [row[0] for row in conn.execute(f"SELECT DISTINCT v.dimensions {selected}",
+                                                     (generation,) + params)]
+        if not dimensions:
+            return None
+        if len(dimensions) > 1:
+            raise ValueError(f"Vectors of {model} have mixed dimensions: {sorted(dimensions)}")
+        count = conn.execute(f"SELECT COUNT(*) {selected}", (generation,) + params).fetchone()[0]
+
+        self.index_dir.mkdir(exist_ok=True)
+        gitignore = self.index_dir / ".gitignore"
+        if not gitignore.exists():
+            # Derived from devco.db, so never committed
+            gitignore.write_text("*\n")
+
+        # Write under temporary names and rename the matrix last, so a reader
+        # that finds the matrix also finds its ids
+        suffix = f".tmp-{os.getpid()}.npy"
+        matrix_tmp = self.index_dir / (stem + suffix)
+        ids_tmp = self.index_dir / (stem + ".ids" + suffix)
+        matrix = np.lib.format.open_memmap(matrix_tmp, mode='w+', dtype=np.float32,
+                                           shape=(count, dimensions[0]))
+        ids = np.lib.format.open_memmap(ids_tmp, mode='w+', dtype=np.int64, shape=(count,))
+        cursor = conn.execute(f"SELECT v.id, v.embedding {selected} ORDER BY v.id", (generation,) + params)
+        row = 0
+        while True:
+            page = cursor.fetchmany(BUILD_PAGE_SIZE)
+            if not page:
+                break
+            block = decode_vector(b"".join(blob for _, blob in page)).reshape(len(page), dimensions[0])
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix[row:row + len(page)] = block / norms
+            ids[row:row + len(page)] = [vector_id for vector_id, _ in page]
+            row += len(page)
+        matrix.flush()
+        ids.flush()
+        del matrix, ids
+        os.replace(ids_tmp, ids_file)
+        os.replace(matrix_tmp, matrix_file)
+
+        self.remove(model, keep=stem)
+        return stem
+
+    def remove(self, model: str, keep: Optional[str] = None):
+        """Delete a model's matrix files, except those of the stem to keep"""
+        self._mapped = {stem: arrays for stem, arrays in self._mapped.items()
+                        if keep is not None and stem.split(".")[0] == keep}
+        if not self.index_dir.exists():
+            return
+        for path in self.index_dir.glob(f"{self._slug(model)}-*"):
+            if keep is None or not path.name.startswith(keep + "."):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass  # Still mapped by a reader on Windows; removed next time
+
+    def clear(self):
+        """Delete the matrix files of every model"""
+        self._mapped = {}
+        if not self.index_dir.exists():
+            return
+        for path in self.index_dir.glob("*.npy"):
+            try:
+                path.unlink()
+            except OSError:
+                pass  # Still mapped by a reader on Windows; removed next time
+
+    def usage(self) -> Dict[str, int]:
+        """Return the number of matrix files and the bytes they take"""
+        paths = list(self.index_dir.glob("*.npy")) if self.index_dir.exists() else []
+        return {"files": len(paths), "bytes": sum(path.stat().st_size for path in paths)}
+
+    def search(self, conn: sqlite3.Connection, model: str, generation: int, where: str, params: Tuple,
+               query: Sequence[float], limit: int, quantization: str = "none",
+               candidates: int = DEFAULT_CANDIDATES, prefix_dims: int = 0) -> List[Tuple[int, float]]:
+        """Return the (vector id, cosine similarity) pairs closest to query, best first
+
+        Builds the matrix first if this generation has none yet. With int8
+        or binary quantization, or a prefix_dims shorter than the vectors,
+        only the best candidates of a scan over the coarse copy are scored
+        at full precision; the returned similarities are exact either way.
+        """
+        stem = self.build(conn, model, generation, where, params)
+        if stem is None:
+            return []
+        arrays = self._arrays(stem, "none")
+        ids, matrix = arrays["ids"], arrays["matrix"]
+
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if len(query) != matrix.shape[1] or norm == 0:
+            scores = np.zeros(len(ids), dtype=np.float32)
+            return [(int(ids[i]), float(scores[i])) for i in _top(scores, limit)]
+        query = query / norm
+
+        coarse, coarse_query = stem, query
+        if 0 < prefix_dims < matrix.shape[1] and np.linalg.norm(query[:prefix_dims]) > 0:
+            coarse = self._build_prefix(stem, prefix_dims)
+            coarse_query = query[:prefix_dims] / np.linalg.norm(query[:prefix_dims])
+        if (quantization == "none" and coarse == stem) or len(ids) <= max(candidates, limit):
+            # Nothing coarser to scan, or rescoring would score every row anyway
+            scores = matrix @ query
+            return [(int(ids[i]), float(scores[i])) for i in _top(scores, limit)]
+
+        # Read candidate rows in file order
+        approximate = self._first_pass(self._arrays(coarse, quantization), quantization, coarse_query)
+        pool = np.sort(_top(approximate, max(candidates, limit)))
+        scores = matrix[pool] @ query
+        return [(int(ids[pool[i]]), float(scores[i])) for i in _top(scores, limit)]
@@ -1,12 +1,82 @@
 """
 Storage module for devco - handles .devco directory structure and data persistence
 """
+import copy
+import functools
+import hashlib
 import json
 import os
 import sqlite3
 import subprocess
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Callable, Container, Dict, Any, List, Optional, Set, Tuple, Union
+from .migrations import MigrationRunner
+from .locking import lock, unlock
+
+
+DOCUMENT_BACKENDS = ("json", "sqlite")
+
+# Seconds a devco.db writer waits for another writer before failing
+DB_BUSY_TIMEOUT = 30.0
+
+# Seconds a git commit waits to fold the WAL into devco.db
+CHECKPOINT_TIMEOUT = 5.0
+
+
+# .devco files committed by the git auto-commit
+GIT_TRACKED_FILES = ("config.json", "principles.json", "summary.json", "devco.db", ".gitignore")
+
+# SQLite WAL files, locks, runner requests, temporary files and the embedding
+# cache, kept out of git
+GITIGNORE_PATTERNS = ("*-wal", "*-shm", "*.lock", "*.request", "*.queue", ".*.tmp-*", "cache.db*")
+
+
+def _is_object_id(text: str) -> bool:
+    return len(text) in (40, 64) and all(c in "0123456789abcdef" for c in text)
+
+
+def _blob_id(path: Path, length: int) -> str:
+    """Return the git object id of a file's content, for SHA-1 or SHA-256 repositories"""
+    data = path.read_bytes()
+    digest = hashlib.sha256() if length == 64 else hashlib.sha1()
+    digest.update(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _atomic_write(path: Path, text: str):
+    """Replace a file's content so readers see either the old or the new file, never a partial one"""
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    try:
+        with open(tmp, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _locked(method):
+    """Run a storage method while holding the project write lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class _TakenIds:
+    """Membership test for section ids already used in the sections table"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+    
+    def __contains__(self, item_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM sections WHERE id = ?", (item_id,)).fetchone() is not None
 
 
 class DevDocStorage:
@@ -15,6 +85,12 @@ class DevDocStorage:
     def __init__(self, project_root: str = "."):
         self.project_root = Path(project_root)
         self.devco_dir = self.project_root / ".devco"
+        self._schema_checked = False
+        self._transaction = None
+        self._lock_handle = None
+        self._lock_depth = 0
+        self._commit_queue = None
+        self._gitignore_checked = False
         
     def init(self):
         """Initialize the .devco directory structure"""
@@ -27,17 +103,29 @@ class DevDocStorage:
             config = {
                 "version": "0.1.0",
                 "embedding_model": "gemini-embedding-exp-03-07-2048",
+                "chunker": "markdown",
                 "chunk_size": 500,
-                "chunk_overlap": 50
+                "chunk_overlap": 50,
+                "chunk_unit": "chars",
+                "embedding_batch_size": 100,
+                "embedding_batch_chars": 50000,
+                "embedding_concurrency": 4,
+                "embedding_rate_limit": 10,
+                "embedding_max_retries": 5,
+                "embedding_item_retries": 2,
+                "embed_debounce_seconds": 2,
+                "git_commit_debounce_seconds": 2,
+                "embedding_cache_max_mb": 256,
+                "vector_quantization": "none",
+                "quantization_candidates": 200,
+                "vector_prefix_dims": 0
             }
-            with open(config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+            self._write_json("config.json", config)
         
         # Create principles.json if it doesn't exist
         principles_file = self.devco_dir / "principles.json"
         if not principles_file.exists():
-            with open(principles_file, 'w') as f:
-                json.dump([], f, indent=2)
+            self._write_json("principles.json", [])
         
         # Create summary.json if it doesn't exist
         summary_file = self.devco_dir / "summary.json"
@@ -46,29 +134,20 @@ class DevDocStorage:
                 "summary": "",
                 "sections": {}
             }
-            with open(summary_file, 'w') as f:
-                json.dump(summary, f, indent=2)
+            self._write_json("summary.json", summary)
         
         # Create SQLite database if it doesn't exist
         db_file = self.devco_dir / "devco.db"
         if not db_file.exists():
-            conn = sqlite3.connect(db_file)
-            # Create embeddings table
-            conn.execute("""
-                CREATE TABLE embeddings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    content_type TEXT NOT NULL,
-                    content_id TEXT NOT NULL,
-                    chunk_text TEXT NOT NULL,
-                    embedding BLOB NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            # Create index for faster lookups
-            conn.execute("CREATE INDEX idx_content ON embeddings(content_type, content_id)")
-            conn.commit()
+            conn = self._connect(db_file)
+            # Create the tables at the latest schema version
+            self.migrate_schema(conn)
+            self._schema_checked = True
             conn.close()
         
+        # Keep SQLite's WAL files, locks and temporary files out of git
+        self.ensure_gitignore()
+        
         # Create .env file if it doesn't exist
         env_file = self.devco_dir / ".env"
         if not env_file.exists():
@@ -78,70 +157,518 @@ class DevDocStorage:
                 f.write("# Uncomment and set your preferred embedding model:\n")
                 f.write("# DEVCO_EMBEDDING_MODEL=gemini-embedding-exp-03-07-2048\n")
     
-    def load_config(self) -> Dict[str, Any]:
-        """Load configuration from config.json"""
-        config_file = self.devco_dir / "config.json"
-        if not config_file.exists():
+    def ensure_gitignore(self):
+        """Add any missing GITIGNORE_PATTERNS to .devco/.gitignore, once per storage object
+        
+        Called wherever devco creates files in .devco, so projects initialized
+        before a pattern was added pick it up too. Lines users added are kept.
+        """
+        if self._gitignore_checked or not self.devco_dir.exists():
+            return
+        self._gitignore_checked = True
+        gitignore = self.devco_dir / ".gitignore"
+        try:
+            lines = gitignore.read_text().splitlines()
+        except FileNotFoundError:
+            lines = []
+        missing = [pattern for pattern in GITIGNORE_PATTERNS if pattern not in lines]
+        if missing:
+            try:
+                _atomic_write(gitignore, "".join(f"{line}\n" for line in lines + missing))
+            except OSError:
+                self._gitignore_checked = False  # Read-only checkout; try again next time
+    
+    @contextmanager
+    def locked(self):
+        """Hold the project write lock (.devco/write.lock) for a read-modify-write
+        
+        Serializes writers across processes; readers never take it. The lock
+        is reentrant within one storage object.
+        """
+        if self._lock_depth == 0:
+            self.ensure_gitignore()
+            handle = open(self.devco_dir / "write.lock", 'a')
+            try:
+                lock(handle)
+            except BaseException:
+                handle.close()
+                raise
+            self._lock_handle = handle
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                unlock(self._lock_handle)
+                self._lock_handle.close()
+                self._lock_handle = None
+    
+    @contextmanager
+    def transaction(self):
+        """Group several edits into one write per file, one git commit and one embed request
+        
+        Inside the block, saves and dirty marks are kept in memory and loads
+        see them, and document rows are written on one database transaction.
+        Everything is written when the block ends, and dropped if it raises.
+        The project write lock is held throughout. A nested transaction joins
+        the outer one.
+        """
+        if self._transaction is not None:
+            yield
+            return
+        
+        with self.locked():
+            staged = {"files": {}, "dirty": [], "actions": [], "deferred": {}, "conn": None}
+            self._transaction = staged
+            try:
+                yield
+            except BaseException:
+                if staged["conn"] is not None:
+                    staged["conn"].rollback()
+                raise
+            finally:
+                self._transaction = None
+                if staged["conn"] is not None:
+                    staged["conn"].commit()
+                    staged["conn"].close()
+            
+            for name, data in staged["files"].items():
+                self._write_json(name, data)
+            if staged["dirty"]:
+                self.mark_dirty(staged["dirty"])
+            if staged["actions"]:
+                self._record_actions(staged["actions"])
+        
+        for callback in staged["deferred"].values():
+            callback()
+    
+    def defer(self, key: str, callback: Callable[[], Any]) -> bool:
+        """Run callback once when the current transaction is written
+        
+        Returns False, without calling it, if no transaction is active.
+        """
+        if self._transaction is None:
+            return False
+        self._transaction["deferred"].setdefault(key, callback)
+        return True
+    
+    def _read_json(self, name: str) -> Any:
+        """Load a .devco JSON file, or its pending version inside a transaction"""
+        if self._transaction is not None and name in self._transaction["files"]:
+            return copy.deepcopy(self._transaction["files"][name])
+        
+        path = self.devco_dir / name
+        if not path.exists():
             raise FileNotFoundError("devco not initialized. Run 'devco init' first.")
         
-        with open(config_file) as f:
+        with open(path) as f:
             return json.load(f)
     
+    def _write_json(self, name: str, data: Any):
+        """Write a .devco JSON file, or keep it pending inside a transaction"""
+        if self._transaction is not None:
+            self._transaction["files"][name] = copy.deepcopy(data)
+            return
+        
+        _atomic_write(self.devco_dir / name, json.dumps(data, indent=2))
+    
+    @contextmanager
+    def _documents(self):
+        """Connection for document rows, shared with and committed by a running transaction"""
+        if self._transaction is not None:
+            if self._transaction["conn"] is None:
+                self._transaction["conn"] = self.get_db_connection()
+            yield self._transaction["conn"]
+            return
+        
+        conn = self.get_db_connection()
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def document_backend(self) -> str:
+        """Return the backend holding principles, summary and sections, "json" or "sqlite" """
+        try:
+            return self.load_config().get('document_backend', 'json')
+        except FileNotFoundError:
+            return 'json'
+    
+    @_locked
+    def set_document_backend(self, backend: str):
+        """Move principles, summary and sections to another backend
+        
+        Switching to "sqlite" imports the JSON files into devco.db; switching
+        to "json" exports the rows back to the files.
+        """
+        if backend not in DOCUMENT_BACKENDS:
+            raise ValueError(f"Unknown document backend: {backend}")
+        if backend == self.document_backend():
+            return
+        
+        principles = self.load_principle_records()
+        summary = self.load_summary()
+        config = self.load_config()
+        config['document_backend'] = backend
+        with self.transaction():
+            self.save_config(config)
+            self.save_principles(principles)
+            self.save_summary(summary)
+    
+    @_locked
+    def export_documents(self):
+        """Write principles.json and summary.json from the current documents
+        
+        The output is deterministic: records and sections keep their order
+        and each has the same keys in the same order.
+        """
+        principles = [{"id": record["id"], "text": record["text"]} for record in self.load_principle_records()]
+        summary = self.load_summary()
+        sections = {name: {"summary": section.get('summary', ''), "detail": section.get('detail', ''),
+                           "id": section['id']}
+                    for name, section in summary.get('sections', {}).items()}
+        
+        for name, data in (("principles.json", principles),
+                           ("summary.json", {"summary": summary.get('summary', ''), "sections": sections})):
+            _atomic_write(self.devco_dir / name, json.dumps(data, indent=2) + "\n")
+        
+        self._git_commit_devco_changes("export documents")
+    
+    def load_config(self) -> Dict[str, Any]:
+        """Load configuration from config.json"""
+        return self._read_json("config.json")
+    
+    @_locked
     def save_config(self, config: Dict[str, Any]):
         """Save configuration to config.json"""
-        config_file = self.devco_dir / "config.json"
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+        self._write_json("config.json", config)
         
         # Auto-commit changes
         self._git_commit_devco_changes("update config")
     
-    def load_principles(self) -> List[str]:
-        """Load principles from principles.json"""
-        principles_file = self.devco_dir / "principles.json"
-        if not principles_file.exists():
-            raise FileNotFoundError("devco not initialized. Run 'devco init' first.")
+    def new_item_id(self, taken: Container[str]) -> str:
+        """Return a fresh stable id for a principle or section"""
+        while True:
+            item_id = uuid.uuid4().hex[:8]
+            if item_id not in taken:
+                return item_id
+    
+    def load_principle_records(self) -> List[Dict[str, str]]:
+        """Load principles as {"id", "text"} records
         
-        with open(principles_file) as f:
-            return json.load(f)
+        Principles saved before ids were stored get their position as id,
+        which is the content id their embeddings were stored under.
+        """
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                return [{"id": item_id, "text": text} for item_id, text in
+                        conn.execute("SELECT id, text FROM principles ORDER BY position")]
+        
+        entries = self._read_json("principles.json")
+        return [{"id": str(i + 1), "text": entry} if isinstance(entry, str) else entry
+                for i, entry in enumerate(entries)]
     
-    def save_principles(self, principles: List[str]):
-        """Save principles to principles.json"""
-        principles_file = self.devco_dir / "principles.json"
-        with open(principles_file, 'w') as f:
-            json.dump(principles, f, indent=2)
+    def load_principles(self) -> List[str]:
+        """Load principles from principles.json or devco.db"""
+        return [record["text"] for record in self.load_principle_records()]
+    
+    @_locked
+    def save_principles(self, principles: List[Union[str, Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Save principles to principles.json or devco.db
+        
+        Accepts records or plain strings. A string keeps the id of an existing
+        principle with the same text, so reordering or removing principles
+        does not change the ids of the others. Returns the saved records.
+        """
+        try:
+            current = self.load_principle_records()
+        except FileNotFoundError:
+            current = []
+        explicit = {entry["id"] for entry in principles if isinstance(entry, dict)}
+        taken = explicit | {record["id"] for record in current}
+        by_text: Dict[str, List[str]] = {}
+        for record in current:
+            if record["id"] not in explicit:
+                by_text.setdefault(record["text"], []).append(record["id"])
+        
+        records = []
+        for entry in principles:
+            if isinstance(entry, dict):
+                records.append(entry)
+                continue
+            ids = by_text.get(entry)
+            item_id = ids.pop(0) if ids else self.new_item_id(taken)
+            taken.add(item_id)
+            records.append({"id": item_id, "text": entry})
+        
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                conn.execute("DELETE FROM principles")
+                conn.executemany("INSERT INTO principles (id, position, text) VALUES (?, ?, ?)",
+                                 [(record["id"], i, record["text"]) for i, record in enumerate(records)])
+        else:
+            self._write_json("principles.json", records)
         
         # Auto-commit changes
         if len(principles) == 0:
             self._git_commit_devco_changes("clear principles")
         else:
             self._git_commit_devco_changes("update principles")
+        return records
     
     def load_summary(self) -> Dict[str, Any]:
-        """Load summary from summary.json"""
-        summary_file = self.devco_dir / "summary.json"
-        if not summary_file.exists():
-            raise FileNotFoundError("devco not initialized. Run 'devco init' first.")
+        """Load summary from summary.json or devco.db
         
-        with open(summary_file) as f:
-            return json.load(f)
+        Every section carries a stable "id". Sections saved before ids were
+        stored get their name as id, which is the content id their embeddings
+        were stored under.
+        """
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                row = conn.execute("SELECT text FROM project_summary WHERE id = 1").fetchone()
+                return {
+                    "summary": row[0] if row else "",
+                    "sections": {name: {"summary": summary, "detail": detail, "id": item_id}
+                                 for item_id, name, summary, detail in conn.execute(
+                                     "SELECT id, name, summary, detail FROM sections ORDER BY position")}
+                }
+        
+        summary = self._read_json("summary.json")
+        for section_name, section in summary.get('sections', {}).items():
+            section.setdefault('id', section_name)
+        return summary
     
+    @_locked
     def save_summary(self, summary: Dict[str, Any]):
-        """Save summary to summary.json"""
-        summary_file = self.devco_dir / "summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        """Save summary to summary.json or devco.db
+        
+        Sections without an "id" keep the id of the existing section with the
+        same name, or get a new one; ids are filled in on the given dict.
+        """
+        try:
+            current = self.load_summary().get('sections', {})
+        except FileNotFoundError:
+            current = {}
+        sections = summary.get('sections', {})
+        taken = {section['id'] for section in current.values()}
+        taken.update(section['id'] for section in sections.values() if 'id' in section)
+        for section_name, section in sections.items():
+            if 'id' not in section:
+                if section_name in current:
+                    section['id'] = current[section_name]['id']
+                else:
+                    section['id'] = self.new_item_id(taken)
+                taken.add(section['id'])
+        
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                self._write_project_summary(conn, summary.get('summary', ''))
+                conn.execute("DELETE FROM sections")
+                conn.executemany("""
+                    INSERT INTO sections (id, name, position, summary, detail) VALUES (?, ?, ?, ?, ?)
+                """, [(section['id'], name, i, section.get('summary', ''), section.get('detail', ''))
+                      for i, (name, section) in enumerate(sections.items())])
+        else:
+            self._write_json("summary.json", summary)
         
         # Auto-commit changes
         self._git_commit_devco_changes("update summary")
     
-    def get_db_connection(self) -> sqlite3.Connection:
-        """Get a connection to the SQLite database"""
+    def _write_project_summary(self, conn: sqlite3.Connection, text: str):
+        conn.execute("INSERT OR REPLACE INTO project_summary (id, text) VALUES (1, ?)", (text,))
+    
+    @_locked
+    def save_project_summary(self, text: str):
+        """Replace the project summary, leaving sections untouched"""
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                self._write_project_summary(conn, text)
+            self._git_commit_devco_changes("update summary")
+            return
+        
+        summary = self.load_summary()
+        summary['summary'] = text
+        self.save_summary(summary)
+    
+    def load_section(self, name: str) -> Optional[Dict[str, Any]]:
+        """Load one section by name, or None if there is none"""
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                row = conn.execute("SELECT id, summary, detail FROM sections WHERE name = ?", (name,)).fetchone()
+            return {"summary": row[1], "detail": row[2], "id": row[0]} if row else None
+        
+        return self.load_summary().get('sections', {}).get(name)
+    
+    @_locked
+    def save_section(self, name: str, summary: str, detail: str) -> Dict[str, Any]:
+        """Create or replace one section, keeping its id and position; returns it"""
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                row = conn.execute("SELECT id FROM sections WHERE name = ?", (name,)).fetchone()
+                if row:
+                    item_id = row[0]
+                    conn.execute("UPDATE sections SET summary = ?, detail = ? WHERE id = ?",
+                                 (summary, detail, item_id))
+                else:
+                    item_id = self.new_item_id(_TakenIds(conn))
+                    conn.execute("""
+                        INSERT INTO sections (id, name, position, summary, detail)
+                        VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM sections), ?, ?)
+                    """, (item_id, name, summary, detail))
+            self._git_commit_devco_changes("update summary")
+            return {"summary": summary, "detail": detail, "id": item_id}
+        
+        data = self.load_summary()
+        sections = data.setdefault('sections', {})
+        section = {"summary": summary, "detail": detail}
+        if name in sections:
+            section['id'] = sections[name]['id']
+        sections[name] = section
+        self.save_summary(data)
+        return section
+    
+    @_locked
+    def remove_section(self, name: str) -> Optional[Dict[str, Any]]:
+        """Delete one section, returning it, or None if there is none"""
+        section = self.load_section(name)
+        if section is None:
+            return None
+        
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                conn.execute("DELETE FROM sections WHERE id = ?", (section['id'],))
+            self._git_commit_devco_changes("update summary")
+            return section
+        
+        data = self.load_summary()
+        data['sections'].pop(name)
+        self.save_summary(data)
+        return section
+    
+    @_locked
+    def rename_section(self, name: str, new_name: str):
+        """Rename a section, keeping its id and position"""
+        if self.document_backend() == 'sqlite':
+            with self._documents() as conn:
+                conn.execute("UPDATE sections SET name = ? WHERE name = ?", (new_name, name))
+            self._git_commit_devco_changes("update summary")
+            return
+        
+        data = self.load_summary()
+        data['sections'] = {(new_name if section_name == name else section_name): section
+                            for section_name, section in data.get('sections', {}).items()}
+        self.save_summary(data)
+    
+    def get_db_connection(self, migrate: bool = True) -> sqlite3.Connection:
+        """Get a connection to the SQLite database
+        
+        The first connection upgrades an older database to the current
+        schema, unless migrate is False.
+        """
         db_file = self.devco_dir / "devco.db"
         if not db_file.exists():
             raise FileNotFoundError("devco not initialized. Run 'devco init' first.")
         
-        return sqlite3.connect(db_file)
+        conn = self._connect(db_file)
+        if migrate and not self._schema_checked:
+            self.migrate_schema(conn)
+            self._schema_checked = True
+        return conn
+    
+    def _connect(self, db_file: Path) -> sqlite3.Connection:
+        """Open devco.db in WAL mode, so readers never wait for a writer"""
+        self.ensure_gitignore()
+        conn = sqlite3.connect(db_file, timeout=DB_BUSY_TIMEOUT)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass  # Another connection is switching it; the mode is persistent
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _checkpoint(self):
+        """Copy the WAL into devco.db so the file committed to git is complete"""
+        try:
+            conn = sqlite3.connect(self.devco_dir / "devco.db", timeout=CHECKPOINT_TIMEOUT)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(FULL)")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass  # A later commit picks up what this one missed
+    
+    def database_stats(self) -> Dict[str, int]:
+        """Report the page usage of devco.db and the bytes it and its WAL take on disk"""
+        conn = self.get_db_connection()
+        stats = {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                 for pragma in ("page_size", "page_count", "freelist_count")}
+        conn.close()
+        wal_file = self.devco_dir / "devco.db-wal"
+        stats["file_bytes"] = (self.devco_dir / "devco.db").stat().st_size
+        stats["wal_bytes"] = wal_file.stat().st_size if wal_file.exists() else 0
+        return stats
+    
+    def vacuum(self):
+        """Rewrite devco.db without free pages, refresh its planner statistics and commit it
+        
+        Waits for other writers like any write, and leaves an empty WAL.
+        """
+        conn = self.get_db_connection()
+        try:
+            conn.execute("VACUUM")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+        self._git_commit_devco_changes("compact database")
+    
+    def migrate_schema(self, conn: sqlite3.Connection):
+        """Apply any pending schema migrations to a devco.db connection
+        
+        Upgrading holds the project write lock, so of several processes
+        opening an old database at once one migrates and the others find
+        the work done.
+        """
+        if not MigrationRunner(conn).pending():
+            return
+        try:
+            config = self.load_config()
+        except FileNotFoundError:
+            config = {}
+        with self.locked():
+            MigrationRunner(conn, config).run()
+    
+    def mark_dirty(self, items: List[Tuple[str, str]]):
+        """Queue (content_type, content_id) items whose embeddings need refreshing"""
+        if self._transaction is not None:
+            self._transaction["dirty"].extend(items)
+            return
+        
+        conn = self.get_db_connection()
+        conn.executemany("INSERT INTO dirty_items (content_type, content_id) VALUES (?, ?)", items)
+        conn.commit()
+        conn.close()
+    
+    def load_dirty_items(self) -> Tuple[int, Set[Tuple[str, str]]]:
+        """Return the last queue id and the distinct queued items up to it"""
+        conn = self.get_db_connection()
+        rows = conn.execute("SELECT id, content_type, content_id FROM dirty_items ORDER BY id").fetchall()
+        conn.close()
+        last_id = rows[-1][0] if rows else 0
+        return last_id, {(content_type, content_id) for _, content_type, content_id in rows}
+    
+    def clear_dirty_items(self, up_to_id: int, keep: Set[Tuple[str, str]] = frozenset()):
+        """Remove queue entries up to up_to_id, except for items in keep"""
+        conn = self.get_db_connection()
+        rows = conn.execute("SELECT id, content_type, content_id FROM dirty_items WHERE id <= ?",
+                            (up_to_id,)).fetchall()
+        conn.executemany("DELETE FROM dirty_items WHERE id = ?",
+                         [(row_id,) for row_id, content_type, content_id in rows
+                          if (content_type, content_id) not in keep])
+        conn.commit()
+        conn.close()
     
     def is_initialized(self) -> bool:
         """Check if devco is initialized in the current directory"""
@@ -149,61 +676,94 @@ class DevDocStorage:
                 (self.devco_dir / "config.json").exists() and
                 (self.devco_dir / "devco.db").exists())
     
-    def _is_git_repo(self) -> bool:
-        """Check if we're in a git repository"""
-        try:
-            subprocess.run(['git', 'rev-parse', '--git-dir'], 
-                         capture_output=True, check=True, cwd=self.project_root)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+    def _git(self, *args: str, env: Dict[str, str] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(['git', *args], capture_output=True, text=True, cwd=self.project_root, env=env)
+    
+    def queue_commits(self, queue):
+        """Hand git commits to a queue with an add(actions) method instead of committing on each save"""
+        self._commit_queue = queue
     
     def _git_commit_devco_changes(self, action: str, details: str = ""):
-        """Commit devco file changes with proper staging isolation"""
-        if not self._is_git_repo():
+        """Commit devco file changes, or queue them when commits are queued"""
+        action = f"{action} - {details}" if details else action
+        if self._transaction is not None:
+            self._transaction["actions"].append(action)
             return
         
+        self._record_actions([action])
+    
+    def _record_actions(self, actions: List[str]):
+        if self._commit_queue is not None:
+            self._commit_queue.add(actions)
+        else:
+            self.commit_actions(actions)
+    
+    def commit_actions(self, actions: List[str]):
+        """Commit devco file changes now, as one commit listing the actions
+        
+        The commit never touches anything the user has staged. It is built
+        with plumbing on a private index file in the git directory: it is
+        read from HEAD, the devco files are added to it and the resulting
+        tree is committed onto HEAD. Afterwards only the devco files' entries
+        in the user's index are updated, to match the new commit. The private
+        index is kept for the next save and read again only when HEAD has
+        moved. When the files already match HEAD this costs a single git call.
+        """
+        actions = list(dict.fromkeys(actions))
+        if len(actions) == 1:
+            commit_message = f"devco: {actions[0]}"
+        else:
+            commit_message = f"devco: batch update - {', '.join(actions)}"
+        
+        if (self.devco_dir / "devco.db").exists():
+            self._checkpoint()
+        
         try:
-            # Get current staging area state
-            result = subprocess.run(['git', 'diff', '--cached', '--name-only'], 
-                                  capture_output=True, text=True, cwd=self.project_root)
-            staged_files = [f for f in result.stdout.strip().split('\n') if f] if result.stdout.strip() else []
-            
-            # Unstage all currently staged files
-            if staged_files:
-                subprocess.run(['git', 'reset'] + staged_files, 
-                             capture_output=True, cwd=self.project_root)
-            
-            # Stage only devco files that have changed
-            devco_files = ['.devco/config.json', '.devco/principles.json', 
-                          '.devco/summary.json', '.devco/devco.db']
+            paths = [f".devco/{name}" for name in GIT_TRACKED_FILES if (self.devco_dir / name).exists()]
+            if not paths:
+                return
             
-            files_to_stage = []
-            for file_path in devco_files:
-                full_path = self.project_root / file_path
-                if full_path.exists():
-                    # Check if file has changes
-                    result = subprocess.run(['git', 'status', '--porcelain', file_path], 
-                                          capture_output=True, text=True, cwd=self.project_root)
-                    if result.stdout.strip():  # File has changes
-                        files_to_stage.append(file_path)
+            # One call finds the repository, HEAD, its tree and the blobs HEAD has for the devco files
+            result = self._git('rev-parse', '--git-dir', 'HEAD', 'HEAD^{tree}', *[f"HEAD:./{path}" for path in paths])
+            lines = result.stdout.splitlines()
+            if not lines:
+                return  # Not a git repository
+            git_dir = self.project_root / lines[0]
+            head = lines[1] if len(lines) > 2 and _is_object_id(lines[1]) else None
+            head_tree = lines[2] if head else None
+            if result.returncode == 0 and lines[3:] == [_blob_id(self.project_root / path, len(head))
+                                                        for path in paths]:
+                return  # Nothing changed since HEAD
             
-            # Stage and commit devco changes if any
-            if files_to_stage:
-                subprocess.run(['git', 'add'] + files_to_stage, 
-                             capture_output=True, cwd=self.project_root)
-                
-                commit_message = f"devco: {action}"
-                if details:
-                    commit_message += f" - {details}"
-                
-                subprocess.run(['git', 'commit', '-m', commit_message], 
-                             capture_output=True, cwd=self.project_root)
+            index_file = git_dir / "devco-index"
+            index_head = git_dir / "devco-index.head"
+            env = dict(os.environ, GIT_INDEX_FILE=str(index_file))
+            # Split index mode writes only changed entries, not the whole tree, on each save
+            private = ('-c', 'core.splitIndex=true')
+            if not index_head.exists() or index_head.read_text() != (head or ""):
+                # The private index no longer matches HEAD; rebuild it
+                index_head.unlink(missing_ok=True)
+                index_file.unlink(missing_ok=True)
+                if head and self._git(*private, 'read-tree', head, env=env).returncode != 0:
+                    return
+            index_head.unlink(missing_ok=True)
+            if self._git(*private, 'update-index', '--add', '--', *paths, env=env).returncode != 0:
+                return
+            tree = self._git(*private, 'write-tree', env=env).stdout.strip()
+            if not tree:
+                return
+            if tree == head_tree:
+                _atomic_write(index_head, head)
+                return
             
-            # Restage original files
-            if staged_files:
-                subprocess.run(['git', 'add'] + staged_files, 
-                             capture_output=True, cwd=self.project_root)
+            commit = self._git('commit-tree', tree, *(['-p', head] if head else []), '-m', commit_message).stdout.strip()
+            if not commit:
+                return
+            # Fails, leaving HEAD alone, if someone else committed in the meantime
+            if self._git('update-ref', '-m', commit_message, 'HEAD', commit, head or '').returncode != 0:
+                return
+            _atomic_write(index_head, commit)
+            self._git('update-index', '--add', '--', *paths)
         
         except Exception:
             # Silent failure - don't break devco if git operations fail
@@ -3,6 +3,7 @@ Summary management for devco
 """
 from typing import Dict, Any
 from .storage import DevDocStorage
+from .coordinator import EmbedCoordinator
 
 
 class SummaryManager:
@@ -12,34 +13,9 @@ class SummaryManager:
         self.storage = storage
     
     def _auto_embed(self):
-        """Automatically regenerate embeddings after content changes"""
+        """Ask for embeddings to be refreshed in the background after content changes"""
         try:
-            import subprocess
-            import sys
-            
-            # Check if we have an API key configured
-            env_file = self.storage.devco_dir / ".env"
-            has_api_key = False
-            
-            if env_file.exists():
-                with open(env_file) as f:
-                    for line in f:
-                        if line.strip() and not line.startswith('#') and 'GOOGLE_API_KEY=' in line:
-                            key_value = line.split('=', 1)[1].strip()
-                            if key_value and key_value != '':
-                                has_api_key = True
-                                break
-            
-            if has_api_key:
-                # Start detached subprocess for embedding
-                subprocess.Popen(
-                    [sys.executable, "-m", "devco.cli", "_embed-all"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    stdin=subprocess.DEVNULL,
-                    start_new_session=True  # Detach from parent process
-                )
-            
+            EmbedCoordinator(self.storage).request()
         except Exception:
             pass  # Silent failure
     
@@ -85,12 +61,8 @@ class SummaryManager:
                 print("Summary cannot be empty.")
                 return
             
-            # Load existing data
-            data = self.storage.load_summary()
-            data['summary'] = summary_text
-            
-            # Save updated data
-            self.storage.save_summary(data)
+            self.storage.save_project_summary(summary_text)
+            self.storage.mark_dirty([("summary", "main")])
             
             print("Summary updated successfully.")
             self._auto_embed()
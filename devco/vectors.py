@@ -0,0 +1,85 @@
+"""
+Binary vector encoding for devco - vectors are stored as little-endian float32
+"""
+import json
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+VECTOR_DTYPE = np.dtype('<f4')
+
+# Search matrix encodings: full float32, per-dimension int8 or one sign bit per dimension
+QUANTIZATIONS = ("none", "int8", "binary")
+
+# Set bits of each byte value, for NumPy versions without bitwise_count
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """Encode a vector as a little-endian float32 blob"""
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    """Decode a float32 blob without copying it"""
+    return np.frombuffer(blob, dtype=VECTOR_DTYPE)
+
+
+def decode_json_vector(blob: bytes) -> Optional[List[float]]:
+    """Decode a vector stored in the old JSON text format, or None if blob is not one"""
+    if not blob.startswith(b'[') or not blob.endswith(b']'):
+        return None
+    try:
+        vector = json.loads(blob.decode('utf-8'))
+    except ValueError:
+        return None
+    return vector if isinstance(vector, list) else None
+
+
+def cosine_similarities(query: Sequence[float], blobs: List[bytes]) -> np.ndarray:
+    """Cosine similarity of a query vector with each float32 blob
+
+    Blobs of another dimension than the query score 0.0.
+    """
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.zeros(len(blobs), dtype=np.float32)
+    size = len(query) * VECTOR_DTYPE.itemsize
+    rows = [i for i, blob in enumerate(blobs) if len(blob) == size]
+    query_norm = np.linalg.norm(query)
+    if not rows or query_norm == 0:
+        return scores
+
+    matrix = decode_vector(b"".join(blobs[i] for i in rows)).reshape(len(rows), len(query))
+    norms = np.linalg.norm(matrix, axis=1) * query_norm
+    norms[norms == 0] = np.inf
+    scores[rows] = matrix @ query / norms
+    return scores
+
+
+def int8_scales(matrix: np.ndarray) -> np.ndarray:
+    """Per-dimension scales mapping the largest magnitude in each column to 127"""
+    scales = np.abs(matrix).max(axis=0).astype(np.float32) / 127
+    scales[scales == 0] = 1.0
+    return scales
+
+
+def quantize_int8(matrix: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Encode rows as int8 codes, so codes * scales approximates them"""
+    return np.clip(np.rint(matrix / scales), -127, 127).astype(np.int8)
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """Encode rows as their packed sign bits, one bit per dimension"""
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """Number of differing bits between each row of packed codes and the query's"""
+    if hasattr(np, 'bitwise_count'):
+        if codes.shape[-1] % 8 == 0 and codes.flags.c_contiguous:
+            # Count 64 bits at a time
+            codes = codes.view(np.uint64)
+            query_bits = np.ascontiguousarray(query_bits).view(np.uint64)
+        return np.bitwise_count(np.bitwise_xor(codes, query_bits)).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[np.bitwise_xor(codes, query_bits)].sum(axis=1, dtype=np.int32)
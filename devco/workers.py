@@ -0,0 +1,118 @@
+"""
+Concurrency helpers for devco - worker pool, rate limiting and retry backoff
+"""
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# A status code named as one in a message, e.g. "HTTP 429", "HTTP/1.1 503",
+# "status 502", "Error code: 500" or a leading "429 Resource has been
+# exhausted" - not any number that happens to appear in the text
+STATUS_MESSAGE_PATTERN = re.compile(r'(?i:\b(?:HTTP(?:/\d(?:\.\d)?)?|status(?:[ _]code)?|error[ _]code)'
+                                    r'\s*[:=]?\s*([1-5]\d\d)\b)|^\s*([1-5]\d\d) (?=[A-Z])')
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests per second
+
+    The rate adapts: throttle() halves it after a rate-limit response and
+    every successful call via recover() climbs back towards the configured
+    rate. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if self.max_rate <= 0:
+            return
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        """Halve the rate after the provider asked us to slow down"""
+        with self.lock:
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def recover(self):
+        """Increase the rate additively after a successful call"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """Extract an HTTP status code from a provider exception, if there is one
+
+    A status attribute on the exception or its response wins; the message is
+    only read when it names the status explicitly.
+    """
+    for candidate in (error, getattr(error, 'response', None)):
+        for attribute in ('status_code', 'status', 'code'):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    match = STATUS_MESSAGE_PATTERN.search(str(error))
+    return int(match.group(1) or match.group(2)) if match else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True for rate limits, server errors, timeouts and dropped connections"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = status_code(error)
+    return code is not None and (code == 429 or 500 <= code < 600)
+
+
+def call_with_backoff(fn: Callable[[], R], bucket: Optional[TokenBucket] = None,
+                      max_retries: int = 5, base_delay: float = 1.0,
+                      max_delay: float = 60.0) -> R:
+    """Call fn, retrying retryable errors with jittered exponential backoff"""
+    attempt = 0
+    while True:
+        if bucket:
+            bucket.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            if bucket and status_code(e) == 429:
+                bucket.throttle()
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+            continue
+        if bucket:
+            bucket.recover()
+        return result
+
+
+def run_ordered(fn: Callable[[T], R], items: List[T], concurrency: int = 1) -> List[R]:
+    """Apply fn to items on a thread pool, returning results in input order"""
+    if concurrency <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(fn, items))
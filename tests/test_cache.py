@@ -0,0 +1,96 @@
+import pytest
+import tempfile
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.cache import EmbeddingCache
+from devco.hashing import normalized_hash
+
+
+class TestEmbeddingCache:
+
+    @pytest.fixture
+    def cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            yield EmbeddingCache(storage)
+
+    def test_put_and_get(self, cache):
+        """Test vectors round-trip through the cache"""
+        cache.put("model-a", "some text", [0.5, -0.25])
+
+        assert cache.get("model-a", "some text") == [0.5, -0.25]
+        assert cache.get("model-a", "other text") is None
+
+    def test_keys_are_normalized(self, cache):
+        """Test whitespace-only differences hit the same entry"""
+        cache.put("model-a", "some   text\n", [1.0])
+
+        assert cache.get("model-a", "  some text") == [1.0]
+
+    def test_keys_include_model(self, cache):
+        """Test vectors from one model are never served for another"""
+        cache.put("model-a", "text", [1.0])
+
+        assert cache.get("model-b", "text") is None
+
+    def test_get_many_preserves_order(self, cache):
+        """Test batch lookups return one slot per input text"""
+        cache.put_many("model-a", [("one", [1.0]), ("three", [3.0])])
+
+        assert cache.get_many("model-a", ["one", "two", "three", "one"]) == [[1.0], None, [3.0], [1.0]]
+
+    def test_stats(self, cache):
+        """Test stats report entries and bytes per model"""
+        cache.put_many("model-a", [("one", [1.0]), ("two", [2.0])])
+        cache.put("model-b", "one", [1.0])
+
+        stats = cache.stats()
+
+        assert stats["entries"] == 3
+        assert stats["models"]["model-a"]["entries"] == 2
+        assert stats["bytes"] > 0
+
+    def test_prune_evicts_least_recently_used(self, cache):
+        """Test pruning drops the oldest entries first"""
+        cache.put("model-a", "old", [1.0])
+        cache.put("model-a", "new", [2.0])
+        cache.get("model-a", "old")  # touch "old" so "new" is now least recent
+
+        entry_size = cache.stats()["bytes"] // 2
+        evicted = cache.prune(max_bytes=entry_size)
+
+        assert evicted == 1
+        assert cache.get("model-a", "old") == [1.0]
+        assert cache.get("model-a", "new") is None
+
+    def test_vectors_are_stored_as_float32(self, cache):
+        """Test entries take four bytes per dimension, and older JSON entries are still served"""
+        cache.put("model-a", "some text", [0.5] * 256)
+        conn = cache._connect()
+        conn.execute("INSERT INTO vectors VALUES ('model-a', ?, ?, 10, 0)",
+                     (normalized_hash("old text"), b"[0.5, -0.25]"))
+        conn.commit()
+        sizes = [row[0] for row in conn.execute("SELECT LENGTH(embedding) FROM vectors ORDER BY size DESC")]
+        conn.close()
+
+        assert sizes[0] == 4 * 256
+        assert cache.get_many("model-a", ["some text", "old text"]) == [[0.5] * 256, [0.5, -0.25]]
+
+    def test_cache_is_ignored_by_git(self, cache):
+        """Test the cache database stays out of git, even in projects initialized before it existed"""
+        import subprocess
+        root = cache.storage.project_root
+        subprocess.run(['git', 'init'], cwd=root, capture_output=True)
+        (cache.storage.devco_dir / ".gitignore").unlink()
+
+        EmbeddingCache(DevDocStorage(root)).put("model-a", "some text", [1.0])
+
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=all'],
+                                capture_output=True, text=True, cwd=root).stdout
+        assert (cache.storage.devco_dir / "cache.db").exists()
+        assert "cache.db" not in status
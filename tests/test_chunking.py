@@ -0,0 +1,161 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.chunking import MarkdownChunker, FixedChunker, get_chunker, approx_tokens
+
+
+DOCUMENT = """# Authentication
+
+Users log in through `UserService.authenticate()` in src/auth/service.py:45.
+Sessions expire after an hour.
+
+- Tokens are signed with HS256
+- Refresh tokens live in the `sessions` table
+
+```python
+def authenticate(user, password):
+    return check(user, password)
+```
+
+## Testing
+
+Run `pytest tests/test_auth.py -v` before every commit.
+"""
+
+
+class TestMarkdownChunker:
+
+    def test_small_document_sections_become_chunks(self):
+        """Test a heading after a well-filled chunk starts a new one and short blocks are packed together"""
+        chunks = list(MarkdownChunker(chunk_size=500, overlap=50).chunks(DOCUMENT))
+
+        assert len(chunks) == 2
+        assert chunks[0].startswith("# Authentication")
+        assert "```python\ndef authenticate(user, password):\n    return check(user, password)\n```" in chunks[0]
+        assert chunks[1] == "## Testing\n\nRun `pytest tests/test_auth.py -v` before every commit."
+
+    def test_short_sections_share_a_chunk(self):
+        """Test small sections are packed together instead of one chunk per heading"""
+        text = "\n\n".join(f"## Part {i}\n\nA short note about part {i}." for i in range(10))
+
+        chunks = list(MarkdownChunker(chunk_size=200, overlap=0).chunks(text))
+
+        assert len(chunks) == 4
+        assert all(chunk.startswith("## Part") for chunk in chunks)
+
+    def test_blocks_are_not_split_when_they_fit(self):
+        """Test paths and code blocks stay intact when chunks are small"""
+        chunks = list(MarkdownChunker(chunk_size=120, overlap=20).chunks(DOCUMENT))
+
+        assert all(len(chunk) <= 120 for chunk in chunks)
+        assert any("src/auth/service.py:45" in chunk for chunk in chunks)
+        assert any(chunk.startswith("```python") and chunk.endswith("```") for chunk in chunks)
+        assert any("- Tokens are signed with HS256\n- Refresh tokens live in the `sessions` table" in chunk
+                   for chunk in chunks)
+
+    def test_long_code_block_splits_between_lines(self):
+        """Test an oversized code block is cut only at line boundaries and never overlapped"""
+        lines = [f"value_{i} = compute({i})" for i in range(100)]
+        text = "```\n" + "\n".join(lines) + "\n```"
+
+        chunks = list(MarkdownChunker(chunk_size=200, overlap=50).chunks(text))
+
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 200 for chunk in chunks)
+        emitted = [line for chunk in chunks for line in chunk.split("\n")]
+        assert emitted == text.split("\n")
+
+    def test_split_code_block_pieces_rejoin_without_blank_lines(self):
+        """Test pieces of a split code block that share a chunk are joined line by line"""
+        text = "```\n" + "\n".join(f"x{i} = {i}" for i in range(2)) + "\n```"
+
+        chunks = list(MarkdownChunker(chunk_size=8, overlap=0, unit="tokens").chunks(text))
+
+        assert all(chunk in text for chunk in chunks)
+
+    def test_long_paragraph_splits_between_sentences_with_overlap(self):
+        """Test prose is split at sentence boundaries and repeats the previous tail"""
+        text = "This is a long piece of text. " * 50
+
+        chunks = list(MarkdownChunker(chunk_size=100, overlap=20).chunks(text))
+
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert chunks[0].endswith("text.")
+        assert chunks[1].startswith("long piece of text.")
+
+    def test_heading_is_kept_with_its_text(self):
+        """Test a heading followed by a long paragraph does not become a chunk of its own"""
+        text = "## Notes\n\n" + "word " * 100
+
+        chunks = list(MarkdownChunker(chunk_size=100, overlap=0).chunks(text))
+
+        assert chunks[0].startswith("## Notes\n\nword word")
+        assert all(len(chunk) <= 100 for chunk in chunks)
+
+    def test_token_unit(self):
+        """Test chunk sizes can be measured in approximate tokens"""
+        text = "\n\n".join(f"Paragraph {i} has a handful of words in it." for i in range(40))
+
+        chunks = list(MarkdownChunker(chunk_size=50, overlap=0, unit="tokens").chunks(text))
+
+        assert all(approx_tokens(chunk) <= 50 for chunk in chunks)
+        assert len(chunks) == 8
+
+    def test_streams_lines_in_a_single_pass(self):
+        """Test the chunker consumes an iterator of lines lazily"""
+        consumed = []
+
+        def lines():
+            for i in range(100000):
+                consumed.append(i)
+                yield f"Line {i} of a very long detail.\n"
+                yield "\n"
+
+        chunks = MarkdownChunker(chunk_size=500, overlap=0).chunks(lines())
+        first = next(chunks)
+
+        assert first.startswith("Line 0 ")
+        assert len(consumed) < 100
+
+
+class TestChunkerConfig:
+
+    def test_get_chunker_reads_config(self):
+        """Test the chunker and its sizes come from config.json"""
+        chunker = get_chunker({"chunker": "markdown", "chunk_size": 300, "chunk_overlap": 30})
+        assert isinstance(chunker, MarkdownChunker)
+        assert (chunker.chunk_size, chunker.overlap) == (300, 30)
+
+        assert isinstance(get_chunker({"chunker": "fixed"}), FixedChunker)
+        # Projects from before the chunker setting keep their fixed windows
+        assert isinstance(get_chunker({}), FixedChunker)
+
+    def test_unknown_chunker(self):
+        """Test an unknown chunker name is rejected"""
+        with pytest.raises(ValueError):
+            get_chunker({"chunker": "sentences"})
+
+    def test_fixed_chunker_keeps_legacy_windows(self):
+        """Test the fixed chunker still produces overlapping character windows"""
+        text = "This is a long piece of text. " * 50
+        chunks = list(FixedChunker(chunk_size=100, overlap=20).chunks(text))
+
+        assert len(chunks) > 1
+        assert chunks[0][-10:] in chunks[1][:30]
+
+    def test_fixed_chunker_overlap_is_clamped(self):
+        """Test an overlap as large as the chunk size still moves through the text"""
+        text = "word " * 100
+        chunks = list(FixedChunker(chunk_size=30, overlap=30).chunks(text))
+
+        assert FixedChunker(chunk_size=30, overlap=30).overlap == 15
+        assert 1 < len(chunks) < len(text)
+        assert list(FixedChunker(chunk_size=30, overlap=5).chunks("x" * 100)) == ["x" * 30, "x" * 30, "x" * 30, "x" * 25]
+
+    def test_fixed_chunker_rejects_token_unit(self):
+        """Test the fixed chunker refuses a unit it cannot measure"""
+        with pytest.raises(ValueError):
+            get_chunker({"chunker": "fixed", "chunk_unit": "tokens"})
@@ -31,4 +31,95 @@ def test_devco_no_args_shows_help():
         with pytest.raises(SystemExit) as exc_info:
             main()
         # Should exit with non-zero code when no command given
-        assert exc_info.value.code != 0
\ No newline at end of file
+        assert exc_info.value.code != 0
+
+def test_devco_batch_applies_edits_together(tmp_path, monkeypatch, capsys):
+    """Test devco batch applies every edit from stdin with one embed request"""
+    import io
+    from devco.storage import DevDocStorage
+    
+    monkeypatch.chdir(tmp_path)
+    DevDocStorage().init()
+    commands = "\n".join([
+        'principles add --text "Use type hints"',
+        '# comments and blank lines are skipped',
+        '',
+        'devco principles add --text "Write tests first"',
+        'section add api --summary "REST API" --detail "Served by api/app.py"',
+        'section rename api http-api',
+    ])
+    
+    with patch('sys.argv', ['devco', 'batch']), patch('sys.stdin', io.StringIO(commands)), \
+            patch('devco.coordinator.EmbedCoordinator.can_embed', return_value=True), \
+            patch('devco.coordinator.EmbedCoordinator._spawn') as spawn:
+        main()
+    
+    storage = DevDocStorage()
+    assert storage.load_principles() == ["Use type hints", "Write tests first"]
+    assert list(storage.load_summary()["sections"]) == ["http-api"]
+    assert spawn.call_count == 1
+    assert "Applied 4 edits" in capsys.readouterr().out
+
+
+def test_devco_batch_rejects_interactive_commands(tmp_path, monkeypatch, capsys):
+    """Test a batch with a command that would prompt is refused as a whole"""
+    import io
+    from devco.storage import DevDocStorage
+    
+    monkeypatch.chdir(tmp_path)
+    DevDocStorage().init()
+    commands = 'principles add --text "Use type hints"\nprinciples add\n'
+    
+    with patch('sys.argv', ['devco', 'batch']), patch('sys.stdin', io.StringIO(commands)):
+        with pytest.raises(SystemExit):
+            main()
+    
+    assert "Line 2: missing --text" in capsys.readouterr().out
+    assert DevDocStorage().load_principles() == []
+
+
+def test_scripted_edit_is_committed_before_exit(tmp_path, monkeypatch):
+    """Test a devco command run without a terminal commits its queued edit before returning"""
+    import io
+    import subprocess
+    from devco.storage import DevDocStorage
+    
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(['git', 'init'], capture_output=True)
+    subprocess.run(['git', 'config', 'user.email', 'test@test.com'], capture_output=True)
+    subprocess.run(['git', 'config', 'user.name', 'Test User'], capture_output=True)
+    DevDocStorage().init()
+    
+    with patch('sys.argv', ['devco', 'principles', 'add', '--text', 'Use type hints']), \
+            patch('sys.stdin', io.StringIO()), patch('devco.coordinator.CommitCoordinator._spawn') as spawn:
+        main()
+    
+    log = subprocess.run(['git', 'log', '--pretty=format:%s'], capture_output=True, text=True).stdout
+    assert log == 'devco: update principles'
+    spawn.assert_not_called()
+
+
+def test_devco_stats_suggests_compact_after_deletions(tmp_path, monkeypatch, capsys):
+    """Test devco stats reports orphaned rows and devco compact removes them"""
+    from devco.storage import DevDocStorage
+    from devco.embeddings import EmbeddingsManager
+    
+    monkeypatch.chdir(tmp_path)
+    storage = DevDocStorage()
+    storage.init()
+    config = storage.load_config()
+    config["embedding_model"] = "local-hash-64"
+    storage.save_config(config)
+    storage.save_principles(["Use type hints", "Write tests first"])
+    EmbeddingsManager(storage).embed_all_content(silent=True)
+    storage.save_principles(["Use type hints"])
+    
+    with patch('sys.argv', ['devco', 'stats']):
+        main()
+    output = capsys.readouterr().out
+    assert "Orphaned rows: 1" in output
+    assert "Run 'devco compact' to reclaim space." in output
+    
+    with patch('sys.argv', ['devco', 'compact']):
+        main()
+    assert "Deleted 1 orphaned rows and 1 unused vectors" in capsys.readouterr().out
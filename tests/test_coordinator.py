@@ -0,0 +1,155 @@
+import pytest
+import tempfile
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.coordinator import CommitCoordinator, EmbedCoordinator
+from devco.locking import try_lock, unlock
+
+
+class TestEmbedCoordinator:
+
+    @pytest.fixture
+    def storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            (storage.devco_dir / ".env").write_text("GOOGLE_API_KEY=key\n")
+            yield storage
+
+    @pytest.fixture
+    def coordinator(self, storage):
+        return EmbedCoordinator(storage, debounce=0)
+
+    @pytest.fixture
+    def held_lock(self, coordinator):
+        """Hold the project lock as a running background embed would"""
+        with open(coordinator.lock_file, 'a') as handle:
+            assert try_lock(handle)
+            yield
+            unlock(handle)
+
+    @patch('devco.coordinator.EmbedCoordinator._spawn')
+    def test_request_spawns_runner_when_idle(self, mock_spawn, coordinator):
+        """Test the first request starts a background runner"""
+        assert coordinator.request() is True
+        assert coordinator.request_file.exists()
+        mock_spawn.assert_called_once()
+
+    @patch('devco.coordinator.EmbedCoordinator._spawn')
+    def test_request_does_not_spawn_while_running(self, mock_spawn, coordinator, held_lock):
+        """Test requests during a run are recorded but start no new process"""
+        for _ in range(50):
+            assert coordinator.request() is False
+
+        assert coordinator.is_running()
+        assert coordinator.request_file.exists()
+        mock_spawn.assert_not_called()
+
+    @patch('devco.coordinator.EmbedCoordinator._spawn')
+    def test_request_without_api_key_does_nothing(self, mock_spawn, storage, coordinator):
+        """Test nothing is spawned when embeddings cannot be generated"""
+        (storage.devco_dir / ".env").write_text("GOOGLE_API_KEY=\n")
+
+        assert coordinator.request() is False
+        mock_spawn.assert_not_called()
+
+    @patch('devco.coordinator.EmbedCoordinator._spawn')
+    def test_request_with_local_model_needs_no_key(self, mock_spawn, storage, coordinator):
+        """Test the offline backend embeds without an API key"""
+        (storage.devco_dir / ".env").write_text("GOOGLE_API_KEY=\n")
+        config = storage.load_config()
+        config["embedding_model"] = "local-hash"
+        storage.save_config(config)
+
+        assert coordinator.request() is True
+
+    @patch('devco.coordinator.EmbedCoordinator._spawn')
+    def test_run_coalesces_requests_during_a_run(self, mock_spawn, coordinator):
+        """Test a burst of requests during a run causes exactly one follow-up run"""
+        coordinator.request()
+        runs = []
+
+        def embed():
+            runs.append(1)
+            if len(runs) == 1:
+                for _ in range(10):
+                    coordinator.request()
+
+        assert coordinator.run(embed) == 2
+        assert not coordinator.request_file.exists()
+        mock_spawn.assert_called_once()
+
+    def test_run_without_request_does_nothing(self, coordinator):
+        """Test a runner with nothing pending exits immediately"""
+        assert coordinator.run(lambda: pytest.fail("should not embed")) == 0
+
+    def test_run_yields_to_active_runner(self, coordinator, held_lock):
+        """Test a second runner leaves pending requests to the one holding the lock"""
+        coordinator.request_file.write_text("0")
+
+        assert coordinator.run(lambda: pytest.fail("should not embed")) == 0
+        assert coordinator.request_file.exists()
+
+    @patch('devco.coordinator.time.sleep')
+    def test_run_waits_for_debounce_window(self, mock_sleep, storage):
+        """Test the runner waits until requests have been quiet for the debounce window"""
+        coordinator = EmbedCoordinator(storage, debounce=60)
+        coordinator.request_file.write_text("0")
+        os.utime(coordinator.request_file)
+        mock_sleep.side_effect = lambda seconds: os.utime(coordinator.request_file, (0, 0))
+
+        assert coordinator.run(lambda: None) == 1
+        assert 0 < mock_sleep.call_args_list[0].args[0] <= 60
+
+
+class TestCommitCoordinator:
+
+    @pytest.fixture
+    def storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            subprocess.run(['git', 'init'], cwd=tmpdir, capture_output=True)
+            subprocess.run(['git', 'config', 'user.email', 'test@test.com'], cwd=tmpdir, capture_output=True)
+            subprocess.run(['git', 'config', 'user.name', 'Test User'], cwd=tmpdir, capture_output=True)
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            subprocess.run(['git', 'add', '.devco/'], cwd=tmpdir, capture_output=True)
+            subprocess.run(['git', 'commit', '-m', 'initial'], cwd=tmpdir, capture_output=True)
+            yield storage
+
+    def log(self, storage):
+        result = subprocess.run(['git', 'log', '--pretty=format:%s'], capture_output=True, text=True,
+                                cwd=storage.project_root)
+        return result.stdout.split('\n')
+
+    def test_flush_coalesces_queued_saves(self, storage):
+        """Test queued saves become one commit listing every action when flushed"""
+        committer = CommitCoordinator(storage, background=False)
+        storage.queue_commits(committer)
+        storage.save_principles(['principle 1'])
+        storage.save_summary({"summary": "Project", "sections": {}})
+        storage.save_principles(['principle 1', 'principle 2'])
+
+        assert self.log(storage) == ['initial']
+        assert committer.pending() == ['update principles', 'update summary', 'update principles']
+
+        assert committer.flush() == 3
+        assert self.log(storage) == ['devco: batch update - update principles, update summary', 'initial']
+        assert committer.pending() == []
+        assert committer.flush() == 0
+
+    @patch('devco.coordinator.CommitCoordinator._spawn')
+    def test_background_runner_commits_the_queue(self, mock_spawn, storage):
+        """Test saves start the committer, which writes one commit after the quiet window"""
+        committer = CommitCoordinator(storage, debounce=0)
+        storage.queue_commits(committer)
+        storage.save_principles(['principle 1'])
+
+        mock_spawn.assert_called_once()
+        assert committer.run(committer.commit_pending) == 1
+        assert self.log(storage) == ['devco: update principles', 'initial']
@@ -3,7 +3,9 @@ import tempfile
 import os
 import sys
 import sqlite3
+import json
 import numpy as np
+from io import StringIO
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -39,16 +41,12 @@ class TestEmbeddingsManager:
             # Check that chunks have some overlap
             assert chunks[0][-10:] in chunks[1][:30]
     
-    @patch('subprocess.run')
-    def test_generate_embeddings(self, mock_run, embeddings_manager):
-        """Test embedding generation using llm command"""
-        # Mock the llm embed command response
-        mock_embedding = "[0.1, 0.2, 0.3, -0.1, 0.5]"
-        mock_run.return_value = MagicMock(
-            stdout=mock_embedding,
-            stderr="",
-            returncode=0
-        )
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_generate_embeddings(self, mock_load, embeddings_manager):
+        """Test embedding generation using the in-process llm engine"""
+        mock_model = MagicMock()
+        mock_model.embed.return_value = [0.1, 0.2, 0.3, -0.1, 0.5]
+        mock_load.return_value = mock_model
         
         text = "Test text for embedding"
         embedding = embeddings_manager.generate_embedding(text)
@@ -57,15 +55,14 @@ class TestEmbeddingsManager:
         assert isinstance(embedding, list)
         assert len(embedding) == 5
         assert embedding == [0.1, 0.2, 0.3, -0.1, 0.5]
+        mock_model.embed.assert_called_once_with(text)
     
-    @patch('subprocess.run')
-    def test_generate_embeddings_error(self, mock_run, embeddings_manager):
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_generate_embeddings_error(self, mock_load, embeddings_manager):
         """Test handling of embedding generation errors"""
-        mock_run.return_value = MagicMock(
-            stdout="",
-            stderr="Error: Invalid API key",
-            returncode=1
-        )
+        mock_model = MagicMock()
+        mock_model.embed.side_effect = Exception("Invalid API key")
+        mock_load.return_value = mock_model
         
         text = "Test text"
         embedding = embeddings_manager.generate_embedding(text)
@@ -111,8 +108,8 @@ class TestEmbeddingsManager:
         similarity = embeddings_manager.compute_similarity(vec1, vec3)
         assert abs(similarity - 1.0) < 0.01
     
-    @patch('devco.embeddings.EmbeddingsManager.generate_embedding')
-    def test_embed_all_content(self, mock_generate, embeddings_manager):
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_embed_all_content(self, mock_load, embeddings_manager):
         """Test embedding all content from storage"""
         # Setup test data
         storage = embeddings_manager.storage
@@ -128,12 +125,16 @@ class TestEmbeddingsManager:
         })
         
         # Mock embedding generation
-        mock_generate.return_value = [0.1, 0.2, 0.3]
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = lambda texts, batch_size: [[0.1, 0.2, 0.3] for _ in texts]
+        mock_load.return_value = mock_model
         
-        embeddings_manager.embed_all_content()
+        result = embeddings_manager.embed_all_content()
         
-        # Verify embeddings were generated for all content
-        assert mock_generate.call_count >= 4  # principles + summary + section
+        # All five chunks go out in a single multi-input request
+        assert mock_model.embed_multi.call_count == 1
+        assert result["embedded"] == 5
+        assert result["failed"] == []
         
         # Verify embeddings were stored
         conn = storage.get_db_connection()
@@ -141,7 +142,432 @@ class TestEmbeddingsManager:
         count = cursor.fetchone()[0]
         conn.close()
         
-        assert count >= 4
+        assert count == 5
+    
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_embed_all_content_uses_few_round_trips(self, mock_load, embeddings_manager):
+        """Test thousands of chunks are embedded in tens of requests"""
+        storage = embeddings_manager.storage
+        storage.save_principles([f"Principle number {i}" for i in range(2000)])
+        
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = lambda texts, batch_size: [[1.0, 0.0] for _ in texts]
+        mock_load.return_value = mock_model
+        
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert result["embedded"] == 2000
+        assert embeddings_manager.engine.request_count == 20
+    
+    @patch('devco.embeddings.time.sleep')
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_embed_all_content_reports_item_failures(self, mock_load, mock_sleep, embeddings_manager):
+        """Test a failing chunk inside a batch is reported, not dropped"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["good one", "bad one", "good two"])
+        
+        def embed_multi(texts, batch_size):
+            if "bad one" in texts:
+                raise Exception("content rejected")
+            return [[1.0, 0.0] for _ in texts]
+        
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = embed_multi
+        mock_model.embed.side_effect = lambda text: embed_multi([text], 1)[0]
+        mock_load.return_value = mock_model
+        
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            result = embeddings_manager.embed_all_content()
+            output = mock_stdout.getvalue()
+        
+        assert result["embedded"] == 2
+        assert len(result["failed"]) == 1
+        assert result["failed"][0]["content_id"] == "2"
+        assert result["failed"][0]["error"] == "content rejected"
+        assert "Failed to embed [principle] 2: content rejected" in output
+        
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert len(result["failed"]) == 1
+        assert mock_stdout.getvalue() == ""
+    
+    @pytest.fixture
+    def counting_model(self):
+        """Patch the llm model with one that records every text it embeds"""
+        embedded = []
+        
+        def embed_multi(texts, batch_size):
+            embedded.extend(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+        
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = embed_multi
+        mock_model.embed.side_effect = lambda text: embed_multi([text], 1)[0]
+        with patch('devco.engine.EmbeddingEngine._load_model', return_value=mock_model):
+            yield embedded
+    
+    def test_reindex_skips_unchanged_chunks(self, counting_model, embeddings_manager):
+        """Test a second run with no edits makes no embedding calls"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert result["unchanged"] == 2
+        assert result["embedded"] == 0
+    
+    def test_full_reindex_calls_provider_for_every_chunk(self, counting_model, embeddings_manager):
+        """Test --full ignores stored and cached vectors"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2", "Principle 1"])
+        
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        result = embeddings_manager.embed_all_content(silent=True, full=True)
+        
+        assert sorted(counting_model) == ["Principle 1", "Principle 2"]
+        assert result["embedded"] == 3
+        assert result["cached"] == 0
+        conn = storage.get_db_connection()
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 2
+        conn.close()
+    
+    def test_reindex_embeds_only_changed_chunks(self, counting_model, embeddings_manager):
+        """Test editing one item re-embeds that item and deletes its old row"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2", "Principle 3"])
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        storage.save_principles(["Principle 1", "Principle two", "Principle 3"])
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == ["Principle two"]
+        assert result["deleted"] == 1
+        
+        conn = storage.get_db_connection()
+        texts = sorted(row[0] for row in conn.execute("SELECT chunk_text FROM embeddings"))
+        conn.close()
+        assert texts == ["Principle 1", "Principle 3", "Principle two"]
+    
+    def test_reindex_deletes_orphans(self, counting_model, embeddings_manager):
+        """Test rows for removed content are deleted without embedding calls"""
+        storage = embeddings_manager.storage
+        storage.save_summary({"summary": "Main", "sections": {"a": {"summary": "A", "detail": ""}}})
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        storage.save_summary({"summary": "Main", "sections": {}})
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert result["deleted"] == 1
+    
+    def test_reindex_after_model_change_embeds_everything(self, counting_model, embeddings_manager):
+        """Test vectors from a different model are not reused, but are kept"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        config = storage.load_config()
+        config["embedding_model"] = "another-model"
+        storage.save_config(config)
+        embeddings_manager.engine._settings = None
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert sorted(counting_model) == ["Principle 1", "Principle 2"]
+        assert result["deleted"] == 0
+        assert [(s["model"], s["chunks"]) for s in embeddings_manager.model_sets()] == [
+            ("another-model", 2), ("gemini-embedding-exp-03-07-2048", 2)]
+    
+    def test_recreated_database_costs_no_api_calls(self, counting_model, embeddings_manager):
+        """Test text seen before is served from the cache after devco.db is re-created"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        (storage.devco_dir / "devco.db").unlink()
+        storage.init()
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert result["embedded"] == 2
+        assert result["cached"] == 2
+    
+    def test_switching_model_back_costs_no_api_calls(self, counting_model, embeddings_manager):
+        """Test returning to a previous model reuses its cached vectors"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1"])
+        embeddings_manager.embed_all_content(silent=True)
+        
+        for model in ["another-model", "gemini-embedding-exp-03-07-2048"]:
+            config = storage.load_config()
+            config["embedding_model"] = model
+            storage.save_config(config)
+            embeddings_manager.engine._settings = None
+            counting_model.clear()
+            result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert result["embedded"] == 0
+        assert result["unchanged"] == 1
+    
+    def test_removing_principle_keeps_other_vectors(self, counting_model, embeddings_manager):
+        """Test renumbered principles keep their vectors and are shown by their new number"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle one", "Principle two", "Principle three"])
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        storage.save_principles(["Principle two", "Principle three"])
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert (result["unchanged"], result["deleted"]) == (2, 1)
+        labels = {r["chunk_text"]: r["content_id"] for r in embeddings_manager.search_similar_content("x", limit=5)}
+        assert labels == {"Principle two": "1", "Principle three": "2"}
+    
+    def test_renaming_section_keeps_vectors(self, counting_model, embeddings_manager):
+        """Test a renamed section is not re-embedded and is found under its new name"""
+        from devco.sections import SectionsManager
+        sections_manager = SectionsManager(embeddings_manager.storage)
+        with patch('sys.stdout', new_callable=StringIO):
+            sections_manager.add_section_with_content("api", "API summary", "API detail")
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        with patch('sys.stdout', new_callable=StringIO):
+            sections_manager.rename_section("api", "web")
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == []
+        assert result["deleted"] == 0
+        labels = sorted(r["content_id"] for r in embeddings_manager.search_similar_content("x", limit=5))
+        assert labels == ["web", "web_detail"]
+    
+    def test_chunking_follows_config(self, counting_model, embeddings_manager):
+        """Test chunk sizes come from config.json and changing them re-chunks content"""
+        storage = embeddings_manager.storage
+        storage.save_summary({"summary": "", "sections": {
+            "api": {"summary": "API", "detail": " ".join(f"Endpoint {i} is documented here." for i in range(20))}}})
+        embeddings_manager.embed_all_content(silent=True)
+        assert max(len(text) for text in counting_model) <= 500
+        
+        config = storage.load_config()
+        config["chunk_size"] = 100
+        storage.save_config(config)
+        embeddings_manager.engine._settings = None
+        counting_model.clear()
+        embeddings_manager.embed_all_content(silent=True)
+        
+        assert len(counting_model) > 2
+        assert max(len(text) for text in counting_model) <= 100
+        assert json.loads(embeddings_manager.chunk_params())["chunk_size"] == 100
+    
+    def test_search_picks_model_per_query(self, counting_model, embeddings_manager):
+        """Test each query searches only the vector set of the requested model"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1"])
+        embeddings_manager.embed_all_content(silent=True)
+        config = storage.load_config()
+        config["embedding_model"] = "another-model"
+        storage.save_config(config)
+        embeddings_manager.engine._settings = None
+        embeddings_manager.embed_all_content(silent=True)
+        
+        current = embeddings_manager.search_similar_content("Principle")
+        previous = embeddings_manager.search_similar_content("Principle", model="gemini-embedding-exp-03-07-2048")
+        
+        assert len(current) == len(previous) == 1
+        assert {s["model"]: (s["dimensions"], s["current"]) for s in embeddings_manager.model_sets()} == {
+            "gemini-embedding-exp-03-07-2048": (2, False), "another-model": (2, True)}
+    
+    def test_drop_model_sets(self, counting_model, embeddings_manager):
+        """Test a model's vectors are only removed by explicit garbage collection"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        embeddings_manager.embed_all_content(silent=True)
+        
+        removed = embeddings_manager.drop_model_sets(["gemini-embedding-exp-03-07-2048"])
+        
+        assert removed == 2
+        assert embeddings_manager.model_sets() == []
+    
+    def test_identical_chunks_share_one_vector(self, counting_model, embeddings_manager):
+        """Test a chunk repeated across items is embedded and stored once"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Run the linter before pushing"])
+        storage.save_summary({"summary": "", "sections": {
+            "workflow": {"summary": "Run the linter  before pushing", "detail": ""}}})
+        
+        result = embeddings_manager.embed_all_content(silent=True)
+        
+        assert counting_model == ["Run the linter before pushing"]
+        assert (result["embedded"], result["shared"]) == (2, 1)
+        conn = storage.get_db_connection()
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(DISTINCT vector_id) FROM embeddings").fetchone()[0] == 1
+        conn.close()
+        
+        results = embeddings_manager.search_similar_content("linter", limit=5)
+        assert len(results) == 1
+        assert sorted((owner["content_type"], owner["content_id"]) for owner in results[0]["owners"]) == [
+            ("principle", "1"), ("section", "workflow")]
+    
+    def test_unreferenced_vectors_are_dropped_on_publish(self, counting_model, embeddings_manager):
+        """Test a vector goes away with the last chunk that used it"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        embeddings_manager.embed_all_content(silent=True)
+        
+        storage.save_principles(["Principle 1"])
+        embeddings_manager.embed_all_content(silent=True)
+        
+        conn = storage.get_db_connection()
+        assert conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] == 1
+        conn.close()
+    
+    def test_index_stats_reports_stale_and_orphaned_rows(self, counting_model, embeddings_manager):
+        """Test stats tell rows of changed items from rows of deleted ones"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        storage.save_summary({"summary": "Main", "sections": {"a": {"summary": "A", "detail": ""}}})
+        embeddings_manager.embed_all_content(silent=True)
+        
+        storage.save_summary({"summary": "Main changed", "sections": {}})
+        stats = embeddings_manager.index_stats()
+        
+        assert stats["content_types"]["principle"] == {"rows": 2, "owners": 2, "dimensions": [2],
+                                                       "text_bytes": 22, "vector_bytes": 16}
+        assert (stats["stale_rows"], stats["orphaned_rows"], stats["unpublished_rows"]) == (1, 1, 0)
+        assert stats["vectors"] == {"rows": 4, "bytes": 32, "unused": 0}
+        assert stats["last_run"]["status"] == "completed"
+        assert stats["last_run"]["seconds"] >= 0
+        assert stats["database"]["page_count"] > 0
+    
+    def test_compact_deletes_orphans_and_rebuilds_matrix(self, counting_model, embeddings_manager):
+        """Test compacting drops rows of deleted items, frees their pages and keeps search working"""
+        storage = embeddings_manager.storage
+        storage.save_principles([f"Principle {i}" for i in range(200)])
+        embeddings_manager.embed_all_content(silent=True)
+        storage.save_principles(["Principle 0"])
+        
+        result = embeddings_manager.compact()
+        stats = embeddings_manager.index_stats()
+        
+        assert (result["rows"], result["vectors"]) == (199, 199)
+        assert result["bytes_after"] < result["bytes_before"]
+        assert stats["orphaned_rows"] == 0
+        assert stats["database"]["freelist_count"] == 0
+        assert stats["sidecar"]["files"] == 2
+        assert [r["chunk_text"] for r in embeddings_manager.search_similar_content("Principle 0", 1)] == ["Principle 0"]
+    
+    def test_embed_dirty_content_only_touches_queued_items(self, counting_model, embeddings_manager):
+        """Test the background path embeds only items queued by write paths"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        storage.save_summary({"summary": "Main summary", "sections": {}})
+        embeddings_manager.embed_all_content(silent=True)
+        counting_model.clear()
+        
+        old_id = storage.load_principle_records()[1]["id"]
+        records = storage.save_principles(["Principle 1", "Principle 2 edited"])
+        storage.mark_dirty([("principle", old_id), ("principle", records[1]["id"])])
+        with patch.object(embeddings_manager, 'chunk_text', wraps=embeddings_manager.chunk_text) as mock_chunk:
+            result = embeddings_manager.embed_dirty_content(silent=True)
+        
+        assert counting_model == ["Principle 2 edited"]
+        assert mock_chunk.call_count == 1
+        assert result["deleted"] == 1
+        assert storage.load_dirty_items()[1] == set()
+    
+    def test_embed_dirty_content_with_empty_queue_does_nothing(self, counting_model, embeddings_manager):
+        """Test an empty queue costs no embedding calls or journal entries"""
+        embeddings_manager.storage.save_principles(["Principle 1"])
+        
+        result = embeddings_manager.embed_dirty_content(silent=True)
+        
+        assert counting_model == []
+        assert result["embedded"] == 0
+        assert embeddings_manager.journal.latest() is None
+    
+    def test_status_reports_stale_items(self, embeddings_manager):
+        """Test items waiting in the dirty queue are reported as stale"""
+        embeddings_manager.storage.mark_dirty([("summary", "main")])
+        
+        status = embeddings_manager.check_embeddings_status()
+        
+        assert status["stale_content"] == ["summary_main"]
+    
+    @patch('devco.workers.time.sleep')
+    @patch('devco.embeddings.time.sleep')
+    def test_failed_items_keep_their_published_rows(self, mock_sleep, mock_backoff, embeddings_manager):
+        """Test an outage during a rebuild does not publish an index without the failed items"""
+        storage = embeddings_manager.storage
+        records = storage.save_principles(["Principle 1", "Principle 2"])
+        outage = []
+        
+        def embed_multi(texts, batch_size):
+            if outage:
+                raise ConnectionError("connection refused")
+            return [[1.0, float(len(text))] for text in texts]
+        
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = embed_multi
+        mock_model.embed.side_effect = lambda text: embed_multi([text], 1)[0]
+        with patch('devco.engine.EmbeddingEngine._load_model', return_value=mock_model):
+            embeddings_manager.embed_all_content(silent=True)
+            outage.append(True)
+            full = embeddings_manager.embed_all_content(silent=True, full=True)
+            storage.save_principles(["Principle 1", {"id": records[1]["id"], "text": "Principle 2 revised"}])
+            edited = embeddings_manager.embed_all_content(silent=True)
+        
+        assert (full["deleted"], len(full["failed"])) == (0, 2)
+        assert (edited["deleted"], len(edited["failed"])) == (0, 1)
+        conn = storage.get_db_connection()
+        rows = sorted(row[0] for row in conn.execute("SELECT chunk_text FROM embeddings"))
+        conn.close()
+        assert rows == ["Principle 1", "Principle 2"]
+    
+    def test_full_reindex_keeps_previous_generation_visible(self, embeddings_manager):
+        """Test queries during a rebuild see the complete previous index"""
+        storage = embeddings_manager.storage
+        storage.save_principles(["Principle 1", "Principle 2"])
+        seen_during_rebuild = []
+        
+        def embed_multi(texts, batch_size):
+            if embeddings_manager.published_generation():
+                seen_during_rebuild.append(embeddings_manager.search_generation("Principle", limit=10))
+            return [[1.0, float(len(text))] for text in texts]
+        
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = embed_multi
+        mock_model.embed.side_effect = lambda text: [1.0, float(len(text))]
+        with patch('devco.engine.EmbeddingEngine._load_model', return_value=mock_model):
+            first = embeddings_manager.embed_all_content(silent=True)
+            # Give the rebuild a chunk with no stored vector to embed
+            storage.save_principles(["Principle 1", "Principle 2 revised"])
+            embeddings_manager.cache.prune(0)
+            second = embeddings_manager.embed_all_content(silent=True, full=True)
+        
+        assert (first["generation"], second["generation"]) == (1, 2)
+        generation, results = seen_during_rebuild[0]
+        assert generation == 1
+        assert sorted(result["chunk_text"] for result in results) == ["Principle 1", "Principle 2"]
+        assert embeddings_manager.search_generation("Principle", limit=10)[0] == 2
+    
+    def test_run_without_changes_keeps_generation(self, counting_model, embeddings_manager):
+        """Test a no-op reindex does not publish a new generation"""
+        embeddings_manager.storage.save_principles(["Principle 1"])
+        
+        assert embeddings_manager.embed_all_content(silent=True)["generation"] == 1
+        assert embeddings_manager.embed_all_content(silent=True)["generation"] == 1
     
     @patch('devco.embeddings.EmbeddingsManager.generate_embedding')
     def test_search_similar_content(self, mock_generate, embeddings_manager):
@@ -163,4 +589,24 @@ class TestEmbeddingsManager:
         
         # Results should be sorted by similarity (highest first)
         if len(results) > 1:
-            assert results[0]['similarity'] >= results[1]['similarity']
\ No newline at end of file
+            assert results[0]['similarity'] >= results[1]['similarity']
+    
+    def test_search_with_local_model(self, embeddings_manager):
+        """Test end-to-end indexing and search with the offline backend"""
+        storage = embeddings_manager.storage
+        config = storage.load_config()
+        config["embedding_model"] = "local-hash-256"
+        storage.save_config(config)
+        storage.save_principles(["Write tests with pytest before the implementation"])
+        storage.save_summary({
+            "summary": "A CLI for project documentation",
+            "sections": {
+                "database": {"summary": "SQLite stores embeddings", "detail": "Vectors live in devco.db"}
+            }
+        })
+        
+        result = embeddings_manager.embed_all_content(silent=True)
+        results = embeddings_manager.search_similar_content("how do we write tests", limit=1)
+        
+        assert result["failed"] == []
+        assert results[0]["content_type"] == "principle"
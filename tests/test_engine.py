@@ -0,0 +1,141 @@
+import pytest
+import tempfile
+import os
+import sys
+import json
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.engine import EmbeddingEngine, get_engine, pack_batches
+
+
+class TestEmbeddingEngine:
+
+    @pytest.fixture
+    def storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            yield storage
+
+    @pytest.fixture
+    def engine(self, storage):
+        return EmbeddingEngine(storage)
+
+    def _bump_mtime(self, path):
+        """Move a file's mtime forward so the settings cache notices the change"""
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_settings_read_model_and_env(self, storage, engine):
+        """Test settings combine config.json and .devco/.env"""
+        env_file = storage.devco_dir / ".env"
+        env_file.write_text("GOOGLE_API_KEY=abc123\n")
+
+        settings = engine.settings()
+
+        assert settings["model"] == "gemini-embedding-exp-03-07-2048"
+        assert settings["env"]["LLM_GEMINI_KEY"] == "abc123"
+
+    def test_settings_cached_until_mtime_changes(self, storage, engine):
+        """Test config.json is only re-read when its mtime changes"""
+        engine.settings()
+
+        with patch.object(storage, 'load_config', wraps=storage.load_config) as mock_load:
+            engine.settings()
+            engine.settings()
+            assert mock_load.call_count == 0
+
+            config_file = storage.devco_dir / "config.json"
+            config = json.loads(config_file.read_text())
+            config["embedding_model"] = "other-model"
+            config_file.write_text(json.dumps(config))
+            self._bump_mtime(config_file)
+
+            assert engine.settings()["model"] == "other-model"
+            assert mock_load.call_count == 1
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_model_loaded_once_per_process(self, mock_load, engine):
+        """Test the llm model object is reused across chunks"""
+        mock_model = MagicMock()
+        mock_model.embed.return_value = [1.0, 0.0]
+        mock_load.return_value = mock_model
+
+        for text in ["one", "two", "three"]:
+            assert engine.embed(text) == [1.0, 0.0]
+
+        mock_load.assert_called_once_with("gemini-embedding-exp-03-07-2048")
+        assert mock_model.embed.call_count == 3
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_model_receives_api_key(self, mock_load, storage, engine):
+        """Test the Gemini key from .env is applied to the model"""
+        (storage.devco_dir / ".env").write_text("GOOGLE_API_KEY=secret\n")
+        mock_model = MagicMock(needs_key="gemini", key_env_var="LLM_GEMINI_KEY")
+        mock_load.return_value = mock_model
+
+        engine.get_model()
+
+        assert mock_model.key == "secret"
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_embed_many_concurrent_matches_sequential(self, mock_load, storage, engine):
+        """Test concurrent batches produce the same ordered output as a sequential run"""
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = lambda texts, batch_size: [[float(t)] for t in texts]
+        mock_load.return_value = mock_model
+        texts = [str(i) for i in range(95)]
+
+        outputs = []
+        for concurrency in (1, 8):
+            config = storage.load_config()
+            config.update({"embedding_batch_size": 10, "embedding_concurrency": concurrency,
+                           "embedding_rate_limit": 0})
+            storage.save_config(config)
+            engine._settings = None
+            outputs.append(engine.embed_many(texts))
+
+        assert outputs[0] == outputs[1]
+        assert outputs[1][0] == [[float(i)] for i in range(95)]
+        assert mock_model.embed_multi.call_count == 20
+
+    @patch('devco.workers.time.sleep')
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_embed_many_retries_rate_limits(self, mock_load, mock_sleep, engine):
+        """Test a 429 from the provider is retried rather than failing the batch"""
+        rate_limited = Exception("429 Resource has been exhausted")
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = [rate_limited, [[1.0], [2.0]]]
+        mock_load.return_value = mock_model
+
+        vectors, failures = engine.embed_many(["a", "b"])
+
+        assert vectors == [[1.0], [2.0]]
+        assert failures == []
+        assert mock_sleep.called
+
+    def test_get_engine_is_shared_per_project(self, storage):
+        """Test get_engine returns one engine per .devco directory"""
+        assert get_engine(storage) is get_engine(DevDocStorage(storage.project_root))
+
+
+class TestPackBatches:
+
+    def test_packs_by_item_budget(self):
+        """Test batches never exceed the item budget"""
+        batches = pack_batches(["x"] * 250, max_items=100, max_chars=10**6)
+        assert [len(b) for b in batches] == [100, 100, 50]
+        assert [i for b in batches for i in b] == list(range(250))
+
+    def test_packs_by_char_budget(self):
+        """Test batches never exceed the character budget"""
+        batches = pack_batches(["a" * 40] * 5, max_items=100, max_chars=100)
+        assert batches == [[0, 1], [2, 3], [4]]
+
+    def test_oversized_text_gets_own_batch(self):
+        """Test a text larger than the budget is still sent"""
+        batches = pack_batches(["a" * 500, "b"], max_items=100, max_chars=100)
+        assert batches == [[0], [1]]
@@ -0,0 +1,152 @@
+import pytest
+import tempfile
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.embeddings import EmbeddingsManager
+
+
+class Interrupted(BaseException):
+    """Stands in for the process dying mid-run"""
+
+
+class TestEmbedJournal:
+
+    @pytest.fixture
+    def embeddings_manager(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            config = storage.load_config()
+            config.update({"embedding_batch_size": 1, "embedding_concurrency": 1, "embedding_rate_limit": 0})
+            storage.save_config(config)
+            storage.save_principles(["one", "two", "three", "four"])
+            yield EmbeddingsManager(storage)
+
+    def _model(self, embed_multi):
+        mock_model = MagicMock()
+        mock_model.embed_multi.side_effect = embed_multi
+        mock_model.embed.side_effect = lambda text: embed_multi([text], 1)[0]
+        return mock_model
+
+    def _row_count(self, manager):
+        conn = manager.storage.get_db_connection()
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        conn.close()
+        return count
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_completed_job_recorded(self, mock_load, embeddings_manager):
+        """Test a successful run leaves a completed job with every item done"""
+        mock_load.return_value = self._model(lambda texts, batch_size: [[1.0] for _ in texts])
+
+        embeddings_manager.embed_all_content(silent=True)
+
+        job = embeddings_manager.journal.latest()
+        assert job["status"] == "completed"
+        assert job["counts"] == {"pending": 0, "done": 4, "failed": 0}
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_interrupted_run_keeps_progress_and_resumes(self, mock_load, embeddings_manager):
+        """Test chunks finished before a crash are kept and not embedded again"""
+        calls = []
+
+        def crashing(texts, batch_size):
+            if len(calls) == 2:
+                raise Interrupted()
+            calls.extend(texts)
+            return [[1.0] for _ in texts]
+
+        mock_load.return_value = self._model(crashing)
+        with pytest.raises(Interrupted):
+            embeddings_manager.embed_all_content(silent=True)
+
+        job = embeddings_manager.journal.latest_unfinished()
+        assert job["status"] == "running"
+        assert job["counts"]["done"] == 2
+        assert self._row_count(embeddings_manager) == 2
+
+        resumed = []
+
+        def working(texts, batch_size):
+            resumed.extend(texts)
+            return [[1.0] for _ in texts]
+
+        mock_load.return_value = self._model(working)
+        embeddings_manager.engine._models.clear()
+        result = embeddings_manager.embed_all_content(silent=True, resume=True)
+
+        assert resumed == ["three", "four"]
+        assert result["embedded"] == 2
+        assert self._row_count(embeddings_manager) == 4
+        assert embeddings_manager.journal.latest()["status"] == "completed"
+
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_interrupted_run_is_not_published(self, mock_load, embeddings_manager):
+        """Test rows from a crashed run stay invisible until a later run publishes them"""
+        calls = []
+
+        def crashing(texts, batch_size):
+            if len(calls) == 2:
+                raise Interrupted()
+            calls.extend(texts)
+            return [[1.0] for _ in texts]
+
+        mock_load.return_value = self._model(crashing)
+        with pytest.raises(Interrupted):
+            embeddings_manager.embed_all_content(silent=True)
+
+        status = embeddings_manager.check_embeddings_status()
+        assert status["generation"] == 0
+        assert status["embedded_items"] == 0
+
+        mock_load.return_value = self._model(lambda texts, batch_size: [[1.0] for _ in texts])
+        embeddings_manager.engine._models.clear()
+        result = embeddings_manager.embed_dirty_content(silent=True)
+
+        # The background path widens to all content to pick up the leftovers
+        assert result["generation"] == 1
+        assert result["embedded"] == 2
+        assert self._row_count(embeddings_manager) == 4
+        assert embeddings_manager.check_embeddings_status()["embedded_items"] == 4
+
+    @patch('devco.embeddings.time.sleep')
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_failed_chunks_are_retried(self, mock_load, mock_sleep, embeddings_manager):
+        """Test a chunk that fails once succeeds on a later retry round"""
+        failures = {"two": 1}
+
+        def flaky(texts, batch_size):
+            for text in texts:
+                if failures.get(text):
+                    failures[text] -= 1
+                    raise Exception("content temporarily rejected")
+            return [[1.0] for _ in texts]
+
+        mock_load.return_value = self._model(flaky)
+        result = embeddings_manager.embed_all_content(silent=True)
+
+        assert result["failed"] == []
+        assert result["embedded"] == 4
+        assert mock_sleep.call_count == 1
+
+    @patch('devco.embeddings.time.sleep')
+    @patch('devco.engine.EmbeddingEngine._load_model')
+    def test_persistent_failures_are_reported(self, mock_load, mock_sleep, embeddings_manager):
+        """Test chunks that keep failing are recorded, not silently skipped"""
+        def broken(texts, batch_size):
+            if "three" in texts:
+                raise Exception("content rejected")
+            return [[1.0] for _ in texts]
+
+        mock_load.return_value = self._model(broken)
+        result = embeddings_manager.embed_all_content(silent=True)
+
+        assert [f["content_id"] for f in result["failed"]] == ["3"]
+        assert result["failed"][0]["attempts"] == 3
+        assert embeddings_manager.journal.latest()["status"] == "failed"
+        assert embeddings_manager.check_embeddings_status()["failed_content"] == ["principle_3"]
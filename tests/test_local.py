@@ -0,0 +1,69 @@
+import pytest
+import tempfile
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.engine import EmbeddingEngine
+from devco.local import HashingEmbeddingModel, is_local_model
+
+
+class TestHashingEmbeddingModel:
+
+    @pytest.fixture
+    def model(self):
+        return HashingEmbeddingModel("local-hash-256")
+
+    def test_is_local_model(self):
+        """Test local model ids are recognised"""
+        assert is_local_model("local-hash")
+        assert is_local_model("local-hash-1024")
+        assert not is_local_model("gemini-embedding-exp-03-07-2048")
+        assert not is_local_model(None)
+
+    def test_dimensions_from_model_id(self):
+        """Test the dimension suffix sets the vector size"""
+        assert len(HashingEmbeddingModel("local-hash-64").embed("text")) == 64
+        assert len(HashingEmbeddingModel("local-hash").embed("text")) == 512
+
+    def test_deterministic(self, model):
+        """Test the same text always gives the same vector"""
+        assert model.embed("Use pytest fixtures") == HashingEmbeddingModel("local-hash-256").embed("Use pytest fixtures")
+
+    def test_vectors_are_normalized(self, model):
+        """Test vectors have unit length"""
+        vector = np.array(model.embed("Some documentation about the project"))
+        assert abs(np.linalg.norm(vector) - 1.0) < 1e-5
+
+    def test_ignores_case_and_punctuation(self, model):
+        """Test tokenization is case and punctuation insensitive"""
+        assert np.allclose(model.embed("Hello, World!"), model.embed("hello world"))
+
+    def test_related_text_scores_higher(self, model):
+        """Test texts sharing words are more similar than unrelated texts"""
+        query, related, unrelated = model.embed_matrix([
+            "how are tests run",
+            "tests are run with pytest in the tests directory",
+            "the database schema uses postgres",
+        ])
+        assert query @ related > query @ unrelated
+
+    def test_batch_matches_single(self, model):
+        """Test a text embeds the same alone and inside a batch"""
+        texts = ["first text", "second text here", "", "third"]
+        batch = list(model.embed_multi(texts, batch_size=3))
+        assert len(batch) == 4
+        for text, vector in zip(texts, batch):
+            assert np.allclose(vector, model.embed(text))
+
+    def test_engine_loads_local_model_without_llm(self):
+        """Test the engine serves local models without the llm package"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            engine = EmbeddingEngine(storage)
+
+            assert len(engine.embed("offline text", model_id="local-hash-128")) == 128
@@ -0,0 +1,169 @@
+import multiprocessing
+import pytest
+import tempfile
+import sqlite3
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.migrations import MigrationRunner, LATEST_VERSION
+from devco.embeddings import EmbeddingsManager
+from devco.hashing import content_hash
+from devco.vectors import encode_vector
+
+
+def count_embeddings(project_root):
+    """Open a project like a devco command would and read its index"""
+    conn = DevDocStorage(project_root).get_db_connection()
+    conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    conn.close()
+
+
+class TestMigrationRunner:
+    
+    @pytest.fixture
+    def legacy_db(self):
+        """A project whose devco.db predates schema versioning"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            db_file = Path(tmpdir) / '.devco' / 'devco.db'
+            db_file.unlink()
+            conn = sqlite3.connect(db_file)
+            conn.execute("""
+                CREATE TABLE embeddings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_type TEXT NOT NULL,
+                    content_id TEXT NOT NULL,
+                    chunk_text TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.executemany("INSERT INTO embeddings (content_type, content_id, chunk_text, embedding) VALUES (?, ?, ?, ?)",
+                             [("principle", str(i), f"Principle {i}", f"[{i}.0, 1.0]".encode()) for i in range(1, 4)])
+            conn.commit()
+            yield storage, conn
+            conn.close()
+    
+    def test_new_database_is_at_latest_version(self):
+        """Test init creates a database that needs no migration"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            conn = storage.get_db_connection()
+            
+            assert MigrationRunner(conn).current_version() == LATEST_VERSION
+            assert MigrationRunner(conn).plan() == []
+            conn.close()
+    
+    def test_plan_changes_nothing(self, legacy_db):
+        """Test the dry-run plan lists every step and the rows it rewrites"""
+        storage, conn = legacy_db
+        runner = MigrationRunner(conn, storage.load_config())
+        
+        plan = runner.plan()
+        
+        assert [step["version"] for step in plan] == list(range(1, LATEST_VERSION + 1))
+        assert plan[1]["rows"] == 3
+        assert runner.current_version() == 0
+        assert 'embedding' in {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+    
+    def test_legacy_database_is_upgraded_on_open(self, legacy_db):
+        """Test opening an old database migrates it and keeps its vectors"""
+        storage, conn = legacy_db
+        
+        upgraded = DevDocStorage(storage.project_root).get_db_connection()
+        rows = upgraded.execute("""
+            SELECT e.id, v.embedding FROM embeddings e JOIN vectors v ON v.id = e.vector_id ORDER BY e.id
+        """).fetchall()
+        
+        assert MigrationRunner(upgraded).current_version() == LATEST_VERSION
+        assert rows == [(i, encode_vector([float(i), 1.0])) for i in range(1, 4)]
+        # The migrated rows are published as generation 0, with a token of their own
+        assert upgraded.execute("SELECT generation, length(token) FROM embedding_generations").fetchall() == [(0, 32)]
+        upgraded.close()
+    
+    def test_interrupted_migration_resumes(self, legacy_db):
+        """Test a step stopped midway continues after its last committed page"""
+        storage, conn = legacy_db
+        calls = []
+        
+        def failing_encode(vector):
+            calls.append(vector)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return encode_vector(vector)
+        
+        with patch('devco.migrations.encode_vector', side_effect=failing_encode):
+            with pytest.raises(KeyboardInterrupt):
+                MigrationRunner(conn, storage.load_config(), page_size=1).run()
+        
+        runner = MigrationRunner(conn, storage.load_config(), page_size=1)
+        assert runner.current_version() == 1
+        assert runner.plan()[0]["rows"] == 2
+        
+        runner.run()
+        
+        assert runner.current_version() == LATEST_VERSION
+        assert [row[0] for row in conn.execute("SELECT id FROM embeddings ORDER BY id")] == [1, 2, 3]
+    
+    def test_upgrade_gives_back_the_space_of_json_vectors(self, legacy_db):
+        """Test a migrated legacy database is smaller and keeps no free pages"""
+        storage, conn = legacy_db
+        vector = "[" + ", ".join(["0.123456789"] * 256) + "]"
+        conn.executemany("INSERT INTO embeddings (content_type, content_id, chunk_text, embedding) VALUES (?, ?, ?, ?)",
+                         [("section", str(i), f"Section {i}", vector.encode()) for i in range(500)])
+        conn.commit()
+        db_file = storage.devco_dir / 'devco.db'
+        before = db_file.stat().st_size
+        
+        MigrationRunner(conn, storage.load_config()).run()
+        
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert db_file.stat().st_size < before / 2
+    
+    def test_upgrade_backfills_content_hashes(self, legacy_db):
+        """Test upgraded rows stay current when the chunking has not changed"""
+        storage, conn = legacy_db
+        config = storage.load_config()
+        # A project from before chunking could be configured
+        for key in ("chunker", "chunk_size", "chunk_overlap", "chunk_unit"):
+            config.pop(key, None)
+        storage.save_config(config)
+        principles = storage.save_principles(["Principle 1", "Principle 2", "Principle 3"])
+        
+        upgraded = DevDocStorage(storage.project_root).get_db_connection()
+        rows = upgraded.execute("SELECT chunk_text, content_hash FROM embeddings ORDER BY id").fetchall()
+        # Principle ids were positions before principles had stable ids
+        upgraded.executemany("UPDATE embeddings SET content_id = ? WHERE chunk_text = ?",
+                             [(principle["id"], principle["text"]) for principle in principles])
+        upgraded.commit()
+        upgraded.close()
+        plan = EmbeddingsManager(DevDocStorage(storage.project_root)).plan_reindex(False)
+        
+        assert all(row_hash == content_hash(chunk_text) for chunk_text, row_hash in rows)
+        assert plan["pending"] == [] and plan["orphans"] == []
+        assert plan["unchanged"] == 3
+    
+    def test_concurrent_opens_migrate_once(self, legacy_db):
+        """Test processes opening an old database at the same time all succeed"""
+        storage, conn = legacy_db
+        conn.executemany("INSERT INTO embeddings (content_type, content_id, chunk_text, embedding) VALUES (?, ?, ?, ?)",
+                         [("section", str(i), f"Section {i}", b"[1.0, 0.5]") for i in range(5000)])
+        conn.commit()
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=count_embeddings, args=(str(storage.project_root),)) for _ in range(4)]
+        
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        
+        assert [process.exitcode for process in processes] == [0] * 4
+        assert MigrationRunner(conn).current_version() == LATEST_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 5003
@@ -118,4 +118,22 @@ class TestPrinciplesManager:
         with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
             principles_manager.list_principles()
             output = mock_stdout.getvalue()
-            assert "1. Test principle" in output
\ No newline at end of file
+            assert "1. Test principle" in output
+    
+    def test_write_paths_queue_dirty_items(self, principles_manager):
+        """Test adding and removing principles queues the affected items"""
+        storage = principles_manager.storage
+        for text in ["First", "Second", "Third"]:
+            principles_manager.add_principle_with_text(text)
+        ids = [record["id"] for record in storage.load_principle_records()]
+        
+        queue_end, dirty = storage.load_dirty_items()
+        assert dirty == {("principle", item_id) for item_id in ids}
+        
+        storage.clear_dirty_items(queue_end)
+        principles_manager.remove_principle(2)
+        
+        # Only the removed principle is queued; the third keeps its id
+        _, dirty = storage.load_dirty_items()
+        assert dirty == {("principle", ids[1])}
+        assert [record["id"] for record in storage.load_principle_records()] == [ids[0], ids[2]]
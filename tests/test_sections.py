@@ -13,11 +13,12 @@ from devco.sections import SectionsManager
 
 class TestSectionsManager:
     
-    @pytest.fixture
-    def temp_dir(self):
+    @pytest.fixture(params=["json", "sqlite"])
+    def temp_dir(self, request):
         with tempfile.TemporaryDirectory() as tmpdir:
             storage = DevDocStorage(tmpdir)
             storage.init()
+            storage.set_document_backend(request.param)
             yield tmpdir
     
     @pytest.fixture
@@ -137,4 +138,27 @@ class TestSectionsManager:
             with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
                 sections_manager.add_section("test")
                 output = mock_stdout.getvalue()
-                assert "Cancelled" in output
\ No newline at end of file
+                assert "Cancelled" in output
+    
+    def test_write_paths_queue_dirty_items(self, sections_manager):
+        """Test section changes queue the section's summary and detail items"""
+        sections_manager.add_section_with_content("api", "API summary", "API detail")
+        section_id = sections_manager.storage.load_summary()["sections"]["api"]["id"]
+        
+        _, dirty = sections_manager.storage.load_dirty_items()
+        assert dirty == {("section", section_id), ("section", f"{section_id}_detail")}
+    
+    def test_rename_section_keeps_id_and_position(self, sections_manager):
+        """Test renaming a section keeps its id, content and place"""
+        sections_manager.add_section_with_content("api", "API summary", "API detail")
+        sections_manager.add_section_with_content("cli", "CLI summary", "CLI detail")
+        section_id = sections_manager.storage.load_summary()["sections"]["api"]["id"]
+        
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            sections_manager.rename_section("api", "web")
+        
+        sections = sections_manager.storage.load_summary()["sections"]
+        assert list(sections) == ["web", "cli"]
+        assert sections["web"]["id"] == section_id
+        assert sections["web"]["summary"] == "API summary"
+        assert "Renamed section 'api' to 'web'" in mock_stdout.getvalue()
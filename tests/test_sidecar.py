@@ -0,0 +1,215 @@
+import pytest
+import tempfile
+import os
+import sqlite3
+import sys
+import numpy as np
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.storage import DevDocStorage
+from devco.embeddings import EmbeddingsManager
+
+
+class TestVectorSidecar:
+    
+    @pytest.fixture
+    def embeddings_manager(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = DevDocStorage(tmpdir)
+            storage.init()
+            config = storage.load_config()
+            config["embedding_model"] = "local-hash-64"
+            storage.save_config(config)
+            storage.save_principles([f"Principle number {i} about testing" for i in range(20)])
+            yield EmbeddingsManager(storage)
+    
+    def matrix_files(self, manager):
+        return sorted(path.name for path in manager.sidecar.index_dir.glob("*.npy"))
+    
+    def test_publish_writes_normalized_matrix(self, embeddings_manager):
+        """Test publishing an index writes one unit-length row per vector"""
+        embeddings_manager.embed_all_content(silent=True)
+        
+        files = self.matrix_files(embeddings_manager)
+        assert len(files) == 2
+        matrix = np.load(embeddings_manager.sidecar.index_dir / [f for f in files if ".ids." not in f][0])
+        assert matrix.shape == (20, 64)
+        assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+        assert (embeddings_manager.sidecar.index_dir / ".gitignore").read_text() == "*\n"
+    
+    def test_search_matches_table_scan(self, embeddings_manager):
+        """Test the mapped matrix ranks vectors like a scan of the vectors table"""
+        embeddings_manager.embed_all_content(silent=True)
+        query = embeddings_manager.generate_embedding("principle 7 testing")
+        where, params = embeddings_manager._model_filter(None, "e.model")
+        conn = embeddings_manager.storage.get_db_connection()
+        generation = embeddings_manager.published_generation(conn)
+        
+        mapped = embeddings_manager.sidecar.search(conn, "local-hash-64", generation, where, params, query, 5)
+        scanned = embeddings_manager._scan_vectors(conn, generation, where, params, query, 5)
+        conn.close()
+        
+        assert [vector_id for vector_id, _ in mapped] == [vector_id for vector_id, _ in scanned]
+        assert np.allclose([score for _, score in mapped], [score for _, score in scanned], atol=1e-5)
+    
+    def test_stale_matrix_is_replaced(self, embeddings_manager):
+        """Test changed content gets a new matrix and the old files are removed"""
+        embeddings_manager.embed_all_content(silent=True)
+        before = self.matrix_files(embeddings_manager)
+        
+        embeddings_manager.storage.save_principles(["Only one principle about testing left"])
+        embeddings_manager.embed_all_content(silent=True)
+        results = embeddings_manager.search_similar_content("testing", limit=5)
+        
+        after = self.matrix_files(embeddings_manager)
+        assert len(after) == 2 and not set(before) & set(after)
+        assert [result["chunk_text"] for result in results] == ["Only one principle about testing left"]
+    
+    def test_restored_database_does_not_reuse_matrix(self, embeddings_manager):
+        """Test a devco.db brought back by git gets a new matrix for a generation number it reuses"""
+        storage = embeddings_manager.storage
+        embeddings_manager.embed_all_content(silent=True)
+        db_file = storage.devco_dir / 'devco.db'
+        saved = sqlite3.connect(":memory:")
+        conn = storage.get_db_connection()
+        conn.backup(saved)
+        
+        storage.save_principles(["bravo bananas"])
+        embeddings_manager.embed_all_content(silent=True)
+        saved.backup(conn)
+        conn.close()
+        saved.close()
+        storage.save_principles(["charlie cherries"])
+        result = embeddings_manager.embed_all_content(silent=True)
+        results = embeddings_manager.search_similar_content("charlie cherries", limit=1)
+        
+        assert result["generation"] == 2
+        assert results[0]["chunk_text"] == "charlie cherries"
+        assert results[0]["similarity"] == pytest.approx(1.0)
+    
+    def test_stored_embedding_publishes_a_generation(self, embeddings_manager):
+        """Test storing a row directly publishes it as a new generation with its own matrix"""
+        embeddings_manager.embed_all_content(silent=True)
+        vector = embeddings_manager.generate_embedding("Direct row about testing")
+        
+        embeddings_manager.store_embedding("principle", "direct", "Direct row about testing", vector)
+        results = embeddings_manager.search_similar_content("Direct row about testing", limit=1)
+        
+        assert embeddings_manager.published_generation() == 2
+        assert results[0]["chunk_text"] == "Direct row about testing"
+        assert len(self.matrix_files(embeddings_manager)) == 2
+    
+    def test_mixed_dimensions_fall_back_to_scan(self, embeddings_manager):
+        """Test a vector set that cannot form a matrix is still searchable"""
+        embeddings_manager.store_embedding("principle", "a", "Short vector", [1.0, 0.0])
+        embeddings_manager.store_embedding("principle", "b", "Long vector", [1.0, 0.0, 0.0])
+        conn = embeddings_manager.storage.get_db_connection()
+        where, params = embeddings_manager._model_filter(None, "e.model")
+        
+        with pytest.raises(ValueError):
+            embeddings_manager.sidecar.build(conn, "local-hash-64", embeddings_manager.published_generation(conn),
+                                             where, params)
+        conn.close()
+        
+        with patch.object(embeddings_manager, "generate_embedding", return_value=[1.0, 0.0]):
+            results = embeddings_manager.search_similar_content("vector", limit=5)
+        
+        assert [result["chunk_text"] for result in results] == ["Short vector", "Long vector"]
+        assert results[0]["similarity"] == pytest.approx(1.0)
+    
+    @pytest.mark.parametrize("quantization", ["int8", "binary"])
+    def test_quantized_search_rescores_exactly(self, embeddings_manager, quantization):
+        """Test a quantized first pass returns candidates with their full-precision similarity"""
+        embeddings_manager.embed_all_content(silent=True)
+        query = embeddings_manager.generate_embedding("principle 7 testing")
+        where, params = embeddings_manager._model_filter(None, "e.model")
+        conn = embeddings_manager.storage.get_db_connection()
+        generation = embeddings_manager.published_generation(conn)
+        
+        exact = dict(embeddings_manager.sidecar.search(conn, "local-hash-64", generation, where, params, query, 20))
+        quantized = embeddings_manager.sidecar.search(conn, "local-hash-64", generation, where, params, query, 3,
+                                                      quantization, candidates=8)
+        conn.close()
+        
+        assert len(quantized) == 3
+        assert [score for _, score in quantized] == sorted((score for _, score in quantized), reverse=True)
+        assert all(score == pytest.approx(exact[vector_id], abs=1e-6) for vector_id, score in quantized)
+        assert list(embeddings_manager.sidecar.index_dir.glob(f"*.{'int8' if quantization == 'int8' else 'bits'}.npy"))
+    
+    @pytest.mark.parametrize("quantization", ["none", "int8"])
+    def test_prefix_search_rescores_exactly(self, embeddings_manager, quantization):
+        """Test a first pass over renormalized leading dimensions returns full-precision similarities"""
+        embeddings_manager.embed_all_content(silent=True)
+        query = embeddings_manager.generate_embedding("principle 7 testing")
+        where, params = embeddings_manager._model_filter(None, "e.model")
+        conn = embeddings_manager.storage.get_db_connection()
+        generation = embeddings_manager.published_generation(conn)
+        
+        exact = dict(embeddings_manager.sidecar.search(conn, "local-hash-64", generation, where, params, query, 20))
+        prefixed = embeddings_manager.sidecar.search(conn, "local-hash-64", generation, where, params, query, 3,
+                                                     quantization, candidates=8, prefix_dims=48)
+        conn.close()
+        
+        assert len(prefixed) == 3
+        assert all(score == pytest.approx(exact[vector_id], abs=1e-6) for vector_id, score in prefixed)
+        prefix = np.load(next(embeddings_manager.sidecar.index_dir.glob("*.p48.npy")))
+        assert prefix.shape == (20, 48)
+        assert np.allclose(np.linalg.norm(prefix, axis=1), 1.0)
+    
+    def test_prefix_as_long_as_vectors_searches_exactly(self, embeddings_manager):
+        """Test a prefix covering every dimension writes no prefix matrix"""
+        embeddings_manager.embed_all_content(silent=True)
+        config = embeddings_manager.storage.load_config()
+        config["vector_prefix_dims"] = 64
+        embeddings_manager.storage.save_config(config)
+        
+        results = embeddings_manager.search_similar_content("principle 7 testing", limit=3)
+        
+        assert len(results) == 3
+        assert not list(embeddings_manager.sidecar.index_dir.glob("*.p64.npy"))
+    
+    def test_check_recall_reports_each_quantization(self, embeddings_manager):
+        """Test the recall check compares every quantization with exact search"""
+        embeddings_manager.embed_all_content(silent=True)
+        
+        report = embeddings_manager.check_recall(k=5, queries=10, candidates=8)
+        
+        assert report["queries"] == 10
+        assert set(report["modes"]) == {"none", "int8", "binary"}
+        assert report["modes"]["none"]["recall"] == 1.0
+        assert all(0.0 <= mode["recall"] <= 1.0 for mode in report["modes"].values())
+    
+    def test_check_recall_reports_prefix_modes(self, embeddings_manager):
+        """Test the recall check adds a prefix first stage for every quantization"""
+        embeddings_manager.embed_all_content(silent=True)
+        
+        report = embeddings_manager.check_recall(k=5, queries=10, candidates=8, prefix_dims=16)
+        
+        assert report["prefix_dims"] == 16
+        assert set(report["modes"]) == {"none", "int8", "binary", "p16", "p16+int8", "p16+binary"}
+
+
+class TestQuantization:
+    
+    def test_int8_codes_approximate_rows(self):
+        """Test int8 codes times their scales reproduce the rows closely"""
+        from devco.vectors import int8_scales, quantize_int8
+        matrix = np.random.default_rng(0).standard_normal((50, 32)).astype(np.float32)
+        scales = int8_scales(matrix)
+        
+        codes = quantize_int8(matrix, scales)
+        
+        assert codes.dtype == np.int8
+        assert np.abs(codes * scales - matrix).max() <= scales.max() / 2 + 1e-6
+    
+    def test_hamming_distance_counts_sign_changes(self):
+        """Test binary codes differ in one bit per dimension whose sign differs"""
+        from devco.vectors import hamming_distances, quantize_binary
+        rows = np.array([[1.0, -1.0, 1.0, 1.0, -1.0, 1.0, 1.0, 1.0, -1.0],
+                         [-1.0, 1.0, 1.0, 1.0, -1.0, 1.0, 1.0, 1.0, 1.0]])
+        
+        distances = hamming_distances(quantize_binary(rows), quantize_binary(rows[0]))
+        
+        assert distances.tolist() == [0, 3]
@@ -10,6 +10,8 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from devco.storage import DevDocStorage
+from devco.migrations import encode_float32_vectors
+from devco.vectors import encode_vector, decode_vector
 
 
 class TestDevDocStorage:
@@ -113,6 +115,249 @@ class TestDevDocStorage:
             config = json.load(f)
         assert config['test_key'] == 'test_value'
 
+    
+    def test_get_db_connection_upgrades_old_schema(self, temp_dir):
+        """Test databases created before content hashing gain the new columns"""
+        import sqlite3
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        
+        db_file = Path(temp_dir) / '.devco' / 'devco.db'
+        db_file.unlink()
+        conn = sqlite3.connect(db_file)
+        conn.execute("""
+            CREATE TABLE embeddings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_type TEXT NOT NULL,
+                content_id TEXT NOT NULL,
+                chunk_text TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+        conn.close()
+        
+        conn = DevDocStorage(temp_dir).get_db_connection()
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+        conn.close()
+        
+        assert {'content_hash', 'model', 'chunk_params', 'generation'} <= columns
+    
+    def test_upgrade_moves_vectors_into_shared_table(self, temp_dir):
+        """Test rows that each held a vector end up sharing one per distinct text"""
+        import sqlite3
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        
+        db_file = Path(temp_dir) / '.devco' / 'devco.db'
+        db_file.unlink()
+        conn = sqlite3.connect(db_file)
+        conn.execute("""
+            CREATE TABLE embeddings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_type TEXT NOT NULL,
+                content_id TEXT NOT NULL,
+                chunk_text TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.executemany("INSERT INTO embeddings (content_type, content_id, chunk_text, embedding) VALUES (?, ?, ?, ?)", [
+            ("principle", "1", "Use tests", b"[1.0, 2.0]"),
+            ("section", "testing", "Use  tests", b"[1.0, 2.0]"),
+            ("principle", "2", "Write docs", b"[3.0, 4.0]"),
+        ])
+        conn.commit()
+        conn.close()
+        
+        conn = DevDocStorage(temp_dir).get_db_connection()
+        vectors = conn.execute("SELECT model, embedding, dimensions FROM vectors ORDER BY id").fetchall()
+        owners = conn.execute("SELECT id, content_id, vector_id FROM embeddings ORDER BY id").fetchall()
+        conn.close()
+        
+        model = storage.load_config()['embedding_model']
+        assert vectors == [(model, encode_vector([1.0, 2.0]), 2), (model, encode_vector([3.0, 4.0]), 2)]
+        assert [(row_id, content_id) for row_id, content_id, _ in owners] == [(1, "1"), (2, "testing"), (3, "2")]
+        assert owners[0][2] == owners[1][2] != owners[2][2]
+    
+    def test_upgrade_reencodes_json_vectors(self, temp_dir):
+        """Test vectors stored as JSON text are converted to float32 blobs in place"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        conn = storage.get_db_connection()
+        conn.executemany("INSERT INTO vectors (model, text_hash, embedding, dimensions) VALUES (?, ?, ?, ?)", [
+            ("m", f"hash{i}", json.dumps([float(i), 0.5, -1.0]).encode('utf-8'), 3) for i in range(5)])
+        conn.commit()
+        
+        encode_float32_vectors(conn, {}, page_size=2)
+        rows = conn.execute("SELECT embedding, dimensions FROM vectors ORDER BY id").fetchall()
+        conn.close()
+        
+        assert [(decode_vector(blob).tolist(), dimensions) for blob, dimensions in rows] == [
+            ([float(i), 0.5, -1.0], 3) for i in range(5)]
+    
+    def test_dirty_queue(self, temp_dir):
+        """Test queued items are returned once and cleared up to a snapshot"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        
+        storage.mark_dirty([("principle", "1"), ("summary", "main")])
+        storage.mark_dirty([("principle", "1")])
+        queue_end, dirty = storage.load_dirty_items()
+        assert dirty == {("principle", "1"), ("summary", "main")}
+        
+        storage.mark_dirty([("section", "api")])
+        storage.clear_dirty_items(queue_end, keep={("summary", "main")})
+        
+        _, dirty = storage.load_dirty_items()
+        assert dirty == {("summary", "main"), ("section", "api")}
+    
+    def test_legacy_principles_get_positional_ids(self, temp_dir):
+        """Test principles saved as plain strings keep the ids their vectors use"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        with open(Path(temp_dir) / '.devco' / 'principles.json', 'w') as f:
+            json.dump(["First", "Second"], f)
+        
+        assert storage.load_principles() == ["First", "Second"]
+        assert storage.load_principle_records() == [{"id": "1", "text": "First"}, {"id": "2", "text": "Second"}]
+    
+    def test_save_principles_keeps_ids_by_text(self, temp_dir):
+        """Test reordering or removing principles does not change the others' ids"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        first, second, third = storage.save_principles(["First", "Second", "Third"])
+        
+        records = storage.save_principles(["Third", "First"])
+        
+        assert records == [third, first]
+        assert storage.load_principle_records() == [third, first]
+        assert second["id"] not in {first["id"], third["id"]}
+    
+    def test_save_summary_keeps_section_ids(self, temp_dir):
+        """Test sections keep their id when replaced and legacy sections use their name"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        with open(Path(temp_dir) / '.devco' / 'summary.json', 'w') as f:
+            json.dump({"summary": "", "sections": {"api": {"summary": "A", "detail": "B"}}}, f)
+        assert storage.load_summary()["sections"]["api"]["id"] == "api"
+        
+        storage.save_summary({"summary": "", "sections": {"api": {"summary": "A2", "detail": "B2"},
+                                                          "cli": {"summary": "C", "detail": "D"}}})
+        
+        sections = storage.load_summary()["sections"]
+        assert sections["api"]["id"] == "api"
+        assert sections["cli"]["id"] not in ("api", "cli")
+
+    def test_sqlite_backend_imports_documents(self, temp_dir):
+        """Test switching to sqlite keeps documents, ids and order, and edits rows in place"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        storage.save_principles(["first", "second"])
+        storage.save_summary({"summary": "Project", "sections": {"b": {"summary": "B", "detail": "b"},
+                                                                 "a": {"summary": "A", "detail": "a"}}})
+        principles = storage.load_principle_records()
+        summary = storage.load_summary()
+        
+        storage.set_document_backend("sqlite")
+        assert storage.document_backend() == "sqlite"
+        assert storage.load_principle_records() == principles
+        assert storage.load_summary() == summary
+        
+        storage.save_section("b", "B2", "b2")
+        storage.rename_section("a", "c")
+        storage.save_section("d", "D", "")
+        sections = storage.load_summary()["sections"]
+        assert list(sections) == ["b", "c", "d"]
+        assert sections["b"] == {"summary": "B2", "detail": "b2", "id": summary["sections"]["b"]["id"]}
+        assert sections["c"]["id"] == summary["sections"]["a"]["id"]
+        assert storage.remove_section("c")["summary"] == "A"
+        assert storage.load_section("c") is None
+        
+        # The JSON files are left as they were until exported
+        with open(Path(temp_dir) / '.devco' / 'summary.json') as f:
+            assert list(json.load(f)["sections"]) == ["b", "a"]
+        
+    def test_export_is_deterministic(self, temp_dir):
+        """Test exported files depend only on the documents, and switching back to json keeps them"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        storage.set_document_backend("sqlite")
+        storage.save_principles(["first"])
+        storage.save_project_summary("Project")
+        storage.save_section("api", "A", "detail")
+        
+        storage.export_documents()
+        summary_file = Path(temp_dir) / '.devco' / 'summary.json'
+        exported = summary_file.read_text()
+        storage.export_documents()
+        assert summary_file.read_text() == exported
+        assert list(json.loads(exported)["sections"]["api"]) == ["summary", "detail", "id"]
+        
+        storage.set_document_backend("json")
+        assert storage.load_principles() == ["first"]
+        assert storage.load_section("api")["detail"] == "detail"
+        
+    def test_sqlite_transaction_discards_rows_on_error(self, temp_dir):
+        """Test document rows written in a failing transaction are rolled back"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        storage.set_document_backend("sqlite")
+        
+        with pytest.raises(RuntimeError):
+            with storage.transaction():
+                storage.save_section("api", "A", "")
+                raise RuntimeError("stop")
+        
+        assert storage.load_section("api") is None
+    
+    def test_json_writes_replace_the_file_atomically(self, temp_dir):
+        """Test a failed write leaves the previous file intact and no temporary file behind"""
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        storage.save_principles(["first"])
+        
+        with patch('devco.storage.os.replace', side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                storage.save_principles(["first", "second"])
+        
+        assert storage.load_principles() == ["first"]
+        assert not list((Path(temp_dir) / '.devco').glob('.*.tmp-*'))
+    
+    def test_concurrent_writers_keep_every_edit(self, temp_dir):
+        """Test principles added by parallel writers are all kept"""
+        import threading
+        from devco.principles import PrinciplesManager
+        DevDocStorage(temp_dir).init()
+        
+        def add(i):
+            PrinciplesManager(DevDocStorage(temp_dir)).add_principle_with_text(f"principle {i}")
+        
+        with patch('sys.stdout'):
+            threads = [threading.Thread(target=add, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        assert sorted(DevDocStorage(temp_dir).load_principles()) == [f"principle {i}" for i in range(8)]
+    
+    def test_readers_do_not_wait_for_a_writer(self, temp_dir):
+        """Test devco.db runs in WAL mode, so reads succeed while a write is open"""
+        import sqlite3
+        storage = DevDocStorage(temp_dir)
+        storage.init()
+        writer = storage.get_db_connection()
+        assert writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO dirty_items (content_type, content_id) VALUES ('principle', '1')")
+        
+        reader = sqlite3.connect(Path(temp_dir) / '.devco' / 'devco.db', timeout=0)
+        assert reader.execute("SELECT COUNT(*) FROM dirty_items").fetchone()[0] == 0
+        reader.close()
+        writer.rollback()
+        writer.close()
 
 class TestGitIntegration:
     """Test git auto-commit functionality"""
@@ -130,28 +375,29 @@ class TestGitIntegration:
         subprocess.run(['git', 'config', 'user.name', 'Test User'], cwd=temp_dir, capture_output=True)
         return temp_dir
 
-    def test_is_git_repo_true_in_git_directory(self, git_repo):
-        """Test _is_git_repo returns True in git repository"""
-        storage = DevDocStorage(git_repo)
-        assert storage._is_git_repo() == True
-
-    def test_is_git_repo_false_in_non_git_directory(self, temp_dir):
-        """Test _is_git_repo returns False outside git repository"""
+    def test_save_outside_git_repo_skips_commit(self, temp_dir):
+        """Test saving outside a git repository writes the files and creates no repository"""
         storage = DevDocStorage(temp_dir)
-        assert storage._is_git_repo() == False
+        storage.init()
+        
+        storage.save_principles(['test principle'])
+        
+        assert storage.load_principles() == ['test principle']
+        assert not (Path(temp_dir) / '.git').exists()
 
     @patch('subprocess.run')
     def test_git_commit_devco_changes_not_in_git_repo(self, mock_run, temp_dir):
         """Test git commit does nothing when not in git repo"""
-        mock_run.side_effect = subprocess.CalledProcessError(1, 'git')
+        mock_run.return_value = subprocess.CompletedProcess([], 128, stdout="", stderr="fatal: not a git repository")
         storage = DevDocStorage(temp_dir)
+        storage.init()
         
         # Should not raise exception and not call git commands after repo check
         storage._git_commit_devco_changes("test action")
         
         # Only the initial git repo check should be called
-        mock_run.assert_called_once_with(['git', 'rev-parse', '--git-dir'], 
-                                       capture_output=True, check=True, cwd=storage.project_root)
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0][:3] == ['git', 'rev-parse', '--git-dir']
 
     def test_git_commit_preserves_staging_area(self, git_repo):
         """Test that git commit preserves user's staging area"""
@@ -176,6 +422,47 @@ class TestGitIntegration:
                               capture_output=True, text=True, cwd=git_repo)
         assert 'user_file.txt' in result.stdout
 
+    def test_git_commit_leaves_user_changes_out_of_the_commit(self, git_repo):
+        """Test the devco commit holds only devco files and the user's index stays in step with it"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        subprocess.run(['git', 'add', '.devco/'], cwd=git_repo, capture_output=True)
+        subprocess.run(['git', 'commit', '-m', 'initial'], cwd=git_repo, capture_output=True)
+        
+        (Path(git_repo) / "user_file.txt").write_text("user content")
+        subprocess.run(['git', 'add', 'user_file.txt'], cwd=git_repo, capture_output=True)
+        storage.save_principles(['test principle'])
+        
+        result = subprocess.run(['git', 'show', '--name-only', '--pretty=format:%s', 'HEAD'],
+                              capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout.strip().split('\n') == ['devco: update principles', '.devco/principles.json']
+        result = subprocess.run(['git', 'diff', '--cached', '--name-only'],
+                              capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout.split() == ['user_file.txt']
+        result = subprocess.run(['git', 'status', '--porcelain', '.devco/principles.json'],
+                              capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout == ''
+    
+    def test_git_commit_in_new_repository(self, git_repo):
+        """Test the first devco commit creates HEAD"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        storage.save_principles(['test principle'])
+        
+        result = subprocess.run(['git', 'log', '--pretty=format:%s'], capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout == 'devco: update principles'
+    
+    def test_unchanged_files_cost_one_git_call(self, git_repo):
+        """Test a save that changes nothing only asks git for HEAD"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        storage.save_principles(['test principle'])
+        
+        with patch('devco.storage.subprocess.run', wraps=subprocess.run) as mock_run:
+            storage.save_principles(['test principle'])
+        
+        assert mock_run.call_count == 1
+    
     def test_git_commit_creates_commit_for_devco_changes(self, git_repo):
         """Test that devco changes create git commits"""
         storage = DevDocStorage(git_repo)
@@ -264,4 +551,79 @@ class TestGitIntegration:
         # Check commit message is specific for clearing
         result = subprocess.run(['git', 'log', '-1', '--pretty=format:%s'], 
                               capture_output=True, text=True, cwd=git_repo)
-        assert result.stdout == 'devco: clear principles'
\ No newline at end of file
+        assert result.stdout == 'devco: clear principles'
+    def test_transaction_writes_and_commits_once(self, git_repo):
+        """Test edits in a transaction are applied together in one git commit"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        subprocess.run(['git', 'add', '.devco/'], cwd=git_repo, capture_output=True)
+        subprocess.run(['git', 'commit', '-m', 'initial'], cwd=git_repo, capture_output=True)
+        
+        with storage.transaction():
+            storage.save_principles(['principle 1'])
+            storage.save_principles(storage.load_principles() + ['principle 2'])
+            storage.save_summary({'summary': 'test summary', 'sections': {}})
+            storage.mark_dirty([("summary", "main")])
+            
+            # Nothing reaches disk until the transaction ends
+            assert json.loads((Path(git_repo) / '.devco' / 'principles.json').read_text()) == []
+            assert storage.load_dirty_items()[1] == set()
+        
+        result = subprocess.run(['git', 'log', '--pretty=format:%s'],
+                              capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout.split('\n') == [
+            'devco: batch update - update principles, update summary', 'initial']
+        assert DevDocStorage(git_repo).load_principles() == ['principle 1', 'principle 2']
+        assert storage.load_dirty_items()[1] == {("summary", "main")}
+
+    def test_transaction_discards_edits_on_error(self, git_repo):
+        """Test a failing transaction writes nothing"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        
+        with pytest.raises(RuntimeError):
+            with storage.transaction():
+                storage.save_principles(['principle 1'])
+                raise RuntimeError("stop")
+        
+        assert storage.load_principles() == []
+
+    def test_vacuum_frees_pages_and_commits_database(self, git_repo):
+        """Test vacuum returns free pages to the filesystem and commits devco.db"""
+        storage = DevDocStorage(git_repo)
+        storage.init()
+        conn = storage.get_db_connection()
+        conn.executemany("INSERT INTO dirty_items (content_type, content_id) VALUES ('principle', ?)",
+                         [(str(i) * 20,) for i in range(5000)])
+        conn.commit()
+        conn.execute("DELETE FROM dirty_items")
+        conn.commit()
+        conn.close()
+        before = storage.database_stats()
+        
+        storage.vacuum()
+        
+        after = storage.database_stats()
+        assert before["freelist_count"] > 0 and after["freelist_count"] == 0
+        assert after["file_bytes"] < before["file_bytes"] + before["wal_bytes"]
+        assert after["wal_bytes"] == 0
+        result = subprocess.run(['git', 'log', '-1', '--pretty=format:%s'],
+                              capture_output=True, text=True, cwd=git_repo)
+        assert result.stdout == 'devco: compact database'
+    
+    def test_older_project_gets_gitignore_on_first_write(self, git_repo):
+        """Test a project initialized before .devco/.gitignore existed ignores devco's lock files"""
+        DevDocStorage(git_repo).init()
+        gitignore = Path(git_repo) / '.devco' / '.gitignore'
+        gitignore.write_text("my-notes.txt\n")
+        
+        DevDocStorage(git_repo).save_principles(['test principle'])
+        
+        assert gitignore.read_text().splitlines()[0] == "my-notes.txt"
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=all'],
+                              capture_output=True, text=True, cwd=git_repo).stdout
+        assert '.lock' not in status and '-wal' not in status and '-shm' not in status
+        # The ignore file itself is committed, so clones get it too
+        assert '.gitignore' not in status
+        assert subprocess.run(['git', 'show', 'HEAD:.devco/.gitignore'], capture_output=True, text=True,
+                              cwd=git_repo).stdout.splitlines()[0] == "my-notes.txt"
@@ -0,0 +1,116 @@
+import pytest
+import os
+import sys
+import time
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devco.workers import TokenBucket, call_with_backoff, is_retryable, run_ordered, status_code
+
+
+class HTTPError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.response = MagicMock(status_code=code)
+
+
+class TestRetryClassification:
+
+    def test_status_code_from_response(self):
+        """Test status codes are read from an attached response"""
+        assert status_code(HTTPError(429)) == 429
+
+    def test_status_code_from_message(self):
+        """Test status codes are recognised in error messages"""
+        assert status_code(Exception("Error code: 503 Service Unavailable")) == 503
+        assert status_code(Exception("HTTP/1.1 429 Too Many Requests")) == 429
+        assert status_code(Exception("upstream returned status 502")) == 502
+
+    def test_status_code_ignores_other_numbers(self):
+        """Test numbers that are not named as a status are not mistaken for one"""
+        assert status_code(Exception("input has 503 tokens, limit is 500")) is None
+        assert status_code(Exception("500 tokens is over the limit")) is None
+        assert not is_retryable(ValueError("chunk 429 of 1000 is empty"))
+        assert not is_retryable(OSError(500, "odd errno"))
+
+    def test_retryable_errors(self):
+        """Test rate limits, server errors and timeouts are retried"""
+        assert is_retryable(HTTPError(429))
+        assert is_retryable(HTTPError(500))
+        assert is_retryable(TimeoutError())
+        assert not is_retryable(HTTPError(400))
+        assert not is_retryable(ValueError("bad input"))
+
+
+class TestCallWithBackoff:
+
+    @patch('devco.workers.time.sleep')
+    def test_retries_until_success(self, mock_sleep):
+        """Test retryable errors back off exponentially and then succeed"""
+        fn = MagicMock(side_effect=[HTTPError(429), HTTPError(503), "ok"])
+
+        assert call_with_backoff(fn, base_delay=1.0) == "ok"
+        assert fn.call_count == 3
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert 0.5 <= delays[0] <= 1.0
+        assert 1.0 <= delays[1] <= 2.0
+
+    @patch('devco.workers.time.sleep')
+    def test_non_retryable_error_raises_immediately(self, mock_sleep):
+        """Test client errors are not retried"""
+        fn = MagicMock(side_effect=HTTPError(400))
+
+        with pytest.raises(HTTPError):
+            call_with_backoff(fn)
+        assert fn.call_count == 1
+        mock_sleep.assert_not_called()
+
+    @patch('devco.workers.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        """Test retrying stops after max_retries"""
+        fn = MagicMock(side_effect=HTTPError(500))
+
+        with pytest.raises(HTTPError):
+            call_with_backoff(fn, max_retries=2)
+        assert fn.call_count == 3
+
+    @patch('devco.workers.time.sleep')
+    def test_rate_limit_throttles_bucket(self, mock_sleep):
+        """Test a 429 response halves the bucket's rate"""
+        bucket = TokenBucket(rate=100)
+        fn = MagicMock(side_effect=[HTTPError(429), "ok"])
+
+        call_with_backoff(fn, bucket)
+
+        assert bucket.rate == 60  # halved to 50, then recovered by 10
+
+
+class TestTokenBucket:
+
+    def test_unlimited_when_rate_is_zero(self):
+        """Test a zero rate never blocks"""
+        bucket = TokenBucket(rate=0)
+        start = time.monotonic()
+        for _ in range(1000):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.5
+
+    def test_limits_rate(self):
+        """Test requests beyond the burst capacity are spread out"""
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.09
+
+
+class TestRunOrdered:
+
+    def test_results_in_input_order(self):
+        """Test concurrent results come back in input order"""
+        def slow_square(n):
+            time.sleep(0.001 * (10 - n))
+            return n * n
+
+        assert run_ordered(slow_square, list(range(10)), concurrency=4) == [n * n for n in range(10)]